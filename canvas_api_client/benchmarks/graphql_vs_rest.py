@@ -0,0 +1,225 @@
+"""
+Compares crawling an account's courses and their users over REST (one
+listing per course) with a single GraphQL query per page of courses.
+
+Runs against a local fake Canvas server that adds a fixed latency to each
+request, so the difference comes from the number of round trips:
+
+    $ python benchmarks/graphql_vs_rest.py [courses] [users] [latency ms]
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from canvas_api_client.graphql import (  # noqa: E402
+    DEFAULT_COURSE_FIELDS, DEFAULT_USER_FIELDS, GraphQLFetcher)
+from canvas_api_client.transport import Urllib3Transport  # noqa: E402
+from canvas_api_client.v1_client import CanvasAPIv1  # noqa: E402
+
+COURSE_USERS = re.compile(r'^/api/v1/courses/(\d+)/users$')
+OPERATION = re.compile(r'query (\w+)')
+
+
+class FakeCanvas(object):
+    """
+    An account of `courses` courses with `users` students each.
+    """
+
+    def __init__(self, courses, users):
+        self.courses = [{'id': i, 'name': 'Course {}'.format(i),
+                         'course_code': 'C{}'.format(i),
+                         'sis_course_id': 'SIS-C{}'.format(i),
+                         'workflow_state': 'available'}
+                        for i in range(1, courses + 1)]
+        self.users = {
+            course['id']: [{'id': course['id'] * 1000 + j,
+                            'name': 'User {}'.format(j),
+                            'sortable_name': 'User, {}'.format(j),
+                            'short_name': 'U{}'.format(j),
+                            'sis_user_id': 'SIS-U{}'.format(j),
+                            'login_id': 'u{}'.format(j)}
+                           for j in range(users)]
+            for course in self.courses}
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def enrollments(self, course_id):
+        return [{'_id': str(user['id'] * 10), 'type': 'StudentEnrollment',
+                 'state': 'active',
+                 'user': {'_id': str(user['id']), 'name': user['name'],
+                          'sortableName': user['sortable_name'],
+                          'shortName': user['short_name'],
+                          'sisId': user['sis_user_id'],
+                          'loginId': user['login_id']}}
+                for user in self.users[course_id]]
+
+    def rest_user(self, course_id, user):
+        return dict(user, enrollments=[{
+            'id': user['id'] * 10, 'course_id': course_id,
+            'user_id': user['id'], 'type': 'StudentEnrollment',
+            'enrollment_state': 'active'}])
+
+
+def connection(items, first, after, to_node):
+    start = int(after or 0)
+    end = start + first
+    return {'nodes': [to_node(item) for item in items[start:end]],
+            'pageInfo': {'hasNextPage': end < len(items),
+                         'endCursor': str(end)}}
+
+
+def graphql_course(canvas, course, enrollments_first):
+    node = {'_id': str(course['id']), 'name': course['name'],
+            'courseCode': course['course_code'],
+            'sisId': course['sis_course_id'],
+            'state': course['workflow_state']}
+    if enrollments_first is not None:
+        node['enrollmentsConnection'] = connection(
+            canvas.enrollments(course['id']), enrollments_first, None,
+            lambda enrollment: enrollment)
+    return node
+
+
+def make_handler(canvas, latency):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def send_json(self, data, links=None):
+            body = json.dumps(data).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            if links:
+                self.send_header('Link', ','.join(links))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def paginate(self, parts, items):
+            query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+            page = int(query.get('page', 1))
+            per_page = int(query.get('per_page', 10))
+            last = max(1, -(-len(items) // per_page))
+            links = ['<http://{}{}?{}>; rel="last"'.format(
+                self.headers['Host'], parts.path,
+                urlencode(dict(query, page=last)))]
+            if page < last:
+                links.append('<http://{}{}?{}>; rel="next"'.format(
+                    self.headers['Host'], parts.path,
+                    urlencode(dict(query, page=page + 1))))
+            start = (page - 1) * per_page
+            self.send_json(items[start:start + per_page], links)
+
+        def do_GET(self):
+            with canvas.lock:
+                canvas.requests += 1
+            time.sleep(latency)
+            parts = urlsplit(self.path)
+            match = COURSE_USERS.match(parts.path)
+            if parts.path == '/api/v1/accounts/1/courses':
+                self.paginate(parts, canvas.courses)
+            elif match:
+                course_id = int(match.group(1))
+                self.paginate(parts, [canvas.rest_user(course_id, user)
+                                      for user in canvas.users[course_id]])
+            else:
+                self.send_error(404)
+
+        def do_POST(self):
+            with canvas.lock:
+                canvas.requests += 1
+            time.sleep(latency)
+            length = int(self.headers['Content-Length'])
+            request = json.loads(self.rfile.read(length).decode('utf-8'))
+            variables = request['variables']
+            operation = OPERATION.search(request['query']).group(1)
+            if operation == 'AccountCourses':
+                self.send_json({'data': {'account': {
+                    'coursesConnection': connection(
+                        canvas.courses, variables['first'],
+                        variables['after'],
+                        lambda course: graphql_course(
+                            canvas, course,
+                            variables.get('enrollmentsFirst')))}}})
+            else:
+                course_id = int(variables['courseId'])
+                self.send_json({'data': {'course': {
+                    'enrollmentsConnection': connection(
+                        canvas.enrollments(course_id),
+                        variables['enrollmentsFirst'], variables['after'],
+                        lambda enrollment: enrollment)}}})
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def crawl_rest(api):
+    results = []
+    for page in api.get_account_courses('1'):
+        for course in page:
+            users = [user for users in api.get_course_users(
+                str(course['id']), params={'include[]': ['enrollments']})
+                for user in users]
+            results.append((course, users))
+    return results
+
+
+def crawl_graphql(fetcher):
+    return list(fetcher.get_account_courses_with_users('1'))
+
+
+def project(results):
+    """
+    Keeps only the fields the GraphQL crawl selects, to compare the crawls.
+    """
+    return [({field: course[field] for field in DEFAULT_COURSE_FIELDS},
+             [dict({field: user[field] for field in DEFAULT_USER_FIELDS},
+                   enrollments=user['enrollments']) for user in users])
+            for course, users in results]
+
+
+def main(courses=200, users=40, latency_ms=20):
+    canvas = FakeCanvas(courses, users)
+    server = Server(('127.0.0.1', 0), make_handler(canvas, latency_ms / 1e3))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:{}/api/v1/'.format(server.server_address[1])
+    api = CanvasAPIv1(url, 'token', requests_lib=Urllib3Transport())
+
+    timings = []
+    for name, crawl in [
+            ('REST', lambda: crawl_rest(api)),
+            ('GraphQL', lambda: crawl_graphql(
+                GraphQLFetcher(api, page_size=25,
+                               enrollments_page_size=100)))]:
+        canvas.requests = 0
+        start = time.perf_counter()
+        results = crawl()
+        elapsed = time.perf_counter() - start
+        timings.append((name, canvas.requests, elapsed, project(results)))
+
+    print('{} courses x {} users, {} ms per request'.format(
+        courses, users, latency_ms))
+    for name, requests, elapsed, _ in timings:
+        print('  {:<8} {:>5} requests {:8.0f} ms'.format(
+            name, requests, elapsed * 1000))
+    print('  same results: {}'.format(timings[0][3] == timings[1][3]))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
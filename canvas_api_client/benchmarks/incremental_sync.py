@@ -0,0 +1,106 @@
+"""
+Compares the pages fetched by full and incremental account course syncs.
+
+Serves a synthetic account from memory through a fake transport, so only the
+number of pages (and the client-side cost) is measured:
+
+    $ python benchmarks/incremental_sync.py [courses] [new courses]
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from canvas_api_client.response import SimpleResponse  # noqa: E402
+from canvas_api_client.sync import AccountCourseSync  # noqa: E402
+from canvas_api_client.transport import Transport  # noqa: E402
+from canvas_api_client.v1_client import CanvasAPIv1  # noqa: E402
+
+API_URL = 'https://canvas.example.edu/api/v1/'
+EPOCH = datetime(2018, 1, 1)
+
+
+def make_course(course_id):
+    created_at = EPOCH + timedelta(minutes=course_id)
+    return {
+        'id': course_id,
+        'name': 'Course {}'.format(course_id),
+        'course_code': 'C{}'.format(course_id),
+        'workflow_state': 'available',
+        'created_at': created_at.strftime('%Y-%m-%dT%H:%M:%SZ'),
+    }
+
+
+class FakeCanvasTransport(Transport):
+    """
+    Serves /accounts/1/courses from a list, honouring per_page, page, sort
+    and order, and counts the pages served.
+    """
+
+    def __init__(self, courses):
+        self.courses = courses
+        self.pages = 0
+
+    def request(self, method, url, params=None, **kwargs):
+        parts = urlsplit(url)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        query.update(params or {})
+        per_page = int(query.get('per_page', 10))
+        page = int(query.get('page', 1))
+
+        courses = self.courses
+        if query.get('sort') == 'created_at':
+            courses = sorted(courses, key=lambda c: c['created_at'],
+                             reverse=query.get('order') == 'desc')
+        body = courses[(page - 1) * per_page:page * per_page]
+
+        base = '{}://{}{}'.format(parts.scheme, parts.netloc, parts.path)
+        links = []
+        if page * per_page < len(courses):
+            query['page'] = page + 1
+            links.append('<{}?{}>; rel="next"'.format(base, urlencode(query)))
+        self.pages += 1
+        return SimpleResponse(200, url,
+                              headers={'Link': ','.join(links)},
+                              content=json.dumps(body).encode('utf-8'))
+
+
+def timed_sync(sync, **kwargs):
+    start = time.perf_counter()
+    result = sync.sync(**kwargs)
+    return result, time.perf_counter() - start
+
+
+def main(total=20000, new=50):
+    courses = [make_course(i) for i in range(1, total + 1)]
+    transport = FakeCanvasTransport(courses)
+    api = CanvasAPIv1(API_URL, 'token', requests_lib=transport)
+    tempdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tempdir, 'courses.json')
+        AccountCourseSync(api, '1', path).sync()
+
+        courses.extend(make_course(i) for i in range(total + 1,
+                                                     total + new + 1))
+        print('{} courses, {} created since the last sync'.format(
+            total, new))
+        for label, full in (('full', True), ('incremental', False)):
+            shutil.copy(path, path + '.' + label)
+            sync = AccountCourseSync(api, '1', path + '.' + label)
+            transport.pages = 0
+            result, seconds = timed_sync(sync, full=full)
+            print('{:<12} {:>5} pages  {:>4} events  {:8.1f} ms'.format(
+                label, transport.pages, len(result.events),
+                seconds * 1000))
+    finally:
+        shutil.rmtree(tempdir)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,92 @@
+"""
+Compares a single-process crawl with a `ShardedCrawler` on a decode-heavy
+listing.
+
+Pages are served from memory by a fake transport, so the time measured is
+the client-side cost of decoding and transforming records:
+
+    $ python benchmarks/sharded_crawl.py [pages] [processes]
+"""
+import json
+import os
+import sys
+import time
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from canvas_api_client.multiprocess import ShardedCrawler  # noqa: E402
+from canvas_api_client.response import SimpleResponse  # noqa: E402
+from canvas_api_client.transport import Transport  # noqa: E402
+from canvas_api_client.v1_client import CanvasAPIv1  # noqa: E402
+
+API_URL = 'https://canvas.example.edu/api/v1/'
+PER_PAGE = 100
+
+
+def make_course(course_id):
+    return {
+        'id': course_id,
+        'name': 'Course {}'.format(course_id),
+        'course_code': 'C{}'.format(course_id),
+        'workflow_state': 'available',
+        'term': {'id': 1, 'name': 'Fall 2018', 'start_at': None},
+        'teachers': [{'id': course_id * 10 + i,
+                      'display_name': 'Teacher {}'.format(i)}
+                     for i in range(5)],
+        'syllabus_body': '<p>{}</p>'.format('lorem ipsum ' * 100),
+    }
+
+
+def summarize(course):
+    return (course['id'], course['name'], len(course['teachers']))
+
+
+class FakeCanvasTransport(Transport):
+    """
+    Serves `pages` pages of courses, encoded once up front.
+    """
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.body = json.dumps([make_course(i) for i in range(PER_PAGE)])
+
+    def request(self, method, url, params=None, **kwargs):
+        parts = urlsplit(url)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        query.update(params or {})
+        page = int(query.get('page', 1))
+
+        base = '{}://{}{}'.format(parts.scheme, parts.netloc, parts.path)
+        links = ['<{}?{}>; rel="last"'.format(
+            base, urlencode(dict(query, page=self.pages)))]
+        if page < self.pages:
+            links.append('<{}?{}>; rel="next"'.format(
+                base, urlencode(dict(query, page=page + 1))))
+        return SimpleResponse(200, url, headers={'Link': ','.join(links)},
+                              content=self.body.encode('utf-8'))
+
+
+def main(pages=400, processes=4):
+    transport = FakeCanvasTransport(pages)
+
+    start = time.perf_counter()
+    api = CanvasAPIv1(API_URL, 'token', requests_lib=transport)
+    count = sum(len([summarize(course) for course in page])
+                for page in api.get_account_courses('1'))
+    single = time.perf_counter() - start
+    print('single process {:>6} courses {:8.0f} ms'.format(
+        count, single * 1000))
+
+    start = time.perf_counter()
+    with ShardedCrawler(API_URL, 'token', processes=processes,
+                        transform=summarize,
+                        requests_lib=transport) as crawler:
+        count = sum(len(page) for page in crawler.get_account_courses('1'))
+    sharded = time.perf_counter() - start
+    print('{} processes    {:>6} courses {:8.0f} ms ({:.1f}x)'.format(
+        processes, count, sharded * 1000, single / sharded))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
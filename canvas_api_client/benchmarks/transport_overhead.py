@@ -0,0 +1,94 @@
+"""
+Measures client import time and per-request overhead for each transport.
+
+Runs against a local keep-alive HTTP server, so the numbers reflect client
+overhead rather than network latency:
+
+    $ python benchmarks/transport_overhead.py
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from canvas_api_client.transport import (  # noqa: E402
+    RequestsTransport, Urllib3Transport)
+from canvas_api_client.v1_client import CanvasAPIv1  # noqa: E402
+
+BODY = json.dumps({'id': 1, 'name': 'Course'}).encode('utf-8')
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def time_import(statement, runs=10):
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.check_call([sys.executable, '-c', statement],
+                              cwd=package_dir)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def time_requests(client, n=2000):
+    client.get_course_info('1')
+    start = time.perf_counter()
+    for _ in range(n):
+        client.get_course_info('1')
+    return (time.perf_counter() - start) / n
+
+
+def main():
+    baseline = time_import('pass')
+    eager = time_import('import requests; import canvas_api_client.v1_client')
+    lazy = time_import('import canvas_api_client.v1_client')
+    print('Startup (best of 10, interpreter start subtracted):')
+    print('  import with requests: {:.1f} ms'.format((eager - baseline) * 1e3))
+    print('  import lazily:        {:.1f} ms'.format((lazy - baseline) * 1e3))
+
+    server = Server(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:{}/api/v1/'.format(server.server_address[1])
+
+    import requests
+    transports = [
+        ('requests module', RequestsTransport(requests)),
+        ('requests.Session', RequestsTransport()),
+        ('urllib3', Urllib3Transport()),
+    ]
+    print('Per-request time against a local server:')
+    for name, transport in transports:
+        client = CanvasAPIv1(url, 'token', requests_lib=transport)
+        print('  {:<17} {:.0f} us'.format(
+            name + ':', time_requests(client) * 1e6))
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
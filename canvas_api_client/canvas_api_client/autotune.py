@@ -0,0 +1,180 @@
+"""
+Adaptive page sizes for paginated listings.
+
+A single `per_page` rarely suits every endpoint: some endpoints cap it below
+what was asked for, and others slow down sharply with big pages (especially
+with `include[]`). A `PageSizeTuner` learns a page size per endpoint from the
+pages it has fetched:
+
+* if a page that is not the last one holds fewer items than were requested,
+  the server has capped the page size, and no more than the cap is requested
+  from then on;
+* otherwise the page size is steered so a page takes about
+  `target_seconds` to fetch and holds at most `max_bytes` of JSON, within
+  [`min_size`, `max_size`].
+
+Endpoints are told apart by their path, with IDs replaced by `:id`, and by
+their `include[]` params, so `courses/1/users` and `courses/2/users` share
+what was learned.
+"""
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from canvas_api_client.types import RequestParams
+
+PageSizeStats = NamedTuple('PageSizeStats', [
+    ('endpoint', str),
+    ('per_page', int),
+    ('server_cap', Optional[int]),
+    ('pages', int),
+    ('seconds_per_item', float),
+    ('bytes_per_item', float),
+])
+
+# Numeric IDs and prefixed IDs such as sis_course_id:ABC or self.
+_ID_SEGMENT = re.compile(r'^(\d+|[a-z_]+:.+|self)$')
+
+
+def endpoint_key(url: str, params: RequestParams = None) -> str:
+    """
+    Returns the key under which page sizes for `url` are learned: the URL
+    path with IDs replaced by `:id`, followed by any `include[]` values
+    from the URL or the params.
+    """
+    parts = urlsplit(url)
+    path = '/'.join(
+        ':id' if _ID_SEGMENT.match(segment) else segment
+        for segment in parts.path.strip('/').split('/'))
+
+    includes = [value for name, value in parse_qsl(parts.query)
+                if name == 'include[]']
+    value = (params or {}).get('include[]') or []
+    includes.extend([value] if isinstance(value, str) else value)
+    if includes:
+        path += '?include[]=' + ','.join(sorted(set(includes)))
+    return path
+
+
+class _EndpointState(object):
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.cap = None  # type: Optional[int]
+        self.pages = 0
+        self.samples = 0
+        self.seconds_per_item = 0.0
+        self.bytes_per_item = 0.0
+
+
+EndpointStates = Dict[str, _EndpointState]
+
+
+class PageSizeTuner(object):
+    """
+    Learns a page size per endpoint. Pass an instance as the `page_tuner`
+    argument of `CanvasAPIv1` to use it for paginated listings; listings
+    called with an explicit `per_page` param are left alone.
+
+    Each endpoint starts at `initial_size` (by default, the client's
+    `per_page`). Estimates are exponentially weighted moving averages with
+    the given `smoothing`, and the page size at most doubles or halves from
+    one page to the next.
+    """
+
+    def __init__(self,
+                 target_seconds: float = 2.0,
+                 max_bytes: int = 4 * 1024 * 1024,
+                 min_size: int = 10,
+                 max_size: int = 100,
+                 initial_size: Optional[int] = None,
+                 smoothing: float = 0.3) -> None:
+        self.target_seconds = target_seconds
+        self.max_bytes = max_bytes
+        self.min_size = min_size
+        self.max_size = max_size
+        self.initial_size = initial_size
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self._endpoints = {}  # type: EndpointStates
+
+    def _state(self,
+               key: str,
+               default_size: Optional[int]) -> _EndpointState:
+        if key not in self._endpoints:
+            size = self.initial_size or default_size or self.max_size
+            self._endpoints[key] = _EndpointState(
+                min(max(size, self.min_size), self.max_size))
+        return self._endpoints[key]
+
+    def per_page(self,
+                 url: str,
+                 params: RequestParams = None,
+                 default_size: Optional[int] = None) -> int:
+        """
+        Returns the page size to request from the endpoint of `url`.
+        """
+        with self._lock:
+            return self._state(endpoint_key(url, params), default_size).size
+
+    def observe(self,
+                url: str,
+                params: RequestParams,
+                requested: int,
+                items: int,
+                size_bytes: int,
+                seconds: float,
+                has_next: bool) -> None:
+        """
+        Records a fetched page: the page size that was requested, the number
+        of items and bytes it held, how long it took, and whether another
+        page follows it.
+        """
+        if items <= 0:
+            return
+        with self._lock:
+            state = self._state(endpoint_key(url, params), requested)
+            state.pages += 1
+            if not has_next:
+                # The last page is usually short, and its per-item cost is
+                # dominated by the round trip.
+                return
+            if items < requested:
+                state.cap = items if state.cap is None else \
+                    min(state.cap, items)
+
+            state.samples += 1
+            alpha = 1.0 if state.samples == 1 else self.smoothing
+            state.seconds_per_item += alpha * (
+                seconds / items - state.seconds_per_item)
+            state.bytes_per_item += alpha * (
+                size_bytes / items - state.bytes_per_item)
+            state.size = self._next_size(state)
+
+    def _next_size(self, state: _EndpointState) -> int:
+        ideal = float(self.max_size)
+        if state.seconds_per_item > 0:
+            ideal = min(ideal, self.target_seconds / state.seconds_per_item)
+        if state.bytes_per_item > 0:
+            ideal = min(ideal, self.max_bytes / state.bytes_per_item)
+        ideal = min(max(ideal, state.size / 2.0), state.size * 2.0)
+
+        size = int(min(max(ideal, self.min_size), self.max_size))
+        if state.cap is not None:
+            size = min(size, state.cap)
+        return size
+
+    def stats(self) -> List[PageSizeStats]:
+        """
+        Returns the current page size, detected server cap, number of pages
+        seen and per-item latency and size of each endpoint.
+        """
+        with self._lock:
+            return [PageSizeStats(endpoint=key,
+                                  per_page=s.size,
+                                  server_cap=s.cap,
+                                  pages=s.pages,
+                                  seconds_per_item=s.seconds_per_item,
+                                  bytes_per_item=s.bytes_per_item)
+                    for key, s in sorted(self._endpoints.items())]
@@ -0,0 +1,312 @@
+"""
+Bulk blueprint associations with migration tracking.
+
+`associate_courses_to_blueprint` sends every course ID in one PUT, which
+gets slow and can time out with thousands of courses. A
+`BlueprintAssociator` splits the course IDs into chunks and sends the
+chunks of several blueprints at once, retrying failed chunks on their own.
+Then it can sync each blueprint and follow the resulting migrations:
+
+    >>> associator = BlueprintAssociator(api, chunk_size=200, max_workers=4)
+    >>> report = associator.associate({
+    ...     '66642': course_ids_a,
+    ...     '66643': course_ids_b,
+    ... }, sync=True, comment='Fall associations')
+    >>> report.failed_course_ids, [m.workflow_state
+    ...                            for m in report.migrations]
+
+Chunks of one blueprint are sent one at a time by default
+(`max_per_blueprint`), so parallelism goes across blueprints. Only
+throttled requests, server errors (5xx) and connection errors are
+retried. Migrations are polled together, once per round. The interval
+between rounds doubles from `poll_interval` up to `max_poll_interval`, so
+a long sync costs only a few requests. A migration still running after
+`max_wait` seconds, or that fails to be polled `max_poll_failures` times
+in a row, is reported in the 'unknown' state.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import zip_longest
+from typing import (
+    Any, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional,
+    Sequence, Tuple)
+
+from canvas_api_client.deadline import Deadline, should_stop
+from canvas_api_client.interface import CanvasAPIClient
+from canvas_api_client.tokens import is_throttled_response
+from canvas_api_client.transport import is_connection_error
+
+logger = logging.getLogger()
+
+# Blueprint migration states after which nothing changes.
+FINISHED_STATES = ('completed', 'exports_failed', 'imports_failed')
+
+# The state of a migration that was given up on.
+UNKNOWN_STATE = 'unknown'
+
+ChunkResult = NamedTuple('ChunkResult', [
+    ('blueprint_id', str),
+    ('course_ids', List[str]),
+    ('attempts', int),
+    ('error', Optional[str]),
+])
+
+MigrationStatus = NamedTuple('MigrationStatus', [
+    ('blueprint_id', str),
+    ('migration_id', Optional[str]),
+    ('workflow_state', str),
+    ('seconds', float),
+])
+
+AssociationReport = NamedTuple('AssociationReport', [
+    ('chunks', List[ChunkResult]),
+    ('failed_course_ids', Dict[str, List[str]]),
+    ('migrations', List[MigrationStatus]),
+])
+
+BlueprintLocks = Dict[str, threading.Semaphore]
+
+# A blueprint ID and its migration ID (None if it could not be started).
+MigrationKey = Tuple[str, Optional[str]]
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Returns True if a failed request may succeed if sent again: it was
+    throttled, got a server error, or got no response because the
+    connection failed or timed out. Other errors (including
+    `DeadlineExceeded`) are not retried.
+    """
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None)
+    if status is None:
+        return is_connection_error(error)
+    return status >= 500 or is_throttled_response(response)
+
+
+class BlueprintAssociator(object):
+    """
+    Associates courses to blueprints in chunks of `chunk_size` course IDs,
+    with up to `max_workers` requests in flight. A failed chunk is retried
+    up to `max_attempts` times, `retry_delay` seconds apart (doubling), if
+    its error is retryable.
+    """
+
+    def __init__(self,
+                 client: CanvasAPIClient,
+                 chunk_size: int = 200,
+                 max_workers: int = 4,
+                 max_per_blueprint: int = 1,
+                 max_attempts: int = 3,
+                 retry_delay: float = 1.0,
+                 poll_interval: float = 2.0,
+                 max_poll_interval: float = 60.0,
+                 max_wait: Optional[float] = 6 * 3600.0,
+                 max_poll_failures: int = 5,
+                 sleep: Callable[[float], None] = time.sleep,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.client = client
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.max_per_blueprint = max_per_blueprint
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.max_wait = max_wait
+        self.max_poll_failures = max_poll_failures
+        self._sleep = sleep
+        self._clock = clock
+
+    def _retrying(self, send: Callable[[], Any]) -> Any:
+        """
+        Calls `send` until it succeeds, fails with an error that is not
+        retryable or runs out of attempts, and returns its result. The last
+        error is raised.
+        """
+        attempt = 1
+        delay = self.retry_delay
+        while True:
+            try:
+                return send()
+            except Exception as e:
+                if attempt >= self.max_attempts or not is_retryable(e):
+                    raise
+            self._sleep(delay)
+            delay *= 2
+            attempt += 1
+
+    def _send_chunk(self,
+                    locks: BlueprintLocks,
+                    blueprint_id: str,
+                    course_ids: List[str],
+                    deadline: Optional[Deadline]) -> ChunkResult:
+        with locks[blueprint_id]:
+            if should_stop(deadline):
+                return ChunkResult(blueprint_id, course_ids, 0,
+                                   'time budget exhausted')
+            attempts = [0]
+
+            def send() -> Any:
+                attempts[0] += 1
+                return self.client.associate_courses_to_blueprint(
+                    blueprint_id, course_ids)
+
+            try:
+                self._retrying(send)
+            except Exception as e:
+                logger.warning(
+                    'Could not associate {} courses to blueprint {}: '
+                    '{!r}'.format(len(course_ids), blueprint_id, e))
+                return ChunkResult(blueprint_id, course_ids, attempts[0],
+                                   repr(e))
+        return ChunkResult(blueprint_id, course_ids, attempts[0], None)
+
+    def _chunks(self, associations: Mapping[str, Sequence[str]]
+                ) -> Iterable[Tuple[str, List[str]]]:
+        """
+        Splits each blueprint's course IDs into chunks, interleaving the
+        blueprints so that workers are not all queued on one of them.
+        """
+        per_blueprint = []
+        for blueprint_id, course_ids in associations.items():
+            course_ids = list(course_ids)
+            per_blueprint.append(
+                [(blueprint_id, course_ids[start:start + self.chunk_size])
+                 for start in range(0, len(course_ids), self.chunk_size)])
+        for chunks in zip_longest(*per_blueprint):
+            for chunk in chunks:
+                if chunk is not None:
+                    yield chunk
+
+    def associate(self,
+                  associations: Mapping[str, Sequence[str]],
+                  sync: bool = False,
+                  comment: Optional[str] = None,
+                  send_notification: bool = False,
+                  deadline: Optional[Deadline] = None) -> AssociationReport:
+        """
+        Associates the course IDs to each blueprint and reports each chunk
+        and the course IDs that could not be associated. With `sync`, a
+        migration is then started for each blueprint with at least one
+        successful chunk, and followed until it finishes.
+
+        With a time budget, chunks not yet sent when it runs out are
+        reported as failed, and migrations are followed only until then.
+        """
+        locks = {blueprint_id: threading.Semaphore(self.max_per_blueprint)
+                 for blueprint_id in associations}
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            futures = [executor.submit(self._send_chunk, locks, blueprint_id,
+                                       course_ids, deadline)
+                       for blueprint_id, course_ids in
+                       self._chunks(associations)]
+            chunks = [future.result() for future in futures]
+
+        failed = {}  # type: Dict[str, List[str]]
+        synced = []  # type: List[str]
+        for chunk in chunks:
+            if chunk.error is not None:
+                failed.setdefault(chunk.blueprint_id, []).extend(
+                    chunk.course_ids)
+            elif chunk.blueprint_id not in synced:
+                synced.append(chunk.blueprint_id)
+
+        migrations = []  # type: List[MigrationStatus]
+        if sync:
+            migrations = self.sync(synced, comment, send_notification,
+                                   deadline)
+        return AssociationReport(chunks, failed, migrations)
+
+    def sync(self,
+             blueprint_ids: Sequence[str],
+             comment: Optional[str] = None,
+             send_notification: bool = False,
+             deadline: Optional[Deadline] = None) -> List[MigrationStatus]:
+        """
+        Starts a migration for each blueprint and waits for them all to
+        finish. A blueprint whose migration could not be started is
+        reported in the 'failed_to_start' state.
+        """
+        started = []  # type: List[MigrationKey]
+        for blueprint_id in blueprint_ids:
+            if should_stop(deadline):
+                break
+            try:
+                response = self._retrying(
+                    lambda: self.client.start_blueprint_migration(
+                        blueprint_id, comment=comment,
+                        send_notification=send_notification))
+                started.append((blueprint_id, str(response.json()['id'])))
+            except Exception as e:
+                logger.warning('Could not sync blueprint {}: {!r}'.format(
+                    blueprint_id, e))
+                started.append((blueprint_id, None))
+        return self.wait_for_migrations(started, deadline)
+
+    def wait_for_migrations(self,
+                            migrations: Iterable[MigrationKey],
+                            deadline: Optional[Deadline] = None
+                            ) -> List[MigrationStatus]:
+        """
+        Polls `(blueprint ID, migration ID)` migrations until each one has
+        finished (or the time budget runs out), and returns their last
+        known states in the order given. Migrations given up on (see
+        `max_wait` and `max_poll_failures`) are reported as 'unknown'.
+        """
+        begun = self._clock()
+        states = {}  # type: Dict[MigrationKey, MigrationStatus]
+        pending = []  # type: List[MigrationKey]
+        order = []  # type: List[MigrationKey]
+        for key in migrations:
+            order.append(key)
+            if key[1] is None:
+                states[key] = MigrationStatus(key[0], None,
+                                              'failed_to_start', 0.0)
+            else:
+                states[key] = MigrationStatus(key[0], key[1], 'queued', 0.0)
+                pending.append(key)
+
+        failures = {}  # type: Dict[MigrationKey, int]
+        interval = self.poll_interval
+        while pending and not should_stop(deadline):
+            if (self.max_wait is not None and
+                    self._clock() - begun >= self.max_wait):
+                logger.warning('Gave up waiting for {} blueprint '
+                               'migrations'.format(len(pending)))
+                for key in pending:
+                    states[key] = states[key]._replace(
+                        workflow_state=UNKNOWN_STATE)
+                break
+            still_pending = []
+            for blueprint_id, migration_id in pending:
+                key = (blueprint_id, migration_id)
+                try:
+                    migration = self.client.get_blueprint_migration(
+                        blueprint_id, str(migration_id)).json()
+                except Exception as e:
+                    failures[key] = failures.get(key, 0) + 1
+                    logger.debug('Could not poll migration {} of blueprint '
+                                 '{}: {!r}'.format(migration_id,
+                                                   blueprint_id, e))
+                    if failures[key] < self.max_poll_failures:
+                        still_pending.append(key)
+                    else:
+                        states[key] = MigrationStatus(
+                            blueprint_id, migration_id, UNKNOWN_STATE,
+                            self._clock() - begun)
+                    continue
+                failures[key] = 0
+                state = migration.get('workflow_state', UNKNOWN_STATE)
+                states[key] = MigrationStatus(
+                    blueprint_id, migration_id, state,
+                    self._clock() - begun)
+                if state not in FINISHED_STATES:
+                    still_pending.append(key)
+            pending = still_pending
+            if pending:
+                self._sleep(interval)
+                interval = min(interval * 2, self.max_poll_interval)
+        return [states[key] for key in order]
@@ -0,0 +1,218 @@
+"""
+Record and replay Canvas API traffic.
+
+A cassette is a list of recorded request/response pairs. It is stored on disk
+as newline-delimited JSON, gzip-compressed when the file name ends in ".gz".
+Response headers are kept in full (including "Link" and the
+"X-Rate-Limit-*" headers); request headers are never recorded, so access
+tokens do not end up on disk.
+
+Record a session by wrapping the requests library (or a session object):
+
+    >>> cassette = Cassette()
+    >>> recorder = RecordingSession(cassette)
+    >>> api = CanvasAPIv1(url, token, requests_lib=recorder)
+    >>> courses = list(api.get_account_courses('1'))
+    >>> cassette.save('courses.ndjson.gz')
+
+Replay it later, offline, with the recorded latencies scaled by `time_scale`:
+
+    >>> replay = ReplaySession(Cassette.load('courses.ndjson.gz'),
+    ...                        time_scale=0.5)
+    >>> api = CanvasAPIv1(url, requests_lib=replay)
+"""
+import gzip
+import io
+import json
+import threading
+import time
+from base64 import b64decode, b64encode
+from collections import defaultdict, deque
+from typing import (
+    Any, Callable, Deque, Dict, Iterable, Iterator, Optional, Tuple)
+from urllib.parse import urlencode
+
+from canvas_api_client.errors import CassetteMismatchError
+from canvas_api_client.response import SimpleResponse
+from canvas_api_client.transport import RequestsTransport, Transport
+from canvas_api_client.types import RequestParams, Response
+
+Interaction = Dict[str, Any]
+InteractionKey = Tuple[str, str, str]
+InteractionQueues = Dict[InteractionKey, Deque[Interaction]]
+
+
+def _open(path: str, mode: str):
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, mode + 'b'), encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def _canonical_params(params: RequestParams) -> str:
+    """
+    Returns a stable string form of the request params for matching.
+    """
+    if not params:
+        return ''
+    return urlencode(sorted(params.items()), doseq=True)
+
+
+def _interaction_key(method: str,
+                     url: str,
+                     params: RequestParams) -> InteractionKey:
+    return (method.upper(), url, _canonical_params(params))
+
+
+class Cassette(object):
+    """
+    An ordered collection of recorded interactions.
+    """
+
+    def __init__(self,
+                 interactions: Optional[Iterable[Interaction]] = None
+                 ) -> None:
+        self.interactions = list(interactions or [])
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.interactions)
+
+    def __iter__(self) -> Iterator[Interaction]:
+        return iter(self.interactions)
+
+    def append(self, interaction: Interaction) -> None:
+        with self._lock:
+            self.interactions.append(interaction)
+
+    @classmethod
+    def load(cls, path: str) -> 'Cassette':
+        """
+        Loads a cassette written by `Cassette.save()`.
+        """
+        with _open(path, 'r') as f:
+            return cls(json.loads(line) for line in f if line.strip())
+
+    def save(self, path: str) -> None:
+        """
+        Writes the cassette to `path`, one interaction per line.
+        """
+        with _open(path, 'w') as f:
+            for interaction in self.interactions:
+                f.write(json.dumps(interaction, separators=(',', ':')))
+                f.write('\n')
+
+
+def _encode_body(content: bytes) -> Dict[str, str]:
+    try:
+        return {'body': content.decode('utf-8')}
+    except UnicodeDecodeError:
+        return {'body_b64': b64encode(content).decode('ascii')}
+
+
+def _decode_body(interaction: Interaction) -> bytes:
+    if 'body_b64' in interaction:
+        return b64decode(interaction['body_b64'])
+    return interaction.get('body', '').encode('utf-8')
+
+
+class RecordingSession(Transport):
+    """
+    Wraps a transport (or requests library/session) and records every
+    request/response pair it sends into a cassette.
+
+    Pass an instance as the `requests_lib` argument of `CanvasAPIv1`.
+    """
+
+    def __init__(self,
+                 cassette: Cassette,
+                 requests_lib: Optional[Any] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        if not isinstance(requests_lib, Transport):
+            requests_lib = RequestsTransport(requests_lib)
+        self.cassette = cassette
+        self._transport = requests_lib
+        self._clock = clock
+
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        start = self._clock()
+        response = self._transport.request(method, url, **kwargs)
+        elapsed = self._clock() - start
+
+        interaction = {
+            'method': method.upper(),
+            'url': url,
+            'params': _canonical_params(kwargs.get('params')),
+            'status': response.status_code,
+            'reason': getattr(response, 'reason', ''),
+            'headers': dict(response.headers),
+            'elapsed': round(elapsed, 6),
+        }
+        interaction.update(_encode_body(response.content))
+        self.cassette.append(interaction)
+        return response
+
+
+class ReplaySession(Transport):
+    """
+    Serves responses from a cassette in place of the requests library.
+
+    Requests are matched on method, URL and params. Identical requests are
+    answered in the order they were recorded. Each response is delayed by its
+    recorded latency multiplied by `time_scale`: 1.0 replays the original
+    timing, 0.5 replays it twice as fast and 0 disables the delay.
+
+    If `allow_repeats` is set, the last matching interaction is served again
+    once the recorded ones are used up; otherwise a
+    `CassetteMismatchError` is raised.
+    """
+
+    def __init__(self,
+                 cassette: Cassette,
+                 time_scale: float = 1.0,
+                 allow_repeats: bool = False,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        self.time_scale = time_scale
+        self.allow_repeats = allow_repeats
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._queues = defaultdict(deque)  # type: InteractionQueues
+        self._last = {}  # type: Dict[InteractionKey, Interaction]
+        for interaction in cassette:
+            key = (interaction['method'], interaction['url'],
+                   interaction['params'])
+            self._queues[key].append(interaction)
+
+    def _next_interaction(self, key: InteractionKey) -> Interaction:
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue:
+                interaction = queue.popleft()
+                self._last[key] = interaction
+                return interaction
+            if self.allow_repeats and key in self._last:
+                return self._last[key]
+        raise CassetteMismatchError(
+            "No recorded interaction for {} {} with params '{}'".format(*key))
+
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        key = _interaction_key(method, url, kwargs.get('params'))
+        interaction = self._next_interaction(key)
+
+        delay = interaction.get('elapsed', 0.0) * self.time_scale
+        if delay > 0:
+            self._sleep(delay)
+
+        return SimpleResponse(
+            interaction['status'],
+            url,
+            headers=interaction.get('headers'),
+            content=_decode_body(interaction),
+            reason=interaction.get('reason', ''),
+            elapsed=delay)
+
+    def remaining(self) -> int:
+        """
+        Returns the number of recorded interactions not yet served.
+        """
+        with self._lock:
+            return sum(len(queue) for queue in self._queues.values())
@@ -0,0 +1,285 @@
+"""
+Command-line exporter for Canvas listings.
+
+Streams account courses or course users to NDJSON or CSV, on stdout or in
+a file, without holding the listing in memory:
+
+    $ export CANVAS_API_URL=https://canvas.example.edu/api/v1/
+    $ export CANVAS_API_TOKEN=...
+    $ canvas-export courses --account 1 --format ndjson -o courses.ndjson.gz
+    $ canvas-export users --course 101 --course 102 --concurrency 4 \\
+    >     --format csv --fields id,name,sis_user_id
+
+Several accounts or courses are fetched concurrently (`--concurrency`),
+and their pages are written as they arrive through a bounded queue, so
+memory use stays flat however long the listings are. A throughput summary
+is printed on stderr at the end.
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+from typing import (
+    Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO)
+
+from canvas_api_client.deadline import TimeBudget
+from canvas_api_client.transport import RequestsTransport
+from canvas_api_client.v1_client import CanvasAPIv1
+
+Listing = Callable[[], Iterable[List[Any]]]
+
+_DONE = object()
+
+
+def _parse_params(pairs: List[str]) -> Dict[str, Any]:
+    """
+    Turns key=value pairs into request params. Keys ending in [] collect
+    a list of values.
+    """
+    params = {}  # type: Dict[str, Any]
+    for pair in pairs:
+        key, sep, value = pair.partition('=')
+        if not sep:
+            raise argparse.ArgumentTypeError(
+                "Expected key=value, got '{}'".format(pair))
+        if key.endswith('[]'):
+            params.setdefault(key, []).append(value)
+        else:
+            params[key] = value
+    return params
+
+
+def _stream_pages(listings: List[Listing],
+                  concurrency: int) -> Iterator[List[Any]]:
+    """
+    Runs the listings on `concurrency` threads and yields their pages as
+    they arrive. At most two pages per thread are buffered, and an error in
+    any listing is raised here.
+    """
+    tasks = queue.Queue()  # type: queue.Queue
+    for listing in listings:
+        tasks.put(listing)
+    pages = queue.Queue(maxsize=2 * concurrency)  # type: queue.Queue
+    stop = threading.Event()
+
+    def work() -> None:
+        try:
+            while not stop.is_set():
+                try:
+                    listing = tasks.get_nowait()
+                except queue.Empty:
+                    break
+                for page in listing():
+                    if stop.is_set():
+                        break
+                    pages.put(page)
+        except Exception as e:
+            pages.put(e)
+        finally:
+            pages.put(_DONE)
+
+    workers = min(concurrency, len(listings))
+    for _ in range(workers):
+        threading.Thread(target=work, daemon=True).start()
+
+    try:
+        finished = 0
+        while finished < workers:
+            item = pages.get()
+            if item is _DONE:
+                finished += 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        stop.set()
+
+
+class _CountingWriter(object):
+    """
+    Counts the bytes written to a text stream, as encoded in UTF-8 (before
+    any compression).
+    """
+
+    def __init__(self, stream: TextIO) -> None:
+        self._stream = stream
+        self.written = 0
+
+    def write(self, text: str) -> int:
+        self.written += len(text.encode('utf-8'))
+        return self._stream.write(text)
+
+
+@contextmanager
+def _open_output(path: Optional[str], compress: bool) -> Iterator[TextIO]:
+    """
+    Opens the output file, or stdout if there is no path (or it is '-'),
+    gzip-compressed if asked to or if the path ends in .gz. Stdout is left
+    open.
+    """
+    to_close = []  # type: List[Any]
+    if path is None or path == '-':
+        binary = sys.stdout.buffer  # type: Any
+    else:
+        binary = open(path, 'wb')
+        to_close.append(binary)
+        compress = compress or path.endswith('.gz')
+    if compress:
+        binary = gzip.GzipFile(fileobj=binary, mode='wb')
+        to_close.insert(0, binary)
+
+    out = io.TextIOWrapper(binary, encoding='utf-8', newline='')
+    try:
+        yield out
+    finally:
+        out.flush()
+        out.detach()
+        for f in to_close:
+            f.close()
+        sys.stdout.flush()
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(',', ':'))
+    return value
+
+
+def export(pages: Iterable[List[Any]],
+           out: TextIO,
+           output_format: str = 'ndjson',
+           fields: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    Writes the records of each page to `out` and returns the number of
+    records, pages and (UTF-8) bytes written. CSV columns are `fields`, or
+    the keys of the first record; nested values are written as JSON.
+    """
+    writer = _CountingWriter(out)
+    csv_writer = None
+    records = page_count = 0
+    for page in pages:
+        page_count += 1
+        for record in page:
+            if output_format == 'csv':
+                if csv_writer is None:
+                    csv_writer = csv.DictWriter(
+                        writer, fields or list(record),
+                        extrasaction='ignore')
+                    csv_writer.writeheader()
+                csv_writer.writerow(
+                    {k: _csv_value(v) for k, v in record.items()})
+            else:
+                writer.write(json.dumps(record, separators=(',', ':')))
+                writer.write('\n')
+            records += 1
+    return {'records': records, 'pages': page_count,
+            'bytes': writer.written}
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='canvas-export',
+        description='Stream Canvas listings to NDJSON or CSV.')
+    parser.add_argument('listing', choices=['courses', 'users'],
+                        help='courses of accounts, or users of courses')
+    parser.add_argument('--account', action='append', default=[],
+                        help='account ID (repeatable), for courses')
+    parser.add_argument('--course', action='append', default=[],
+                        help='course ID (repeatable), for users')
+    parser.add_argument('--sis', action='store_true',
+                        help='the IDs given are SIS IDs')
+    parser.add_argument('--format', dest='output_format', default='ndjson',
+                        choices=['ndjson', 'csv'])
+    parser.add_argument('--fields', type=lambda s: s.split(','),
+                        help='comma-separated CSV columns')
+    parser.add_argument('-o', '--output', help='output file (default: '
+                        'stdout); compressed if it ends in .gz')
+    parser.add_argument('--gzip', action='store_true',
+                        help='gzip the output')
+    parser.add_argument('--param', action='append', default=[],
+                        help='extra request param as key=value (repeatable)')
+    parser.add_argument('--per-page', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='listings fetched at once')
+    parser.add_argument('--time-limit', type=float,
+                        help='stop after this many seconds, keeping the '
+                        'records exported so far')
+    parser.add_argument('--api-url',
+                        default=os.environ.get('CANVAS_API_URL'),
+                        help='default: $CANVAS_API_URL')
+    parser.add_argument('--token',
+                        default=os.environ.get('CANVAS_API_TOKEN'),
+                        help='default: $CANVAS_API_TOKEN')
+    return parser
+
+
+def _listings(client: CanvasAPIv1,
+              args: argparse.Namespace,
+              params: Dict[str, Any],
+              budget: Optional[TimeBudget]) -> List[Listing]:
+    if args.listing == 'courses':
+        account_ids = ['sis_account_id:{}'.format(account_id)
+                       if args.sis else account_id
+                       for account_id in args.account]
+        return [partial(client.get_account_courses, account_id,
+                        params=params, deadline=budget)
+                for account_id in account_ids]
+    return [partial(client.get_course_users, course_id,
+                    is_sis_course_id=args.sis, params=params,
+                    deadline=budget)
+            for course_id in args.course]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    if not args.api_url:
+        parser.error('--api-url or CANVAS_API_URL is required')
+    ids = args.account if args.listing == 'courses' else args.course
+    if not ids:
+        parser.error('{} needs at least one --{}'.format(
+            args.listing, 'account' if args.listing == 'courses'
+            else 'course'))
+    try:
+        params = _parse_params(args.param)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    concurrency = max(1, args.concurrency)
+    client = CanvasAPIv1(
+        args.api_url, args.token,
+        requests_lib=RequestsTransport(pool_maxsize=max(10, concurrency)),
+        per_page=args.per_page)
+    budget = None  # type: Optional[TimeBudget]
+    if args.time_limit is not None:
+        budget = TimeBudget(args.time_limit)
+
+    started = time.monotonic()
+    with _open_output(args.output, args.gzip) as out:
+        pages = _stream_pages(
+            _listings(client, args, params, budget), concurrency)
+        totals = export(pages, out, args.output_format, args.fields)
+    seconds = time.monotonic() - started
+
+    print('Exported {records} records ({pages} pages, {mb:.1f} MB) in '
+          '{seconds:.1f}s: {rate:.0f} records/s{partial}'.format(
+              records=totals['records'], pages=totals['pages'],
+              mb=totals['bytes'] / 1e6, seconds=seconds,
+              rate=totals['records'] / seconds if seconds else 0.0,
+              partial=' (time limit reached, partial export)'
+              if budget is not None and budget.exhausted else ''),
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,288 @@
+"""
+Columnar export of listing items for analytics.
+
+A `ColumnarCollector` keeps only the selected fields of each record, in
+typed arrays: integers and floats in `array` buffers, categoricals (roles,
+states) as integer codes into a list of distinct values, and strings in
+lists. Records are dropped once added, so memory grows with the columns
+selected rather than with the full JSON objects.
+
+    >>> collector = ColumnarCollector({
+    ...     'id': 'int',
+    ...     'sis_user_id': 'str',
+    ...     'role': ColumnSpec('enrollments.0.role', 'category'),
+    ...     'state': ColumnSpec('enrollments.0.enrollment_state', 'category'),
+    ... })
+    >>> collector.extend(api.get_course_users('1234', flatten_response=True))
+    >>> columns = collector.to_numpy()            # requires numpy
+    >>> table = collector.to_arrow()              # requires pyarrow
+
+Large listings can be written to Parquet in batches with `write_parquet`,
+holding one batch in memory at a time. numpy and pyarrow are optional
+dependencies (`pip install canvas_api_client[numpy,arrow]`), imported only
+when used.
+"""
+import math
+from array import array
+from itertools import islice
+from typing import (
+    Any, Dict, Iterable, Iterator, List, NamedTuple, Tuple, Union)
+
+from canvas_api_client.progress import iter_records
+
+INT = 'int'
+FLOAT = 'float'
+CATEGORY = 'category'
+STR = 'str'
+
+ColumnSpec = NamedTuple('ColumnSpec', [
+    ('path', str),
+    ('kind', str),
+])
+
+Columns = Dict[str, Union[str, ColumnSpec]]
+
+
+def _split_path(path: str) -> Tuple[Union[str, int], ...]:
+    return tuple(int(part) if part.isdigit() else part
+                 for part in path.split('.'))
+
+
+def _get_path(record: Any, parts: Tuple[Union[str, int], ...]) -> Any:
+    """
+    Returns the value at a split dotted path, where numeric parts index
+    lists, or None if the path does not exist.
+    """
+    value = record
+    for part in parts:
+        if isinstance(value, dict):
+            value = value.get(part)
+        elif isinstance(value, list) and isinstance(part, int):
+            value = value[part] if part < len(value) else None
+        else:
+            return None
+        if value is None:
+            return None
+    return value
+
+
+class _Column(object):
+
+    def __init__(self, path: str, kind: str) -> None:
+        if kind not in (INT, FLOAT, CATEGORY, STR):
+            raise ValueError("Unknown column kind '{}'".format(kind))
+        self.path = path
+        self.parts = _split_path(path)
+        self.kind = kind
+        self.categories = []  # type: List[str]
+        self._codes = {}  # type: Dict[str, int]
+        self.append = {
+            INT: self._append_int,
+            FLOAT: self._append_float,
+            CATEGORY: self._append_category,
+            STR: self._append_str,
+        }[kind]
+        self.clear()
+
+    def clear(self) -> None:
+        """
+        Drops the values but keeps the categories, so codes stay stable
+        from one batch to the next.
+        """
+        if self.kind == INT:
+            self.values = array('q')  # type: Any
+            self.missing = bytearray()
+        elif self.kind == FLOAT:
+            self.values = array('d')
+        elif self.kind == CATEGORY:
+            self.values = array('i')
+        else:
+            self.values = []
+
+    def _append_int(self, value: Any) -> None:
+        self.missing.append(value is None)
+        self.values.append(0 if value is None else int(value))
+
+    def _append_float(self, value: Any) -> None:
+        self.values.append(math.nan if value is None else float(value))
+
+    def _append_category(self, value: Any) -> None:
+        if value is None:
+            self.values.append(-1)
+            return
+        value = str(value)
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.categories)
+            self.categories.append(value)
+        self.values.append(code)
+
+    def _append_str(self, value: Any) -> None:
+        self.values.append(None if value is None else str(value))
+
+    def to_numpy(self) -> Any:
+        import numpy
+
+        if self.kind == INT:
+            values = numpy.frombuffer(self.values, dtype=numpy.int64).copy()
+            if any(self.missing):
+                mask = numpy.frombuffer(self.missing, dtype=numpy.bool_)
+                return numpy.ma.masked_array(values, mask=mask.copy())
+            return values
+        if self.kind == FLOAT:
+            return numpy.frombuffer(self.values, dtype=numpy.float64).copy()
+        if self.kind == CATEGORY:
+            return numpy.frombuffer(self.values, dtype=numpy.int32).copy()
+        return numpy.array(self.values, dtype=object)
+
+    def to_arrow(self) -> Any:
+        import numpy
+        import pyarrow
+
+        if self.kind == INT:
+            values = numpy.frombuffer(self.values, dtype=numpy.int64)
+            mask = numpy.frombuffer(self.missing, dtype=numpy.bool_)
+            return pyarrow.array(values, mask=mask, type=pyarrow.int64())
+        if self.kind == FLOAT:
+            return pyarrow.array(
+                numpy.frombuffer(self.values, dtype=numpy.float64),
+                from_pandas=True)
+        if self.kind == CATEGORY:
+            codes = numpy.frombuffer(self.values, dtype=numpy.int32)
+            return pyarrow.DictionaryArray.from_arrays(
+                pyarrow.array(codes, mask=codes < 0, type=pyarrow.int32()),
+                pyarrow.array(self.categories, type=pyarrow.string()))
+        return pyarrow.array(self.values, type=pyarrow.string())
+
+
+class ColumnarCollector(object):
+    """
+    Collects the given columns of records. `columns` maps each column name
+    to its kind ('int', 'float', 'category' or 'str'), or to a `ColumnSpec`
+    to read it from a different (dotted) path.
+    """
+
+    def __init__(self, columns: Columns) -> None:
+        self._columns = {}  # type: Dict[str, _Column]
+        for name, spec in columns.items():
+            if not isinstance(spec, ColumnSpec):
+                spec = ColumnSpec(name, spec)
+            self._columns[name] = _Column(spec.path, spec.kind)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self._columns)
+
+    def add(self, record: Dict[str, Any]) -> None:
+        for column in self._columns.values():
+            column.append(_get_path(record, column.parts))
+        self._count += 1
+
+    def extend(self, records: Iterable[Any]) -> int:
+        """
+        Adds every record, or every record of every page, and returns how
+        many were added.
+        """
+        count = self._count
+        for record in iter_records(records):
+            self.add(record)
+        return self._count - count
+
+    def values(self, name: str) -> List[Any]:
+        """
+        Returns the values of a column as a list, with categoricals decoded
+        and missing values as None.
+        """
+        column = self._columns[name]
+        if column.kind == INT:
+            return [None if missing else value
+                    for value, missing in zip(column.values, column.missing)]
+        if column.kind == FLOAT:
+            return [None if math.isnan(v) else v for v in column.values]
+        if column.kind == CATEGORY:
+            return [column.categories[c] if c >= 0 else None
+                    for c in column.values]
+        return list(column.values)
+
+    def categories(self, name: str) -> List[str]:
+        """
+        Returns the distinct values of a categorical column, indexed by code.
+        """
+        return list(self._columns[name].categories)
+
+    def clear(self) -> None:
+        """
+        Drops the collected values. Categories are kept, so the codes of a
+        categorical column mean the same thing in every batch.
+        """
+        for column in self._columns.values():
+            column.clear()
+        self._count = 0
+
+    def to_numpy(self) -> Dict[str, Any]:
+        """
+        Returns a numpy array per column. Integer columns with missing
+        values are masked arrays, and categorical columns hold int32 codes
+        (-1 for missing) into `categories(name)`, as
+        `pandas.Categorical.from_codes` expects.
+        """
+        return {name: column.to_numpy()
+                for name, column in self._columns.items()}
+
+    def to_arrow(self) -> Any:
+        """
+        Returns a `pyarrow.Table`, with categorical columns dictionary
+        encoded.
+        """
+        import pyarrow
+
+        return pyarrow.Table.from_arrays(
+            [column.to_arrow() for column in self._columns.values()],
+            names=self.column_names)
+
+    def batches(self,
+                records: Iterable[Any],
+                batch_size: int = 10000) -> Iterator['ColumnarCollector']:
+        """
+        Collects the records (or pages) in batches of `batch_size`, yielding
+        this collector each time it holds a batch. The collector is cleared
+        before each batch.
+        """
+        items = iter_records(records)
+        while True:
+            self.clear()
+            self.extend(islice(items, batch_size))
+            if not self._count:
+                return
+            yield self
+
+
+def write_parquet(path: str,
+                  records: Iterable[Any],
+                  columns: Columns,
+                  batch_size: int = 10000) -> int:
+    """
+    Writes the given columns of the records (or pages) to a Parquet file,
+    one row group per batch, and returns the number of rows written. No
+    file is written if there are no records.
+    """
+    import pyarrow.parquet
+
+    collector = ColumnarCollector(columns)
+    writer = None
+    rows = 0
+    try:
+        for batch in collector.batches(records, batch_size):
+            table = batch.to_arrow()
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            rows += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
@@ -0,0 +1,101 @@
+"""
+Deadlines and time budgets for API calls.
+
+A `Deadline` bounds a single call, including every page of a paginated
+listing: once it passes, no further requests are sent and
+`DeadlineExceeded` is raised. Each request's timeout is also shortened so it
+cannot run past the deadline.
+
+A `TimeBudget` bounds a whole bulk operation, such as a crawl over many
+listings. When it runs out, paginated listings and bulk operations stop
+cleanly instead of raising, so the caller keeps the results gathered so far;
+`budget.exhausted` tells whether the results are partial.
+"""
+import time
+from typing import Callable, Optional
+
+from canvas_api_client.errors import DeadlineExceeded
+from canvas_api_client.types import Timeout
+
+
+class Deadline(object):
+    """
+    A point in time, `seconds` from now, by which a call must finish.
+    """
+
+    def __init__(self,
+                 seconds: float,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self.expires_at = clock() + seconds
+
+    def remaining(self) -> float:
+        """
+        Returns the number of seconds left, or 0 if the deadline has passed.
+        """
+        return max(0.0, self.expires_at - self._clock())
+
+    def expired(self) -> bool:
+        return self._clock() >= self.expires_at
+
+    def check(self) -> None:
+        """
+        Raises `DeadlineExceeded` if the deadline has passed.
+        """
+        if self.expired():
+            raise DeadlineExceeded(
+                'Deadline exceeded by {:.3f}s'.format(
+                    self._clock() - self.expires_at))
+
+    def timeout(self, timeout: Timeout = None) -> Timeout:
+        """
+        Returns a request timeout that ends no later than the deadline,
+        given the client's (connect, read) or total timeout.
+        """
+        remaining = self.remaining()
+        if timeout is None:
+            return remaining
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return (min(connect, remaining), min(read, remaining))
+        return min(timeout, remaining)
+
+    def __repr__(self) -> str:
+        return '<{} remaining={:.3f}s>'.format(
+            type(self).__name__, self.remaining())
+
+
+class TimeBudget(Deadline):
+    """
+    A deadline for bulk operations, which stop early and return partial
+    results when it runs out instead of raising `DeadlineExceeded`.
+    """
+
+    def __init__(self,
+                 seconds: float,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        super(TimeBudget, self).__init__(seconds, clock=clock)
+        self.exhausted = False
+
+    def stop(self) -> bool:
+        """
+        Returns True (and marks the budget exhausted) if a bulk operation
+        should stop now.
+        """
+        if self.expired():
+            self.exhausted = True
+        return self.exhausted
+
+
+def should_stop(deadline: Optional[Deadline]) -> bool:
+    """
+    Decides whether a bulk operation should stop before its next request:
+    True if a time budget has run out, raises `DeadlineExceeded` if a plain
+    deadline has passed, and False otherwise.
+    """
+    if deadline is None:
+        return False
+    if isinstance(deadline, TimeBudget):
+        return deadline.stop()
+    deadline.check()
+    return False
@@ -3,3 +3,26 @@ class APIPaginationException(Exception):
     Raise this exception if the response does not have pagination enabled.
     """
     pass
+
+
+class CassetteMismatchError(Exception):
+    """
+    Raise this exception if a replayed request has no matching recorded
+    interaction in the cassette.
+    """
+    pass
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raise this exception if a request or paginated listing could not finish
+    before its deadline.
+    """
+    pass
+
+
+class GraphQLError(Exception):
+    """
+    Raise this exception if a GraphQL response reports errors.
+    """
+    pass
@@ -0,0 +1,155 @@
+"""
+Hedged requests for idempotent reads.
+
+If a GET has not answered within a delay derived from recent latencies (by
+default the 95th percentile), a `HedgingPolicy` sends a duplicate and returns
+whichever response arrives first. Hedges are capped at a fraction of all
+requests (`max_extra_load`), so the extra load on Canvas stays bounded even
+when it is slow across the board.
+
+Calls run on a pool of `max_workers` threads. Latencies and the hedging
+delay are measured from when a call starts running, not from when it was
+queued, so a saturated pool does not trigger hedges by itself.
+"""
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED, Future, ThreadPoolExecutor, wait)
+from typing import Any, Callable, Deque, NamedTuple, Tuple
+
+HedgingStats = NamedTuple('HedgingStats', [
+    ('requests', int),
+    ('hedged', int),
+    ('hedge_wins', int),
+    ('denied', int),
+    ('delay', float),
+])
+
+Latencies = Deque[float]
+
+
+class HedgingPolicy(object):
+    """
+    Runs calls with hedging. Pass an instance as the `hedging` argument of
+    `CanvasAPIv1` to hedge its GET requests.
+
+    Until `min_samples` latencies have been observed, `initial_delay` is
+    used as the hedging delay. After that, the delay is the given
+    `percentile` of the last `window` latencies, clamped to
+    [`min_delay`, `max_delay`].
+    """
+
+    def __init__(self,
+                 percentile: float = 95.0,
+                 initial_delay: float = 1.0,
+                 min_delay: float = 0.05,
+                 max_delay: float = 10.0,
+                 max_extra_load: float = 0.05,
+                 window: int = 500,
+                 min_samples: int = 20,
+                 max_workers: int = 16,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_extra_load = max_extra_load
+        self.min_samples = min_samples
+        self._clock = clock
+        self._latencies = deque(maxlen=window)  # type: Latencies
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._requests = 0
+        self._hedged = 0
+        self._hedge_wins = 0
+        self._denied = 0
+
+    def delay(self) -> float:
+        """
+        Returns how long to wait for a response before hedging.
+        """
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.initial_delay
+            samples = sorted(self._latencies)
+        rank = int(math.ceil(self.percentile / 100.0 * len(samples))) - 1
+        value = samples[max(0, min(rank, len(samples) - 1))]
+        return min(max(value, self.min_delay), self.max_delay)
+
+    def _submit(self,
+                fn: Callable[[], Any]) -> Tuple[Future, threading.Event]:
+        """
+        Queues `fn()` on the pool. The returned event is set when it starts
+        running (or is cancelled), and its latency is recorded from then
+        if it succeeds.
+        """
+        started = threading.Event()
+
+        def run() -> Any:
+            began = self._clock()
+            started.set()
+            result = fn()
+            with self._lock:
+                self._latencies.append(self._clock() - began)
+            return result
+
+        future = self._executor.submit(run)
+        future.add_done_callback(lambda _: started.set())
+        return future, started
+
+    def _allow_hedge(self) -> bool:
+        with self._lock:
+            if self._hedged + 1 > self.max_extra_load * self._requests:
+                self._denied += 1
+                return False
+            self._hedged += 1
+            return True
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        """
+        Runs `fn()`, hedging it with a second `fn()` if the first is slow.
+        `fn` must be safe to run twice.
+        """
+        with self._lock:
+            self._requests += 1
+
+        primary, started = self._submit(fn)
+        started.wait()
+        wait([primary], timeout=self.delay())
+        if primary.done() or not self._allow_hedge():
+            return primary.result()
+
+        hedge, _ = self._submit(fn)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self._hedge_wins += 1
+                    return future.result()
+        # Both attempts failed: report the original request's error.
+        return primary.result()
+
+    def stats(self) -> HedgingStats:
+        """
+        Returns how many calls were made and hedged, how many hedges
+        answered first, how many hedges the load cap denied, and the current
+        hedging delay.
+        """
+        delay = self.delay()
+        with self._lock:
+            return HedgingStats(requests=self._requests,
+                                hedged=self._hedged,
+                                hedge_wins=self._hedge_wins,
+                                denied=self._denied,
+                                delay=delay)
+
+    def shutdown(self) -> None:
+        """
+        Stops the worker threads once pending calls finish.
+        """
+        self._executor.shutdown(wait=False)
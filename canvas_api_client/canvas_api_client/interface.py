@@ -1,9 +1,9 @@
 from abc import ABCMeta, abstractmethod
-from typing import Iterator, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
-from canvas_api_client.types import RequestParams
-
-from requests import Response
+from canvas_api_client.deadline import Deadline
+from canvas_api_client.progress import ProgressCallback
+from canvas_api_client.types import RequestParams, Response
 
 
 class CanvasAPIClient(metaclass=ABCMeta):
@@ -16,7 +16,9 @@ class CanvasAPIClient(metaclass=ABCMeta):
     @abstractmethod
     def get_account_courses(self,
                             account_id: str,
-                            params: RequestParams = None
+                            params: RequestParams = None,
+                            deadline: Optional[Deadline] = None,
+                            progress_callback: ProgressCallback = None
                             ) -> Iterator[Response]:
         """
         Returns a generator of courses for a given account.
@@ -36,11 +38,25 @@ class CanvasAPIClient(metaclass=ABCMeta):
                          course_id: str,
                          is_sis_course_id: bool = False,
                          flatten_response: Optional[bool] = None,
-                         params: RequestParams = None) -> Iterator[Response]:
+                         params: RequestParams = None,
+                         deadline: Optional[Deadline] = None,
+                         progress_callback: ProgressCallback = None
+                         ) -> Iterator[Response]:
         """
         Returns a generator of course enrollments for a given course.
         """
 
+    @abstractmethod
+    def add_enrollment(self,
+                       course_id: str,
+                       user_id: str,
+                       enrollment_type: str = 'StudentEnrollment',
+                       is_sis_course_id: bool = False,
+                       params: RequestParams = None) -> Response:
+        """
+        Enrolls a user in a given course.
+        """
+
     @abstractmethod
     def delete_enrollment(self,
                           course_id: str,
@@ -66,6 +82,16 @@ class CanvasAPIClient(metaclass=ABCMeta):
         Creates a new wiki page for a given course
         """
 
+    @abstractmethod
+    def get_page(self,
+                 course_id: str,
+                 url: str,
+                 is_sis_course_id: bool = False,
+                 params: RequestParams = None) -> Response:
+        """
+        Gets a wiki page of a given course.
+        """
+
     @abstractmethod
     def import_sis_data(self,
                         account_id: str,
@@ -130,3 +156,31 @@ class CanvasAPIClient(metaclass=ABCMeta):
         """
         Get all the blueprint courses in a given account
         """
+
+    @abstractmethod
+    def start_blueprint_migration(self,
+                                  course_id: str,
+                                  comment: Optional[str] = None,
+                                  send_notification: bool = False,
+                                  params: RequestParams = None) -> Response:
+        """
+        Starts syncing a blueprint course to its associated courses.
+        """
+
+    @abstractmethod
+    def get_blueprint_migration(self,
+                                course_id: str,
+                                migration_id: str,
+                                params: RequestParams = None) -> Response:
+        """
+        Gets the status of a blueprint course's migration.
+        """
+
+    @abstractmethod
+    def graphql(self,
+                query: str,
+                variables: Optional[Dict[str, Any]] = None,
+                deadline: Optional[Deadline] = None) -> Response:
+        """
+        Sends a query to the Canvas GraphQL API.
+        """
@@ -0,0 +1,239 @@
+"""
+A durable journal of mutations, so bulk write jobs can resume.
+
+A `MutationJournal` appends a line to a local file when a mutation is
+planned and when it completes or fails. A job that is restarted with the
+same journal skips the mutations that completed and retries the others:
+
+    >>> with MutationJournal('publish-pages.journal') as journal:
+    ...     report = journal.run_all(
+    ...         ('page:{}:{}'.format(course_id, url),
+    ...          partial(api.put_page, course_id, body, url=url))
+    ...         for course_id, url, body in pages)
+    >>> report.applied, report.skipped, report.failed
+
+Each mutation is identified by a key chosen by the job; include a hash of
+the payload in it if changed content should be written again.
+
+Journal lines are written in batches: they are appended and fsync'd
+together once `batch_size` lines are waiting or the oldest has waited
+`max_delay` seconds, and on `sync()` and `close()`. If the process dies,
+at most the completions of the last unsynced batch are lost, and those
+mutations are sent again on resume.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple)
+
+from canvas_api_client.deadline import Deadline, should_stop
+
+PLANNED = 'planned'
+DONE = 'done'
+FAILED = 'failed'
+
+JournalReport = NamedTuple('JournalReport', [
+    ('applied', int),
+    ('skipped', int),
+    ('failed', int),
+    ('errors', List[Tuple[str, str]]),
+    ('unsent', List[str]),
+])
+
+# A mutation's key and a function that sends it.
+Mutation = Tuple[str, Callable[[], Any]]
+
+# The last recorded state of each mutation, by key.
+MutationStates = Dict[str, str]
+
+
+class MutationJournal(object):
+    """
+    An append-only journal at `path`, loaded if it exists. It can be used
+    from several threads.
+    """
+
+    def __init__(self,
+                 path: str,
+                 batch_size: int = 64,
+                 max_delay: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._states = {}  # type: MutationStates
+        self._buffer = []  # type: List[str]
+        self._oldest = None  # type: Optional[float]
+        self._load()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _load(self) -> None:
+        """
+        Replays the journal. A torn last line, left by a crash during a
+        write, is ignored and cut off, so the next entry starts on a line
+        of its own.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            with open(self.path, 'r+b') as f:
+                f.truncate(end)
+                f.flush()
+                os.fsync(f.fileno())
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line.decode('utf-8'))
+            except ValueError:
+                continue
+            self._states[entry['key']] = entry['state']
+
+    def __enter__(self) -> 'MutationJournal':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def state(self, key: str) -> Optional[str]:
+        """
+        Returns the last recorded state of a mutation ('planned', 'done' or
+        'failed'), or None if it was never planned.
+        """
+        with self._lock:
+            return self._states.get(key)
+
+    def completed(self, key: str) -> bool:
+        return self.state(key) == DONE
+
+    def pending(self) -> List[str]:
+        """
+        Returns the keys of mutations that were planned or failed but not
+        completed, such as those in flight when a job died.
+        """
+        with self._lock:
+            return [key for key, state in self._states.items()
+                    if state != DONE]
+
+    def record(self, key: str, state: str, **details) -> None:
+        """
+        Appends an entry for a mutation. Entries are written and fsync'd in
+        batches.
+        """
+        entry = dict({'key': key, 'state': state}, **details)
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._states[key] = state
+            self._buffer.append(line)
+            if self._oldest is None:
+                self._oldest = self._clock()
+            if (len(self._buffer) >= self.batch_size or
+                    self._clock() - self._oldest >= self.max_delay):
+                self._write()
+
+    def _write(self) -> None:
+        if not self._buffer:
+            return
+        self._file.write(''.join(self._buffer))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._buffer = []
+        self._oldest = None
+
+    def sync(self) -> None:
+        """
+        Writes and fsyncs the entries waiting in the batch.
+        """
+        with self._lock:
+            self._write()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+            self._write()
+            self._file.close()
+
+    def apply(self, key: str, send: Callable[[], Any]) -> Any:
+        """
+        Sends a mutation unless it already completed, recording the
+        outcome, and returns its result (None if it was skipped). Errors
+        are recorded and raised.
+        """
+        if self.completed(key):
+            return None
+        self.record(key, PLANNED)
+        try:
+            result = send()
+        except Exception as e:
+            self.record(key, FAILED, error=repr(e))
+            raise
+        self.record(key, DONE,
+                    status=getattr(result, 'status_code', None))
+        return result
+
+    def run_all(self,
+                mutations: Iterable[Mutation],
+                max_workers: int = 1,
+                deadline: Optional[Deadline] = None) -> JournalReport:
+        """
+        Applies the `(key, send)` mutations that have not completed yet, on
+        up to `max_workers` threads, and syncs the journal. Failures are
+        recorded and reported, and do not stop the others. With a time
+        budget, no mutation is sent after it runs out; the keys of those
+        left are reported as unsent.
+        """
+        counts = {'applied': 0, 'skipped': 0, 'failed': 0}
+        errors = []  # type: List[Tuple[str, str]]
+        unsent = []  # type: List[str]
+        lock = threading.Lock()
+        slots = threading.BoundedSemaphore(2 * max_workers)
+
+        def run(key: str, send: Callable[[], Any]) -> None:
+            try:
+                self.apply(key, send)
+            except Exception as e:
+                with lock:
+                    counts['failed'] += 1
+                    errors.append((key, repr(e)))
+            else:
+                with lock:
+                    counts['applied'] += 1
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers) as executor:
+            for key, send in mutations:
+                if self.completed(key):
+                    counts['skipped'] += 1
+                    continue
+                if unsent or should_stop(deadline):
+                    unsent.append(key)
+                    continue
+                slots.acquire()
+                executor.submit(run, key, send)
+        self.sync()
+        return JournalReport(errors=errors, unsent=unsent, **counts)
+
+    def compact(self) -> None:
+        """
+        Rewrites the journal with one entry per mutation, atomically.
+        """
+        with self._lock:
+            self._write()
+            self._file.close()
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for key, state in self._states.items():
+                    f.write(json.dumps({'key': key, 'state': state},
+                                       separators=(',', ':')) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+            self._file = open(self.path, 'a', encoding='utf-8')
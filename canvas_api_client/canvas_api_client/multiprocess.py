@@ -0,0 +1,285 @@
+"""
+Multi-process crawls of paginated listings.
+
+A threaded crawl spends most of its CPU time decoding JSON and transforming
+records, which runs on one core because of the GIL. A `ShardedCrawler`
+spreads that work over a pool of processes, each with its own client and
+connection pool:
+
+    >>> with ShardedCrawler(url, token, processes=4) as crawler:
+    ...     for page in crawler.get_account_courses('1'):
+    ...         pass
+
+Listings are sharded by page: the first page is fetched in this process,
+and the page count from its `last` Link relation is split between the
+workers, which fetch the pages with `page=N`. Listings without a numbered
+`last` link (bookmark pagination) are followed page by page in this
+process instead. `get_courses_users` shards a list of courses, one course
+per task.
+
+The listing methods take the same arguments as the client's and return a
+`PaginatedIterator`, so their progress is tracked the same way. A deadline
+is passed on to the workers' requests.
+
+Results come back in listing order, pickled, which is much cheaper to load
+than the JSON they were decoded from; an optional `transform`, applied to
+each record in the workers, can also shrink them. The transform and the
+client keyword arguments must be picklable (e.g. a module-level function,
+not a lambda, and no `requests_lib`).
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from functools import partial
+from typing import (
+    Any, Callable, Deque, Dict, Iterator, List, NamedTuple, Optional,
+    Sequence, Tuple)
+
+from canvas_api_client.deadline import Deadline, TimeBudget, should_stop
+from canvas_api_client.progress import (
+    PageProgress, PaginatedIterator, ProgressCallback, last_page_number)
+from canvas_api_client.types import RequestParams, Response
+from canvas_api_client.v1_client import CanvasAPIv1
+
+Transform = Optional[Callable[[Dict[str, Any]], Any]]
+
+# (api_url, api_token, client keyword arguments)
+ClientArgs = Tuple[str, Any, Dict[str, Any]]
+
+PendingTasks = Deque[Future]
+
+# The Link relations of a page fetched by a worker, which is all the
+# progress tracker reads from a response.
+PageLinks = NamedTuple('PageLinks', [('links', Dict[str, Any])])
+
+_clients = {}  # type: Dict[str, CanvasAPIv1]
+_clients_lock = threading.Lock()
+
+
+def _worker_client(client_args: ClientArgs) -> CanvasAPIv1:
+    """
+    Returns the client of this worker for the given arguments, creating it
+    on first use so its connection pool is reused by later tasks.
+    """
+    key = repr(client_args)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            api_url, api_token, kwargs = client_args
+            client = _clients[key] = CanvasAPIv1(api_url, api_token, **kwargs)
+        return client
+
+
+def _apply(records: List[Any], transform: Transform) -> List[Any]:
+    if transform is None:
+        return records
+    return [transform(record) for record in records]
+
+
+def _fetch_page(client_args: ClientArgs,
+                url: str,
+                params: Dict[str, Any],
+                page: int,
+                transform: Transform,
+                deadline: Optional[Deadline]
+                ) -> Tuple[List[Any], Dict[str, Any], float]:
+    """
+    Returns the records of a page, its Link relations and the seconds it
+    took to fetch.
+    """
+    client = _worker_client(client_args)
+    started = time.monotonic()
+    response = client._get(url, params=dict(params, page=page),
+                           deadline=deadline)
+    seconds = time.monotonic() - started
+    return _apply(response.json(), transform), response.links, seconds
+
+
+def _fetch_course_users(client_args: ClientArgs,
+                        course_id: str,
+                        is_sis_course_id: Optional[bool],
+                        params: RequestParams,
+                        transform: Transform,
+                        deadline: Optional[Deadline]) -> List[Any]:
+    client = _worker_client(client_args)
+    users = client.get_course_users(
+        course_id, is_sis_course_id=is_sis_course_id, flatten_response=True,
+        params=params, deadline=deadline)
+    return _apply(list(users), transform)
+
+
+class ShardedCrawler(object):
+    """
+    Crawls listings with a pool of `processes` worker processes (by
+    default, one per core). Other keyword arguments are passed to the
+    `CanvasAPIv1` clients.
+
+    `executor` replaces the process pool with any `concurrent.futures`
+    executor; it is not shut down by `close()`. At most `max_pending`
+    pages (by default, two per process) are fetched ahead of the caller.
+    """
+
+    def __init__(self,
+                 api_url: str,
+                 api_token: Optional[str] = None,
+                 processes: Optional[int] = None,
+                 transform: Transform = None,
+                 executor: Optional[Executor] = None,
+                 max_pending: Optional[int] = None,
+                 **client_kwargs) -> None:
+        self._client_args = (api_url, api_token, client_kwargs)
+        self._client = CanvasAPIv1(api_url, api_token, **client_kwargs)
+        self._transform = transform
+        self._owns_executor = executor is None
+        if executor is None:
+            executor = ProcessPoolExecutor(processes)
+        self._executor = executor
+        processes = processes or os.cpu_count() or 1
+        self._max_pending = max_pending or 2 * processes
+
+    def __enter__(self) -> 'ShardedCrawler':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._owns_executor:
+            self._executor.shutdown()
+
+    def _ordered(self, tasks: Iterator[Callable[[], Future]],
+                 deadline: Optional[Deadline]) -> Iterator[Any]:
+        """
+        Submits the tasks, keeping at most `max_pending` in flight, and
+        yields their results in order. No task is submitted once a time
+        budget has run out.
+        """
+        pending = deque()  # type: PendingTasks
+        try:
+            while True:
+                while (len(pending) < self._max_pending and
+                       not should_stop(deadline)):
+                    submit = next(tasks, None)
+                    if submit is None:
+                        break
+                    pending.append(submit())
+                if not pending:
+                    return
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _get(self,
+             url: str,
+             params: RequestParams,
+             deadline: Optional[Deadline],
+             progress: PageProgress) -> Tuple[Response, List[Any]]:
+        """
+        Fetches a page in this process, records it in the progress and
+        returns the response with its records.
+        """
+        started = time.monotonic()
+        response = self._client._get(url, params=params, deadline=deadline)
+        seconds = time.monotonic() - started
+        records = _apply(response.json(), self._transform)
+        progress.record(response, len(records), seconds)
+        return response, records
+
+    def _crawl(self,
+               url: str,
+               params: RequestParams,
+               deadline: Optional[Deadline],
+               progress: PageProgress) -> Iterator[List[Any]]:
+        client = self._client
+        params = dict(params or {})
+        params.setdefault('per_page', client._per_page)
+
+        if isinstance(deadline, TimeBudget) and should_stop(deadline):
+            return
+        response, records = self._get(url, params, deadline, progress)
+        client._check_response_headers_for_pagination(response)
+        yield records
+
+        last = last_page_number(response)
+        if last is not None:
+            tasks = (partial(self._executor.submit, _fetch_page,
+                             self._client_args, url, params, page,
+                             self._transform, deadline)
+                     for page in range(2, last + 1))
+            for records, links, seconds in self._ordered(tasks, deadline):
+                progress.record(PageLinks(links), len(records), seconds)
+                yield records
+            return
+
+        while 'next' in response.links and not should_stop(deadline):
+            response, records = self._get(
+                response.links['next']['url'],
+                {'per_page': params['per_page']}, deadline, progress)
+            yield records
+
+    def _listing(self,
+                 endpoint: str,
+                 flatten_response: Optional[bool],
+                 params: RequestParams,
+                 deadline: Optional[Deadline],
+                 progress_callback: ProgressCallback) -> PaginatedIterator:
+        url = self._client._get_url(endpoint)
+        progress = PageProgress(url, progress_callback)
+        pages = self._crawl(url, params, deadline, progress)
+        if flatten_response:
+            items = (item for page in pages for item in page)
+            return PaginatedIterator(items, progress)
+        return PaginatedIterator(pages, progress)
+
+    def get_account_courses(self,
+                            account_id: str,
+                            params: RequestParams = None,
+                            deadline: Optional[Deadline] = None,
+                            progress_callback: ProgressCallback = None
+                            ) -> PaginatedIterator:
+        """
+        Returns an iterator of the pages of an account's courses, like
+        `CanvasAPIv1.get_account_courses`.
+        """
+        endpoint = "accounts/{account_id}/courses".format(
+            account_id=account_id)
+        return self._listing(endpoint, False, params, deadline,
+                             progress_callback)
+
+    def get_course_users(self,
+                         course_id: str,
+                         is_sis_course_id: Optional[bool] = None,
+                         flatten_response: Optional[bool] = None,
+                         params: RequestParams = None,
+                         deadline: Optional[Deadline] = None,
+                         progress_callback: ProgressCallback = None
+                         ) -> PaginatedIterator:
+        """
+        Returns an iterator of the pages (or, flattened, the users) of a
+        course's users, like `CanvasAPIv1.get_course_users`.
+        """
+        course_id = self._client._format_sis_course_id(
+            course_id, is_sis_course_id)
+        endpoint = "courses/{}/users".format(course_id)
+        return self._listing(
+            endpoint, flatten_response or self._client._flatten_response,
+            params, deadline, progress_callback)
+
+    def get_courses_users(self,
+                          course_ids: Sequence[str],
+                          is_sis_course_id: Optional[bool] = None,
+                          params: RequestParams = None,
+                          deadline: Optional[Deadline] = None
+                          ) -> Iterator[Tuple[str, List[Any]]]:
+        """
+        Returns a generator of `(course_id, users)` for each course, in the
+        order given. Each course is fetched whole by one worker.
+        """
+        tasks = (partial(self._executor.submit, _fetch_course_users,
+                         self._client_args, course_id, is_sis_course_id,
+                         params, self._transform, deadline)
+                 for course_id in course_ids)
+        return zip(course_ids, self._ordered(tasks, deadline))
@@ -0,0 +1,186 @@
+"""
+Bulk page publishing with content-hash skipping.
+
+A `PagePublisher` writes the same wiki page to many courses at once, and
+remembers a hash of what it last wrote to each course, so a rerun only
+writes the pages whose content changed:
+
+    >>> publisher = PagePublisher(api, 'page_hashes.json', max_workers=8)
+    >>> report = publisher.put_pages(course_ids, 'syllabus', body,
+    ...                              title='Syllabus')
+    >>> len(report.written), len(report.skipped), report.failed
+
+The hash covers the body, title, published and front page flags. Pages
+edited in Canvas since the last write are not noticed by the local hash;
+with `verify=True`, each page is fetched first and written only if it
+differs from the desired content. Canvas may rewrite the HTML of a body
+it sanitizes, in which case verification always finds the page changed.
+"""
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any, Dict, Iterable, List, NamedTuple, Optional, Tuple)
+
+from canvas_api_client.deadline import Deadline, should_stop
+from canvas_api_client.interface import CanvasAPIClient
+
+PagesReport = NamedTuple('PagesReport', [
+    ('written', List[str]),
+    ('skipped', List[str]),
+    ('failed', List[Tuple[str, str]]),
+    ('unsent', List[str]),
+])
+
+# Content hashes of the pages last written, by "course ID/page URL".
+PageHashes = Dict[str, str]
+
+
+def page_hash(body: Optional[str],
+              title: Optional[str],
+              published: Optional[bool],
+              front_page: Optional[bool]) -> str:
+    """
+    Returns a hash of the content of a page.
+    """
+    content = json.dumps([body, title, bool(published), bool(front_page)])
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+class PagePublisher(object):
+    """
+    Writes pages through `client` on up to `max_workers` threads. The page
+    hashes are loaded from `path`, if it exists, and saved to it after each
+    `put_pages`.
+    """
+
+    def __init__(self,
+                 client: CanvasAPIClient,
+                 path: Optional[str] = None,
+                 max_workers: int = 8) -> None:
+        self.client = client
+        self.path = path
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._hashes = {}  # type: PageHashes
+        if path is not None and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self._hashes = json.load(f)
+
+    def _remote_hash(self,
+                     course_id: str,
+                     url: str,
+                     is_sis_course_id: bool) -> Optional[str]:
+        """
+        Returns the hash of the page as it is in Canvas, or None if it
+        could not be fetched (e.g. it does not exist yet).
+        """
+        try:
+            page = self.client.get_page(
+                course_id, url, is_sis_course_id=is_sis_course_id).json()
+        except Exception:
+            return None
+        return page_hash(page.get('body'), page.get('title'),
+                         page.get('published'), page.get('front_page'))
+
+    def _put_page(self,
+                  course_id: str,
+                  url: str,
+                  content_hash: str,
+                  is_sis_course_id: bool,
+                  verify: bool,
+                  force: bool,
+                  page: Dict[str, Any]) -> bool:
+        """
+        Writes a page unless it is known to be up to date, and returns
+        whether it was written.
+        """
+        key = '{}/{}'.format(course_id, url)
+        if not force:
+            if verify:
+                unchanged = self._remote_hash(
+                    course_id, url, is_sis_course_id) == content_hash
+            else:
+                with self._lock:
+                    unchanged = self._hashes.get(key) == content_hash
+            if unchanged:
+                with self._lock:
+                    self._hashes[key] = content_hash
+                return False
+
+        self.client.put_page(course_id, is_sis_course_id=is_sis_course_id,
+                             url=url, **page)
+        with self._lock:
+            self._hashes[key] = content_hash
+        return True
+
+    def put_pages(self,
+                  course_ids: Iterable[str],
+                  url: str,
+                  body: str,
+                  title: Optional[str] = None,
+                  published: bool = True,
+                  front_page: bool = False,
+                  notify_of_update: bool = False,
+                  is_sis_course_id: bool = False,
+                  verify: bool = False,
+                  force: bool = False,
+                  deadline: Optional[Deadline] = None) -> PagesReport:
+        """
+        Writes the page at `url` to each course, skipping the courses where
+        it is unchanged (unless `force` is set), and returns which courses
+        were written, skipped or failed.
+
+        With a time budget, no page is written after it runs out; the
+        courses left are reported as unsent.
+        """
+        content_hash = page_hash(body, title, published, front_page)
+        page = {'body': body, 'title': title, 'published': published,
+                'front_page': front_page,
+                'notify_of_update': notify_of_update}
+        report = PagesReport([], [], [], [])
+
+        def put(course_id: str) -> None:
+            if should_stop(deadline):
+                report.unsent.append(course_id)
+                return
+            try:
+                written = self._put_page(course_id, url, content_hash,
+                                         is_sis_course_id, verify, force,
+                                         page)
+            except Exception as e:
+                report.failed.append((course_id, repr(e)))
+            else:
+                (report.written if written else report.skipped).append(
+                    course_id)
+
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            for _ in executor.map(put, course_ids):
+                pass
+        if self.path is not None:
+            self.save()
+        return report
+
+    def forget(self, course_id: str, url: str) -> None:
+        """
+        Drops the hash of a page, so it is written again next time.
+        """
+        with self._lock:
+            self._hashes.pop('{}/{}'.format(course_id, url), None)
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Writes the page hashes to `path` (by default, the one they were
+        loaded from), atomically.
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError('No path to save the page hashes to')
+        with self._lock:
+            temp_path = path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._hashes, f, separators=(',', ':'),
+                          sort_keys=True)
+            os.replace(temp_path, path)
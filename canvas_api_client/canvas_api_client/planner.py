@@ -0,0 +1,299 @@
+"""
+Cost-based planning of bulk course fetches.
+
+There are two ways to fetch many courses of one account: a `get_course_info`
+call per course, or paging through `get_account_courses` and keeping the
+courses asked for. For 5 courses the single calls win; for 800 courses of
+an account of 1000, ten listing pages beat 800 calls. A
+`CourseFetchPlanner` estimates both and runs the cheaper one:
+
+    >>> planner = CourseFetchPlanner(api, max_workers=8)
+    >>> report = planner.fetch_courses('115', course_ids,
+    ...                                params={'include[]': ['term']})
+    >>> report.strategy, len(report.courses), report.failed
+
+The estimates use the number of course IDs, the size of the account and
+the latencies seen so far (smoothed, starting from `get_latency` and
+`page_latency`). Single calls are sent `max_workers` at a time, while
+listing pages are fetched one after another. The account size is learned
+from the listings the planner runs, or given with `set_account_size`.
+While it is unknown, a listing is started, and if its first page shows
+the account to be too big, the remaining courses are fetched one by one
+instead. If the listing has no page count (no `last` link), it is given up
+once it has taken longer than fetching the remaining courses one by one.
+
+Whichever plan runs, the results are the same: courses the listing does
+not return (e.g. deleted courses, or courses outside `filters`) are
+fetched one by one afterwards.
+"""
+import json
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple)
+
+from canvas_api_client.deadline import Deadline, should_stop
+from canvas_api_client.interface import CanvasAPIClient
+from canvas_api_client.types import RequestParams
+
+logger = logging.getLogger()
+
+INDIVIDUAL = 'individual'
+LISTING = 'listing'
+
+PlanEstimate = NamedTuple('PlanEstimate', [
+    ('strategy', str),
+    ('individual_requests', int),
+    ('individual_seconds', float),
+    ('listing_requests', Optional[int]),
+    ('listing_seconds', Optional[float]),
+])
+
+CourseFetchReport = NamedTuple('CourseFetchReport', [
+    ('strategy', str),
+    ('courses', Dict[str, Dict[str, Any]]),
+    ('failed', List[Tuple[str, str]]),
+    ('unsent', List[str]),
+    ('requests', int),
+    ('seconds', float),
+])
+
+
+class CourseFetchPlanner(object):
+    """
+    Fetches courses through `client` by whichever plan is estimated to
+    take less time. Observed latencies are blended into the estimates
+    with weight `smoothing`.
+    """
+
+    def __init__(self,
+                 client: CanvasAPIClient,
+                 max_workers: int = 8,
+                 per_page: int = 100,
+                 get_latency: float = 0.3,
+                 page_latency: float = 1.0,
+                 smoothing: float = 0.3,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.client = client
+        self.max_workers = max_workers
+        self.per_page = per_page
+        self.get_latency = get_latency
+        self.page_latency = page_latency
+        self.smoothing = smoothing
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._account_sizes = {}  # type: Dict[str, int]
+
+    @staticmethod
+    def _account_key(account_id: str, filters: RequestParams) -> str:
+        return json.dumps([account_id, filters or {}], sort_keys=True)
+
+    def set_account_size(self,
+                         account_id: str,
+                         courses: int,
+                         filters: RequestParams = None) -> None:
+        """
+        Records how many courses the account's listing (with `filters`)
+        returns.
+        """
+        with self._lock:
+            self._account_sizes[self._account_key(account_id,
+                                                  filters)] = courses
+
+    def account_size(self,
+                     account_id: str,
+                     filters: RequestParams = None) -> Optional[int]:
+        """
+        Returns the known size of the account's listing, or None.
+        """
+        with self._lock:
+            return self._account_sizes.get(
+                self._account_key(account_id, filters))
+
+    def _observe(self, attribute: str, seconds: float) -> None:
+        with self._lock:
+            latency = getattr(self, attribute)
+            setattr(self, attribute,
+                    latency + self.smoothing * (seconds - latency))
+
+    def estimate(self,
+                 account_id: str,
+                 course_count: int,
+                 filters: RequestParams = None) -> PlanEstimate:
+        """
+        Estimates the requests and time each plan would take to fetch
+        `course_count` courses of the account, and picks the faster one.
+
+        If the account size is unknown, the listing is picked unless the
+        single calls would take no longer than one listing page.
+        """
+        individual_seconds = (math.ceil(course_count / self.max_workers) *
+                              self.get_latency)
+        size = self.account_size(account_id, filters)
+        if size is None:
+            strategy = (INDIVIDUAL if individual_seconds <= self.page_latency
+                        else LISTING)
+            return PlanEstimate(strategy, course_count, individual_seconds,
+                                None, None)
+
+        pages = max(1, math.ceil(size / self.per_page))
+        listing_seconds = pages * self.page_latency
+        strategy = (INDIVIDUAL if individual_seconds <= listing_seconds
+                    else LISTING)
+        return PlanEstimate(strategy, course_count, individual_seconds,
+                            pages, listing_seconds)
+
+    def _get_course(self,
+                    course_id: str,
+                    is_sis_course_id: bool,
+                    params: RequestParams) -> Dict[str, Any]:
+        started = self._clock()
+        response = self.client.get_course_info(
+            course_id, is_sis_course_id=is_sis_course_id, params=params)
+        self._observe('get_latency', self._clock() - started)
+        return response.json()
+
+    def _fetch_individually(self,
+                            course_ids: List[str],
+                            is_sis_course_id: bool,
+                            params: RequestParams,
+                            deadline: Optional[Deadline],
+                            report: CourseFetchReport) -> int:
+        """
+        Fetches each course with its own call, adding the results to the
+        report, and returns the number of requests sent.
+        """
+        sent = []  # type: List[str]
+
+        def fetch(course_id: str) -> None:
+            if should_stop(deadline):
+                report.unsent.append(course_id)
+                return
+            sent.append(course_id)
+            try:
+                report.courses[course_id] = self._get_course(
+                    course_id, is_sis_course_id, params)
+            except Exception as e:
+                report.failed.append((course_id, repr(e)))
+
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            for _ in executor.map(fetch, course_ids):
+                pass
+        return len(sent)
+
+    def _fetch_by_listing(self,
+                          account_id: str,
+                          wanted: List[str],
+                          match_field: str,
+                          filters: RequestParams,
+                          params: RequestParams,
+                          deadline: Optional[Deadline],
+                          report: CourseFetchReport) -> int:
+        """
+        Pages through the account's courses until every wanted course has
+        been found, adding them to the report, and returns the number of
+        pages fetched. Stops after the first page if the account turns out
+        to be too big for the listing to pay off.
+        """
+        remaining = set(wanted)
+        listing = self.client.get_account_courses(
+            account_id, params=dict(params or {}, **(filters or {})),
+            deadline=deadline)
+        size_known = self.account_size(account_id, filters) is not None
+        pages = 0
+        complete = False
+        while remaining:
+            if should_stop(deadline):
+                break
+            started = self._clock()
+            try:
+                page = next(listing)
+            except StopIteration:
+                complete = deadline is None or not deadline.expired()
+                break
+            except Exception as e:
+                logger.warning('Could not list the courses of account {}, '
+                               'fetching them one by one: {!r}'.format(
+                                   account_id, e))
+                break
+            self._observe('page_latency', self._clock() - started)
+            pages += 1
+            for course in page:
+                key = str(course.get(match_field))
+                if key in remaining:
+                    remaining.discard(key)
+                    report.courses[key] = course
+
+            if size_known:
+                continue
+            calls_left = (math.ceil(len(remaining) / self.max_workers) *
+                          self.get_latency)
+            total = getattr(listing, 'total_items', None)
+            if total is None:
+                # Without a page count the listing may go on for any number
+                # of pages, so it is given up once it has taken longer than
+                # the single calls for the courses left would.
+                if pages * self.page_latency > calls_left:
+                    logger.debug('Account {} listing has no page count, '
+                                 'fetching the rest one by one'.format(
+                                     account_id))
+                    break
+                continue
+            self.set_account_size(account_id, total, filters)
+            size_known = True
+            left = max(0, total - len(page))
+            pages_left = math.ceil(left / self.per_page)
+            if calls_left < pages_left * self.page_latency:
+                logger.debug('Account {} has about {} courses, fetching '
+                             'the rest one by one'.format(account_id,
+                                                          total))
+                break
+
+        if complete:
+            self.set_account_size(
+                account_id, getattr(listing, 'items_seen', 0), filters)
+        return pages
+
+    def fetch_courses(self,
+                      account_id: str,
+                      course_ids: Iterable[str],
+                      is_sis_course_id: bool = False,
+                      filters: RequestParams = None,
+                      params: RequestParams = None,
+                      deadline: Optional[Deadline] = None
+                      ) -> CourseFetchReport:
+        """
+        Fetches the account's courses with the given IDs by the cheaper
+        plan, and reports the courses (by the ID asked for), the IDs that
+        failed, the plan used and the requests it took.
+
+        The filters (e.g. `{'enrollment_term_id': 5}`) only narrow the
+        listing; params such as `include[]` are sent with every request.
+        With `is_sis_course_id`, the IDs are SIS course IDs, matched
+        against the listing's `sis_course_id` field.
+
+        With a time budget, no request is sent after it runs out; the
+        courses left are reported as unsent.
+        """
+        wanted = list(dict.fromkeys(str(course_id)
+                                    for course_id in course_ids))
+        started = self._clock()
+        estimate = self.estimate(account_id, len(wanted), filters)
+        report = CourseFetchReport(estimate.strategy, {}, [], [], 0, 0.0)
+
+        requests = 0
+        if estimate.strategy == LISTING:
+            match_field = 'sis_course_id' if is_sis_course_id else 'id'
+            requests += self._fetch_by_listing(
+                account_id, wanted, match_field, filters, params, deadline,
+                report)
+        left = [course_id for course_id in wanted
+                if course_id not in report.courses]
+        if left:
+            requests += self._fetch_individually(
+                left, is_sis_course_id, params, deadline, report)
+        return report._replace(requests=requests,
+                               seconds=self._clock() - started)
@@ -0,0 +1,179 @@
+"""
+Progress of paginated listings.
+
+Paginated listings return a `PaginatedIterator`, which iterates like a
+generator but also tracks how far the listing has got:
+
+    >>> courses = api.get_account_courses('1')
+    >>> first_page = next(courses)
+    >>> courses.page, courses.total_pages, courses.items_seen, courses.eta
+    (1, 42, 100, 61.5)
+
+The total page count comes from the `last` Link relation, which Canvas only
+sends for listings it can count cheaply; without it, `total_pages`,
+`total_items` and `eta` are None. Nothing is known before the first page has
+been fetched.
+
+Code that consumes listings can take either form with `iter_records`.
+"""
+import time
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from canvas_api_client.types import Response
+
+ListingProgress = NamedTuple('ListingProgress', [
+    ('url', str),
+    ('page', int),
+    ('total_pages', Optional[int]),
+    ('items_seen', int),
+    ('total_items', Optional[int]),
+    ('elapsed', float),
+    ('eta', Optional[float]),
+])
+
+# Called with the progress of a listing after each page.
+ProgressCallback = Optional[Callable[[ListingProgress], None]]
+
+
+def iter_records(records: Iterable[Any]) -> Iterator[Any]:
+    """
+    Returns a generator of the records of a listing, given either its
+    records or its pages (lists of records).
+    """
+    for item in records:
+        if isinstance(item, list):
+            for record in item:
+                yield record
+        else:
+            yield item
+
+
+def last_page_number(response: Response) -> Optional[int]:
+    """
+    Returns the page number of the `last` Link relation of a response, or
+    None if there is none or it is not numbered (e.g. a bookmark).
+    """
+    last = response.links.get('last')
+    if not last:
+        return None
+    pages = parse_qs(urlsplit(last['url']).query).get('page')
+    if not pages or not pages[0].isdigit():
+        return None
+    return int(pages[0])
+
+
+class PageProgress(object):
+    """
+    Counts the pages and items of a listing as they are fetched, and
+    estimates the total and the time left from the page latencies seen so
+    far. The optional callback is called with a `ListingProgress` after each
+    page.
+    """
+
+    def __init__(self,
+                 url: str,
+                 callback: ProgressCallback = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.url = url
+        self.page = 0
+        self.total_pages = None  # type: Optional[int]
+        self.items_seen = 0
+        self.page_size = 0
+        self.fetch_seconds = 0.0
+        self._callback = callback
+        self._clock = clock
+        self._started = clock()
+
+    def record(self, response: Response, items: int, seconds: float) -> None:
+        """
+        Records a fetched page holding `items` items, which took `seconds`
+        to fetch.
+        """
+        self.page += 1
+        self.items_seen += items
+        self.page_size = max(self.page_size, items)
+        self.fetch_seconds += seconds
+
+        if 'next' not in response.links:
+            self.total_pages = self.page
+        else:
+            last = last_page_number(response)
+            if last is not None:
+                self.total_pages = max(last, self.page + 1)
+
+        if self._callback is not None:
+            self._callback(self.progress())
+
+    @property
+    def total_items(self) -> Optional[int]:
+        """
+        Estimates the number of items in the listing, assuming the pages
+        still to come are full.
+        """
+        if self.total_pages is None:
+            return None
+        remaining = self.total_pages - self.page
+        return self.items_seen + remaining * self.page_size
+
+    @property
+    def eta(self) -> Optional[float]:
+        """
+        Estimates the seconds needed to fetch the remaining pages from the
+        mean latency of the pages fetched so far.
+        """
+        if self.total_pages is None or not self.page:
+            return None
+        remaining = self.total_pages - self.page
+        return remaining * self.fetch_seconds / self.page
+
+    def progress(self) -> ListingProgress:
+        return ListingProgress(url=self.url,
+                               page=self.page,
+                               total_pages=self.total_pages,
+                               items_seen=self.items_seen,
+                               total_items=self.total_items,
+                               elapsed=self._clock() - self._started,
+                               eta=self.eta)
+
+
+class PaginatedIterator(object):
+    """
+    An iterator over a paginated listing (its pages, or its items when
+    flattened) that exposes the listing's `PageProgress`.
+    """
+
+    def __init__(self,
+                 iterator: Iterator[Any],
+                 progress: PageProgress) -> None:
+        self._iterator = iterator
+        self._progress = progress
+
+    def __iter__(self) -> 'PaginatedIterator':
+        return self
+
+    def __next__(self) -> Any:
+        return next(self._iterator)
+
+    @property
+    def page(self) -> int:
+        return self._progress.page
+
+    @property
+    def total_pages(self) -> Optional[int]:
+        return self._progress.total_pages
+
+    @property
+    def items_seen(self) -> int:
+        return self._progress.items_seen
+
+    @property
+    def total_items(self) -> Optional[int]:
+        return self._progress.total_items
+
+    @property
+    def eta(self) -> Optional[float]:
+        return self._progress.eta
+
+    def progress(self) -> ListingProgress:
+        return self._progress.progress()
@@ -0,0 +1,283 @@
+"""
+Reconciliation of course enrollments against a desired roster.
+
+Given the roster each course should have, an `EnrollmentReconciler` streams
+each course's current users, indexes their enrollments by (user, type),
+and computes the enrollments to add and to remove. Then it sends those
+requests concurrently:
+
+    >>> reconciler = EnrollmentReconciler(api, user_key='sis_user_id')
+    >>> reports = reconciler.reconcile({
+    ...     'COURSE_A': ['UNI1', 'UNI2', ('UNI9', 'TeacherEnrollment')],
+    ...     'COURSE_B': ['UNI3'],
+    ... }, is_sis_course_id=True, dry_run=True)
+    >>> for report in reports:
+    ...     print(report.course_id, len(report.diff.to_add),
+    ...           len(report.diff.to_remove), report.fetch_seconds)
+
+Roster entries are user IDs (enrolled as `default_type`) or `(user ID,
+enrollment type)` pairs, where user IDs are values of the user field
+`user_key`. Only enrollments of `managed_types` are removed (by default,
+every type), so a student roster does not remove the teachers as well.
+"""
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence,
+    Set, Tuple, Union)
+
+from canvas_api_client.deadline import Deadline, TimeBudget, should_stop
+from canvas_api_client.errors import DeadlineExceeded
+from canvas_api_client.interface import CanvasAPIClient
+from canvas_api_client.types import RequestParams
+
+logger = logging.getLogger()
+
+# A user ID and an enrollment type.
+RosterEntry = Tuple[str, str]
+
+Roster = Iterable[Union[str, int, RosterEntry]]
+
+EnrollmentDiff = NamedTuple('EnrollmentDiff', [
+    ('course_id', str),
+    ('to_add', List[RosterEntry]),
+    ('to_remove', List[Dict[str, Any]]),
+    ('unchanged', int),
+])
+
+CourseReconciliation = NamedTuple('CourseReconciliation', [
+    ('course_id', str),
+    ('diff', EnrollmentDiff),
+    ('added', int),
+    ('removed', int),
+    ('skipped', int),
+    ('errors', List[str]),
+    ('fetch_seconds', float),
+    ('diff_seconds', float),
+    ('apply_seconds', float),
+])
+
+# User fields and the prefixes Canvas accepts for them in place of an ID.
+_USER_ID_PREFIXES = {
+    'sis_user_id': 'sis_user_id',
+    'login_id': 'sis_login_id',
+    'integration_id': 'sis_integration_id',
+}
+
+CurrentEnrollments = Dict[RosterEntry, List[Dict[str, Any]]]
+DesiredEnrollments = Set[RosterEntry]
+
+# Each change sent, as ('add' or 'remove', its future).
+PendingChanges = List[Tuple[str, Future]]
+
+
+class EnrollmentReconciler(object):
+    """
+    Brings course enrollments in line with desired rosters, sending up to
+    `max_workers` requests at once. Removals are sent with the Canvas
+    `task` (by default 'conclude'; 'delete', 'inactivate' and 'deactivate'
+    are the others).
+    """
+
+    def __init__(self,
+                 client: CanvasAPIClient,
+                 user_key: str = 'sis_user_id',
+                 default_type: str = 'StudentEnrollment',
+                 managed_types: Optional[Sequence[str]] = None,
+                 remove_task: str = 'conclude',
+                 max_workers: int = 8) -> None:
+        self.client = client
+        self.user_key = user_key
+        self.default_type = default_type
+        self.managed_types = (set(managed_types)
+                              if managed_types is not None else None)
+        self.remove_task = remove_task
+        self.max_workers = max_workers
+
+    def _desired(self, roster: Roster) -> DesiredEnrollments:
+        return {(str(entry[0]), entry[1])
+                if isinstance(entry, (tuple, list))
+                else (str(entry), self.default_type)
+                for entry in roster}
+
+    def _current(self,
+                 course_id: str,
+                 is_sis_course_id: bool,
+                 params: RequestParams,
+                 deadline: Optional[Deadline]
+                 ) -> Tuple[CurrentEnrollments, bool]:
+        """
+        Streams the course's users and indexes their enrollments in the
+        course by (user ID, enrollment type). Also returns False if a time
+        budget ran out before the last page of users.
+        """
+        params = dict(params or {}, **{'include[]': 'enrollments'})
+        current = {}  # type: CurrentEnrollments
+        users = self.client.get_course_users(
+            course_id, is_sis_course_id=is_sis_course_id,
+            flatten_response=True, params=params, deadline=deadline)
+        for user in users:
+            user_id = user.get(self.user_key)
+            if user_id is None:
+                continue
+            for enrollment in user.get('enrollments') or []:
+                key = (str(user_id), enrollment.get('type'))
+                current.setdefault(key, []).append(enrollment)
+        if isinstance(deadline, TimeBudget) and deadline.exhausted:
+            total_pages = getattr(users, 'total_pages', None)
+            if total_pages is None or getattr(users, 'page', 0) < total_pages:
+                return current, False
+        return current, True
+
+    def diff(self,
+             course_id: str,
+             roster: Roster,
+             is_sis_course_id: bool = False,
+             params: RequestParams = None,
+             deadline: Optional[Deadline] = None) -> EnrollmentDiff:
+        """
+        Returns the enrollments to add to and remove from a course so it
+        matches the roster. Raises `DeadlineExceeded` if a time budget ran
+        out before all of the course's users were fetched.
+        """
+        current, complete = self._current(course_id, is_sis_course_id,
+                                          params, deadline)
+        if not complete:
+            raise DeadlineExceeded(
+                'Time budget exhausted while fetching the users of course '
+                '{}'.format(course_id))
+        return self._diff(course_id, self._desired(roster), current)
+
+    def _diff(self,
+              course_id: str,
+              desired: DesiredEnrollments,
+              current: CurrentEnrollments) -> EnrollmentDiff:
+        to_add = sorted(desired.difference(current))
+        to_remove = []  # type: List[Dict[str, Any]]
+        unchanged = 0
+        for key, enrollments in current.items():
+            if key in desired:
+                unchanged += 1
+            elif self.managed_types is None or key[1] in self.managed_types:
+                to_remove.extend(enrollments)
+        return EnrollmentDiff(course_id, to_add, to_remove, unchanged)
+
+    def _user_id(self, user_id: str) -> str:
+        prefix = _USER_ID_PREFIXES.get(self.user_key)
+        return '{}:{}'.format(prefix, user_id) if prefix else user_id
+
+    def _apply(self,
+               executor: ThreadPoolExecutor,
+               diff: EnrollmentDiff,
+               is_sis_course_id: bool,
+               deadline: Optional[Deadline]
+               ) -> Tuple[int, int, int, List[str]]:
+        """
+        Sends the diff's requests and returns how many enrollments were
+        added, removed and skipped (after a time budget ran out), and the
+        errors.
+        """
+        futures = []  # type: PendingChanges
+        skipped = 0
+        for user_id, enrollment_type in diff.to_add:
+            if should_stop(deadline):
+                skipped += 1
+                continue
+            futures.append(('add', executor.submit(
+                self.client.add_enrollment, diff.course_id,
+                self._user_id(user_id), enrollment_type,
+                is_sis_course_id=is_sis_course_id)))
+        for enrollment in diff.to_remove:
+            if should_stop(deadline):
+                skipped += 1
+                continue
+            futures.append(('remove', executor.submit(
+                self.client.delete_enrollment, diff.course_id,
+                enrollment['id'], is_sis_course_id=is_sis_course_id,
+                params={'task': self.remove_task})))
+
+        done = {'add': 0, 'remove': 0}
+        errors = []  # type: List[str]
+        for action, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                errors.append('{}: {!r}'.format(action, e))
+            else:
+                done[action] += 1
+        return done['add'], done['remove'], skipped, errors
+
+    def _reconcile_course(self,
+                          executor: ThreadPoolExecutor,
+                          course_id: str,
+                          roster: Roster,
+                          is_sis_course_id: bool,
+                          params: RequestParams,
+                          dry_run: bool,
+                          deadline: Optional[Deadline]
+                          ) -> Optional[CourseReconciliation]:
+        """
+        Reconciles one course, or returns None if a time budget ran out
+        before all of its users were fetched.
+        """
+        started = time.monotonic()
+        if should_stop(deadline):
+            return None
+        try:
+            current, complete = self._current(course_id, is_sis_course_id,
+                                              params, deadline)
+        except Exception as e:
+            logger.warning('Could not fetch the enrollments of course '
+                           '{}: {!r}'.format(course_id, e))
+            return CourseReconciliation(
+                course_id, EnrollmentDiff(course_id, [], [], 0), 0, 0, 0,
+                ['fetch: {!r}'.format(e)], time.monotonic() - started, 0.0,
+                0.0)
+        if not complete:
+            return None
+        fetched = time.monotonic()
+        diff = self._diff(course_id, self._desired(roster), current)
+        diffed = time.monotonic()
+
+        added = removed = skipped = 0
+        errors = []  # type: List[str]
+        if not dry_run:
+            added, removed, skipped, errors = self._apply(
+                executor, diff, is_sis_course_id, deadline)
+        return CourseReconciliation(
+            course_id, diff, added, removed, skipped, errors,
+            fetched - started, diffed - fetched, time.monotonic() - diffed)
+
+    def reconcile(self,
+                  rosters: Mapping[str, Roster],
+                  is_sis_course_id: bool = False,
+                  params: RequestParams = None,
+                  dry_run: bool = False,
+                  deadline: Optional[Deadline] = None
+                  ) -> List[CourseReconciliation]:
+        """
+        Reconciles each course with its roster, several courses at once,
+        and returns a report per course in the order given. With `dry_run`,
+        the diffs are computed but nothing is changed.
+
+        With a time budget, no request is sent after it runs out: courses
+        whose users were not all fetched by then are left out of the
+        reports, and changes not yet sent are counted as skipped.
+        """
+        with ThreadPoolExecutor(self.max_workers) as requests, \
+                ThreadPoolExecutor(self.max_workers) as courses:
+            futures = []
+            for course_id, roster in rosters.items():
+                if should_stop(deadline):
+                    break
+                futures.append(courses.submit(
+                    self._reconcile_course, requests, course_id, roster,
+                    is_sis_course_id, params, dry_run, deadline))
+            reports = [report for report in
+                       (future.result() for future in futures)
+                       if report is not None]
+        if isinstance(deadline, TimeBudget) and deadline.exhausted:
+            logger.debug('Time budget exhausted, reconciled {} of {} '
+                         'courses'.format(len(reports), len(rosters)))
+        return reports
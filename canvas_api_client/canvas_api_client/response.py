@@ -0,0 +1,119 @@
+import json
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, Optional
+
+
+class CaseInsensitiveDict(MutableMapping):
+    """
+    A dict of HTTP headers with case-insensitive keys.
+
+    The original case of the most recently set key is kept for iteration.
+    """
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None) -> None:
+        self._store = {}  # type: Dict[str, Any]
+        if data:
+            self.update(data)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._store[key.lower()] = (key, value)
+
+    def __getitem__(self, key: str) -> Any:
+        return self._store[key.lower()][1]
+
+    def __delitem__(self, key: str) -> None:
+        del self._store[key.lower()]
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key, value in self._store.values())
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+
+def parse_link_header(value: str) -> Dict[str, Dict[str, str]]:
+    """
+    Parses an HTTP "Link" header into a dict keyed by relation, in the same
+    shape as `requests.Response.links`:
+
+        {'next': {'url': 'https://...', 'rel': 'next'}, ...}
+    """
+    links = {}  # type: Dict[str, Dict[str, str]]
+    for part in value.split(','):
+        segments = part.split(';')
+        url = segments[0].strip().strip('<>')
+        if not url:
+            continue
+        link = {'url': url}
+        for segment in segments[1:]:
+            if '=' not in segment:
+                continue
+            key, _, param = segment.partition('=')
+            link[key.strip()] = param.strip().strip('"\'')
+        links[link.get('rel') or url] = link
+    return links
+
+
+class SimpleResponse(object):
+    """
+    A minimal stand-in for `requests.Response`.
+
+    Exposes the subset of the requests interface used by the client and its
+    callers (status_code, ok, url, headers, links, content, text, json() and
+    raise_for_status()), without importing requests.
+    """
+
+    def __init__(self,
+                 status_code: int,
+                 url: str,
+                 headers: Optional[Dict[str, Any]] = None,
+                 content: bytes = b'',
+                 reason: str = '',
+                 elapsed: float = 0.0) -> None:
+        self.status_code = status_code
+        self.url = url
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.reason = reason
+        self.elapsed = elapsed
+        self.encoding = 'utf-8'
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors='replace')
+
+    @property
+    def links(self) -> Dict[str, Dict[str, str]]:
+        header = self.headers.get('link')
+        if not header:
+            return {}
+        return parse_link_header(header)
+
+    def json(self, **kwargs) -> Any:
+        return json.loads(self.text, **kwargs)
+
+    def raise_for_status(self) -> None:
+        """
+        Raises `requests.HTTPError` for 4xx and 5xx responses, so callers can
+        handle errors the same way regardless of which transport was used.
+
+        requests is only imported when there is an error to raise.
+        """
+        if self.ok:
+            return
+        from requests import HTTPError
+        kind = 'Client' if self.status_code < 500 else 'Server'
+        msg = '{code} {kind} Error: {reason} for url: {url}'.format(
+            code=self.status_code, kind=kind, reason=self.reason,
+            url=self.url)
+        raise HTTPError(msg, response=self)
+
+    def __repr__(self) -> str:
+        return '<SimpleResponse [{}]>'.format(self.status_code)
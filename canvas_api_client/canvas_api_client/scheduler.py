@@ -0,0 +1,226 @@
+"""
+Priority-aware scheduling of API requests.
+
+A `RequestScheduler` limits how many requests a client has in flight (and,
+optionally, how many it starts per second) and decides which waiting request
+goes next using weighted fair queuing: each priority class receives a share
+of the request budget proportional to its weight. With the default weights,
+interactive lookups are admitted ten times as often as background crawl
+requests while both are waiting, but a busy interactive class can never
+starve the background class completely.
+
+Requests are tagged with a priority for the current thread:
+
+    >>> scheduler = RequestScheduler(max_concurrency=4)
+    >>> api = CanvasAPIv1(url, token, scheduler=scheduler)
+    >>> with scheduler.priority('interactive'):
+    ...     course = api.get_course_info('1234').json()
+
+A request with a deadline (or time budget) leaves the queue when it runs out,
+raising `DeadlineExceeded` instead of being sent.
+"""
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import (
+    Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple)
+
+from canvas_api_client.deadline import Deadline
+from canvas_api_client.errors import DeadlineExceeded
+
+# Queue entries are (virtual start tag, arrival sequence number).
+QueueEntry = Tuple[float, int]
+
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_NORMAL = 'normal'
+PRIORITY_BACKGROUND = 'background'
+
+DEFAULT_WEIGHTS = {
+    PRIORITY_INTERACTIVE: 10.0,
+    PRIORITY_NORMAL: 3.0,
+    PRIORITY_BACKGROUND: 1.0,
+}
+
+PriorityStats = NamedTuple('PriorityStats', [
+    ('priority', str),
+    ('requests', int),
+    ('waiting', int),
+    ('mean_wait', float),
+    ('max_wait', float),
+])
+
+
+class _ClassStats(object):
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.waiting = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+class RequestScheduler(object):
+    """
+    Admits requests according to their priority, within a shared concurrency
+    limit and an optional rate limit (`max_rate` requests per second).
+
+    Pass an instance as the `scheduler` argument of `CanvasAPIv1`. Several
+    clients can share one scheduler to share one budget.
+    """
+
+    def __init__(self,
+                 max_concurrency: int = 4,
+                 weights: Optional[Dict[str, float]] = None,
+                 max_rate: Optional[float] = None,
+                 default_priority: str = PRIORITY_NORMAL,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_concurrency = max_concurrency
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        if default_priority not in self.weights:
+            raise ValueError(
+                "Unknown default priority '{}'".format(default_priority))
+        self.max_rate = max_rate
+        self.default_priority = default_priority
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._local = threading.local()
+        self._queue = []  # type: List[QueueEntry]
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._virtual_time = 0.0
+        self._last_tag = dict.fromkeys(self.weights, 0.0)
+        self._next_start = 0.0
+        self._stats = {p: _ClassStats() for p in self.weights}
+
+    @contextmanager
+    def priority(self, priority: str) -> Iterator[None]:
+        """
+        Tags requests made by the current thread inside the block with the
+        given priority.
+        """
+        if priority not in self.weights:
+            raise ValueError("Unknown priority '{}'".format(priority))
+        previous = getattr(self._local, 'priority', None)
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def current_priority(self) -> str:
+        return getattr(self._local, 'priority', None) or self.default_priority
+
+    def _admissible(self, sequence: int, now: float) -> bool:
+        return (self._queue[0][1] == sequence and
+                self._in_flight < self.max_concurrency and
+                now >= self._next_start)
+
+    def _leave_queue(self, entry: QueueEntry) -> None:
+        self._queue.remove(entry)
+        heapq.heapify(self._queue)
+        self._condition.notify_all()
+
+    def acquire(self,
+                priority: Optional[str] = None,
+                deadline: Optional[Deadline] = None) -> None:
+        """
+        Blocks until a request of the given priority (by default the current
+        thread's) may be sent. Call `release()` when it has completed.
+
+        If the deadline passes first, the request leaves the queue and
+        `DeadlineExceeded` is raised.
+        """
+        priority = priority or self.current_priority()
+        weight = self.weights[priority]
+        stats = self._stats[priority]
+
+        with self._condition:
+            enqueued = self._clock()
+            start_tag = max(self._virtual_time, self._last_tag[priority])
+            self._last_tag[priority] = start_tag + 1.0 / weight
+            sequence = next(self._sequence)
+            heapq.heappush(self._queue, (start_tag, sequence))
+            stats.waiting += 1
+
+            while True:
+                now = self._clock()
+                if self._admissible(sequence, now):
+                    break
+                if deadline is not None and deadline.expired():
+                    self._leave_queue((start_tag, sequence))
+                    stats.waiting -= 1
+                    raise DeadlineExceeded(
+                        'Deadline passed after waiting {:.3f}s for a '
+                        'request slot'.format(now - enqueued))
+                timeout = None
+                if self._queue[0][1] == sequence and now < self._next_start:
+                    timeout = self._next_start - now
+                if deadline is not None:
+                    remaining = deadline.remaining()
+                    timeout = (remaining if timeout is None
+                               else min(timeout, remaining))
+                self._condition.wait(timeout)
+
+            heapq.heappop(self._queue)
+            self._in_flight += 1
+            self._virtual_time = start_tag
+            if self.max_rate:
+                self._next_start = max(now, self._next_start) + \
+                    1.0 / self.max_rate
+
+            wait = now - enqueued
+            stats.waiting -= 1
+            stats.requests += 1
+            stats.total_wait += wait
+            stats.max_wait = max(stats.max_wait, wait)
+            self._condition.notify_all()
+
+    def release(self) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self,
+             priority: Optional[str] = None,
+             deadline: Optional[Deadline] = None) -> Iterator[None]:
+        """
+        Holds a request slot for the duration of the block.
+        """
+        self.acquire(priority, deadline)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def wrap(self,
+             callback: Callable[..., Any],
+             deadline: Optional[Deadline] = None) -> Callable[..., Any]:
+        """
+        Returns a version of `callback` that runs inside a request slot of
+        the calling thread's priority, waiting for the slot no longer than
+        the deadline allows.
+        """
+        def scheduled(*args, **kwargs):
+            with self.slot(deadline=deadline):
+                return callback(*args, **kwargs)
+        return scheduled
+
+    def stats(self) -> List[PriorityStats]:
+        """
+        Returns the number of admitted and waiting requests and the queueing
+        delay (in seconds) of each priority class.
+        """
+        with self._condition:
+            return [
+                PriorityStats(
+                    priority=priority,
+                    requests=s.requests,
+                    waiting=s.waiting,
+                    mean_wait=s.total_wait / s.requests if s.requests else 0.0,
+                    max_wait=s.max_wait)
+                for priority, s in sorted(
+                    self._stats.items(), key=lambda i: -self.weights[i[0]])
+            ]
@@ -0,0 +1,84 @@
+import threading
+from concurrent import futures
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional
+
+from canvas_api_client.deadline import Deadline
+from canvas_api_client.errors import DeadlineExceeded
+
+SingleFlightStats = NamedTuple('SingleFlightStats', [
+    ('calls', int),
+    ('executed', int),
+    ('collapsed', int),
+])
+
+InFlightCalls = Dict[Hashable, futures.Future]
+
+
+class SingleFlight(object):
+    """
+    Collapses concurrent calls with the same key into a single execution.
+
+    The first caller for a key runs the function; callers arriving with the
+    same key while it is running wait for it and receive the same result (or
+    the same exception). Once the call finishes, the next caller for the key
+    runs the function again, so results are never cached beyond a call.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls = {}  # type: InFlightCalls
+        self._total = 0
+        self._collapsed = 0
+
+    def do(self,
+           key: Hashable,
+           fn: Callable[[], Any],
+           deadline: Optional[Deadline] = None) -> Any:
+        """
+        Runs `fn()` unless a call with the same key is already in flight, in
+        which case its result is returned instead.
+
+        A caller waiting for another caller's call waits no longer than its
+        own deadline allows, then raises `DeadlineExceeded`.
+        """
+        with self._lock:
+            self._total += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self._collapsed += 1
+                leader = False
+            else:
+                call = futures.Future()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            if deadline is None:
+                return call.result()
+            try:
+                return call.result(timeout=deadline.remaining())
+            except futures.TimeoutError:
+                raise DeadlineExceeded(
+                    'Deadline exceeded waiting for an identical request')
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                del self._calls[key]
+            call.set_exception(e)
+            raise
+        with self._lock:
+            del self._calls[key]
+        call.set_result(result)
+        return result
+
+    def stats(self) -> SingleFlightStats:
+        """
+        Returns the number of calls made, executed and collapsed so far.
+        """
+        with self._lock:
+            return SingleFlightStats(
+                calls=self._total,
+                executed=self._total - self._collapsed,
+                collapsed=self._collapsed)
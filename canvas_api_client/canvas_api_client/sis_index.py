@@ -0,0 +1,158 @@
+"""
+A local index of SIS IDs to Canvas IDs for courses and accounts.
+
+Requests made with a SIS ID (`sis_course_id:ABC`) make Canvas resolve the ID
+on every call. A `SisIdIndex` remembers the mapping from course listings the
+client fetches anyway, so SIS-keyed calls can use the Canvas ID directly:
+
+    >>> index = SisIdIndex('sis_ids.json')
+    >>> api = CanvasAPIv1(url, token, sis_index=index)
+    >>> for page in api.get_account_courses('1'):
+    ...     pass
+    >>> api.get_course_info('ABC', is_sis_course_id=True)  # uses courses/42
+    >>> index.save()
+
+Courses are indexed from their `sis_course_id`, and accounts from a course's
+`account` when the listing was made with `include[]=account`. A SIS ID that
+has since been moved to another course resolves to the old course until the
+index sees the new mapping, so call `clear()` after SIS ID changes.
+"""
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, NamedTuple, Optional
+
+SisIndexStats = NamedTuple('SisIndexStats', [
+    ('courses', int),
+    ('accounts', int),
+    ('hits', int),
+    ('misses', int),
+])
+
+
+class _Mapping(object):
+    """
+    A two-way mapping between SIS IDs and Canvas IDs.
+    """
+
+    def __init__(self, sis_to_canvas: Optional[Dict[str, int]] = None) -> None:
+        self.sis_to_canvas = {}  # type: Dict[str, int]
+        self.canvas_to_sis = {}  # type: Dict[int, str]
+        for sis_id, canvas_id in (sis_to_canvas or {}).items():
+            self.add(sis_id, canvas_id)
+
+    def add(self, sis_id: Any, canvas_id: Any) -> None:
+        sis_id, canvas_id = str(sis_id), int(canvas_id)
+        previous = self.sis_to_canvas.get(sis_id)
+        if previous is not None and previous != canvas_id:
+            self.canvas_to_sis.pop(previous, None)
+        previous_sis_id = self.canvas_to_sis.get(canvas_id)
+        if previous_sis_id is not None and previous_sis_id != sis_id:
+            self.sis_to_canvas.pop(previous_sis_id, None)
+        self.sis_to_canvas[sis_id] = canvas_id
+        self.canvas_to_sis[canvas_id] = sis_id
+
+
+class SisIdIndex(object):
+    """
+    Maps SIS course and account IDs to Canvas IDs and back. If a `path` is
+    given, the index is loaded from it (when it exists) and `save()` writes
+    to it.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._courses = _Mapping()
+        self._accounts = _Mapping()
+        self._hits = 0
+        self._misses = 0
+        if path is not None and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            self._courses = _Mapping(data.get('courses'))
+            self._accounts = _Mapping(data.get('accounts'))
+
+    def add_course(self, course: Dict[str, Any]) -> None:
+        """
+        Indexes a course object, and its account if it was included.
+        """
+        with self._lock:
+            self._add_course(course)
+
+    def add_courses(self, courses: Iterable[Dict[str, Any]]) -> None:
+        with self._lock:
+            for course in courses:
+                self._add_course(course)
+
+    def _add_course(self, course: Dict[str, Any]) -> None:
+        if course.get('sis_course_id') and course.get('id') is not None:
+            self._courses.add(course['sis_course_id'], course['id'])
+        account = course.get('account')
+        if isinstance(account, dict):
+            self._add_account(account)
+
+    def add_account(self, account: Dict[str, Any]) -> None:
+        """
+        Indexes an account object.
+        """
+        with self._lock:
+            self._add_account(account)
+
+    def _add_account(self, account: Dict[str, Any]) -> None:
+        if account.get('sis_account_id') and account.get('id') is not None:
+            self._accounts.add(account['sis_account_id'], account['id'])
+
+    def _lookup(self, mapping: Dict[Any, Any], key: Any) -> Any:
+        with self._lock:
+            value = mapping.get(key)
+            if value is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+            return value
+
+    def canvas_course_id(self, sis_course_id: str) -> Optional[int]:
+        return self._lookup(self._courses.sis_to_canvas, str(sis_course_id))
+
+    def sis_course_id(self, course_id: int) -> Optional[str]:
+        return self._lookup(self._courses.canvas_to_sis, int(course_id))
+
+    def canvas_account_id(self, sis_account_id: str) -> Optional[int]:
+        return self._lookup(self._accounts.sis_to_canvas, str(sis_account_id))
+
+    def sis_account_id(self, account_id: int) -> Optional[str]:
+        return self._lookup(self._accounts.canvas_to_sis, int(account_id))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._courses = _Mapping()
+            self._accounts = _Mapping()
+
+    def stats(self) -> SisIndexStats:
+        """
+        Returns the number of indexed courses and accounts, and how many
+        lookups found an ID.
+        """
+        with self._lock:
+            return SisIndexStats(
+                courses=len(self._courses.sis_to_canvas),
+                accounts=len(self._accounts.sis_to_canvas),
+                hits=self._hits,
+                misses=self._misses)
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Writes the index to `path` (by default, the one it was loaded
+        from), atomically.
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError('No path to save the SIS ID index to')
+        with self._lock:
+            data = {'courses': self._courses.sis_to_canvas,
+                    'accounts': self._accounts.sis_to_canvas}
+            temp_path = path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'), sort_keys=True)
+            os.replace(temp_path, path)
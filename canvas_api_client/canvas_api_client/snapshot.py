@@ -0,0 +1,277 @@
+"""
+Indexed local snapshots of crawled records.
+
+A snapshot is a newline-delimited JSON file with one sidecar index per
+indexed field (`<path>.<field>.idx`). Each index is an open-addressing hash
+table of (64-bit key hash, record offset) slots, so a reader can memory-map
+the files and find a record by ID in O(1), decoding only the lines it
+returns:
+
+    >>> users = api.get_course_users('1234', flatten_response=True)
+    >>> write_snapshot('users.ndjson', users, ['id', 'sis_user_id'])
+    >>> with SnapshotReader('users.ndjson') as snapshot:
+    ...     user = snapshot.get(42)
+    ...     same_user = snapshot.get('UNI123', field='sis_user_id')
+
+Indexed values are compared as strings, so `get(42)` and `get('42')` find
+the same record. Fields may be dotted paths into nested objects (e.g.
+`user.sis_user_id`). Values need not be unique: `find()` returns every
+record with the value.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from canvas_api_client.progress import iter_records
+
+Record = Dict[str, Any]
+
+_MAGIC = b'SNX1'
+_HEADER = struct.Struct('<4sQQ')
+_SLOT = struct.Struct('<QQ')
+
+
+def _key_hash(value: Any) -> int:
+    digest = hashlib.sha1(str(value).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+def _field_value(record: Record, field: str) -> Any:
+    value = record  # type: Any
+    for name in field.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(name)
+    return value
+
+
+def index_path(path: str, field: str) -> str:
+    return '{}.{}.idx'.format(path, field)
+
+
+def _write_index(path: str, hashes: array, offsets: array) -> None:
+    """
+    Writes a hash table with linear probing, at most half full. Offsets are
+    stored plus one, so an empty slot is all zeroes.
+    """
+    capacity = 8
+    while capacity < 2 * len(hashes):
+        capacity *= 2
+    mask = capacity - 1
+    # Slot i is (slots[2 * i], slots[2 * i + 1]).
+    slots = array('Q', bytes(_SLOT.size * capacity))
+    for key_hash, offset in zip(hashes, offsets):
+        slot = key_hash & mask
+        while slots[2 * slot + 1]:
+            slot = (slot + 1) & mask
+        slots[2 * slot] = key_hash
+        slots[2 * slot + 1] = offset + 1
+    if sys.byteorder != 'little':
+        slots.byteswap()
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, capacity, len(hashes)))
+        slots.tofile(f)
+
+
+class SnapshotWriter(object):
+    """
+    Streams records to an NDJSON snapshot and writes the indexes of
+    `index_fields` when closed. Index entries take 16 bytes per record and
+    field in memory until then.
+
+    The data and indexes are written to temporary files next to `path` and
+    moved into place when the writer is closed, so a rewrite that fails (or
+    is never closed) leaves the previous snapshot intact.
+    """
+
+    def __init__(self,
+                 path: str,
+                 index_fields: Sequence[str] = ('id',)) -> None:
+        self.path = path
+        self.index_fields = list(index_fields)
+        self.count = 0
+        self._temp_path = path + '.tmp'
+        self._file = open(self._temp_path, 'wb')
+        self._offset = 0
+        self._hashes = {f: array('Q') for f in self.index_fields}
+        self._offsets = {f: array('Q') for f in self.index_fields}
+
+    def write(self, record: Record) -> None:
+        line = json.dumps(record, separators=(',', ':')).encode('utf-8')
+        for field in self.index_fields:
+            value = _field_value(record, field)
+            if value is not None:
+                self._hashes[field].append(_key_hash(value))
+                self._offsets[field].append(self._offset)
+        self._file.write(line)
+        self._file.write(b'\n')
+        self._offset += len(line) + 1
+        self.count += 1
+
+    def write_all(self, records: Iterable[Any]) -> int:
+        """
+        Writes every record, or every record of every page, and returns how
+        many were written.
+        """
+        count = self.count
+        for record in iter_records(records):
+            self.write(record)
+        return self.count - count
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self._file.close()
+        index_paths = [index_path(self.path, field)
+                       for field in self.index_fields]
+        for path, field in zip(index_paths, self.index_fields):
+            _write_index(path + '.tmp',
+                         self._hashes[field], self._offsets[field])
+        # The old indexes go first, so a crash part way leaves a snapshot
+        # without indexes rather than indexes into the wrong data.
+        for path in index_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        os.replace(self._temp_path, self.path)
+        for path in index_paths:
+            os.replace(path + '.tmp', path)
+
+    def discard(self) -> None:
+        """
+        Stops writing and leaves the previous snapshot (if any) in place.
+        """
+        if self._file.closed:
+            return
+        self._file.close()
+        os.remove(self._temp_path)
+
+    def __enter__(self) -> 'SnapshotWriter':
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is not None:
+            self.discard()
+        else:
+            self.close()
+
+
+def write_snapshot(path: str,
+                   records: Iterable[Any],
+                   index_fields: Sequence[str] = ('id',)) -> int:
+    """
+    Writes records (or pages of records) to an indexed snapshot at `path`
+    and returns how many were written.
+    """
+    with SnapshotWriter(path, index_fields) as writer:
+        return writer.write_all(records)
+
+
+def _map(path: str) -> Optional[mmap.mmap]:
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _decode_line(data: mmap.mmap, offset: int) -> Record:
+    end = data.find(b'\n', offset)
+    return json.loads(data[offset:end].decode('utf-8'))
+
+
+class _Index(object):
+
+    def __init__(self, path: str) -> None:
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.capacity, self.count = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            raise ValueError('{} is not a snapshot index'.format(path))
+        self._mask = self.capacity - 1
+
+    def offsets(self, key_hash: int) -> Iterator[int]:
+        """
+        Returns the offsets of the records whose key has the given hash.
+        """
+        slot = key_hash & self._mask
+        while True:
+            slot_hash, offset = _SLOT.unpack_from(
+                self._map, _HEADER.size + slot * _SLOT.size)
+            if not offset:
+                return
+            if slot_hash == key_hash:
+                yield offset - 1
+            slot = (slot + 1) & self._mask
+
+    def close(self) -> None:
+        self._map.close()
+
+
+class SnapshotReader(object):
+    """
+    Reads a snapshot written by `SnapshotWriter`. The data file and the
+    indexes are memory-mapped, so only the pages touched by lookups are
+    read from disk.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._map = _map(path)
+        self._indexes = {}  # type: Dict[str, _Index]
+
+    def _index(self, field: str) -> _Index:
+        if field not in self._indexes:
+            path = index_path(self.path, field)
+            if not os.path.exists(path):
+                raise KeyError("Snapshot has no index on '{}'".format(field))
+            self._indexes[field] = _Index(path)
+        return self._indexes[field]
+
+    def find(self, value: Any, field: str = 'id') -> List[Record]:
+        """
+        Returns every record whose `field` equals `value`, in file order.
+        """
+        data = self._map
+        if data is None:
+            return []
+        records = []
+        for offset in sorted(self._index(field).offsets(_key_hash(value))):
+            record = _decode_line(data, offset)
+            if str(_field_value(record, field)) == str(value):
+                records.append(record)
+        return records
+
+    def get(self, value: Any, field: str = 'id') -> Optional[Record]:
+        """
+        Returns the first record whose `field` equals `value`, or None.
+        """
+        records = self.find(value, field)
+        return records[0] if records else None
+
+    def __iter__(self) -> Iterator[Record]:
+        """
+        Returns a generator of every record, in file order.
+        """
+        data = self._map
+        offset = 0
+        while data is not None and offset < len(data):
+            record = _decode_line(data, offset)
+            offset = data.find(b'\n', offset) + 1
+            yield record
+
+    def close(self) -> None:
+        for index in self._indexes.values():
+            index.close()
+        if self._map is not None:
+            self._map.close()
+
+    def __enter__(self) -> 'SnapshotReader':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,172 @@
+"""
+Spread requests across several API tokens.
+
+Canvas rate-limits each access token separately, using a leaky bucket whose
+level is reported back in the "X-Rate-Limit-Remaining" response header. A
+`TokenPool` tracks that value for every token and hands out the token with
+the most budget left. When Canvas rejects a request with "403 Forbidden
+(Rate Limit Exceeded)" (or a 429), the token is taken out of rotation for a
+cool-down period.
+"""
+import threading
+import time
+from typing import (
+    Any, Callable, Iterable, List, NamedTuple, Optional, Sequence, Union)
+
+from canvas_api_client.deadline import Deadline, TimeBudget
+
+TokenStats = NamedTuple('TokenStats', [
+    ('token', str),
+    ('remaining', Optional[float]),
+    ('in_flight', int),
+    ('throttled', bool),
+    ('requests', int),
+    ('throttle_count', int),
+])
+
+
+def is_throttled_response(response: Any) -> bool:
+    """
+    Returns True if Canvas rejected the request because of rate limiting.
+    """
+    status = getattr(response, 'status_code', None)
+    if status == 429:
+        return True
+    if status == 403:
+        return 'Rate Limit Exceeded' in (getattr(response, 'text', '') or '')
+    return False
+
+
+def _mask(token: str) -> str:
+    return '{}...{}'.format(token[:4], token[-4:]) if len(token) > 8 else '***'
+
+
+class _TokenState(object):
+
+    def __init__(self, token: str) -> None:
+        self.token = token
+        self.remaining = None  # type: Optional[float]
+        self.in_flight = 0
+        self.throttled_until = 0.0
+        self.requests = 0
+        self.throttle_count = 0
+
+    def score(self) -> float:
+        """
+        Budget left after the requests already in flight. Tokens that have
+        not been used yet are preferred, since their bucket is likely full.
+        """
+        if self.remaining is None:
+            return float('inf')
+        return self.remaining - self.in_flight
+
+
+class TokenPool(object):
+    """
+    A thread-safe pool of API tokens that routes each request to the token
+    with the most rate-limit budget remaining.
+
+    Pass a pool (or simply a list of tokens) as the `api_token` argument of
+    `CanvasAPIv1`.
+    """
+
+    def __init__(self,
+                 tokens: Iterable[str],
+                 cooldown: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self._states = [_TokenState(token) for token in tokens]
+        if not self._states:
+            raise ValueError('A token pool needs at least one token')
+        self._by_token = {state.token: state for state in self._states}
+        self.cooldown = cooldown
+        self._clock = clock
+        self._condition = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def _available(self, now: float) -> List[_TokenState]:
+        return [s for s in self._states if s.throttled_until <= now]
+
+    def acquire(self,
+                timeout: Optional[float] = None,
+                deadline: Optional[Deadline] = None) -> str:
+        """
+        Returns the token with the most remaining budget. If every token is
+        throttled, blocks until the first cool-down ends (or `timeout`
+        seconds pass, in which case the token whose cool-down ends first is
+        returned anyway).
+
+        A caller's deadline also bounds the wait: once it passes,
+        `DeadlineExceeded` is raised, or for a `TimeBudget`, the token whose
+        cool-down ends first is returned.
+        """
+        with self._condition:
+            give_up_at = None if timeout is None else self._clock() + timeout
+            while True:
+                now = self._clock()
+                available = self._available(now)
+                if available:
+                    break
+                if deadline is not None and deadline.expired():
+                    if not isinstance(deadline, TimeBudget):
+                        deadline.check()
+                    give_up_at = now
+                wake_at = min(s.throttled_until for s in self._states)
+                if give_up_at is not None and give_up_at <= now:
+                    available = [min(self._states,
+                                     key=lambda s: s.throttled_until)]
+                    break
+                if give_up_at is not None:
+                    wake_at = min(wake_at, give_up_at)
+                wait = wake_at - now
+                if deadline is not None:
+                    wait = min(wait, deadline.remaining())
+                self._condition.wait(wait)
+
+            state = max(available, key=lambda s: s.score())
+            state.in_flight += 1
+            state.requests += 1
+            return state.token
+
+    def release(self, token: str, response: Any = None) -> None:
+        """
+        Returns a token to the pool, updating its budget from the response
+        headers. A rate-limited response puts the token on cool-down.
+        """
+        with self._condition:
+            state = self._by_token[token]
+            state.in_flight -= 1
+            if response is not None:
+                headers = getattr(response, 'headers', None) or {}
+                remaining = headers.get('X-Rate-Limit-Remaining')
+                if remaining is not None:
+                    try:
+                        state.remaining = float(remaining)
+                    except (TypeError, ValueError):
+                        pass
+                if is_throttled_response(response):
+                    state.remaining = 0.0
+                    state.throttled_until = self._clock() + self.cooldown
+                    state.throttle_count += 1
+            self._condition.notify_all()
+
+    def stats(self) -> List[TokenStats]:
+        """
+        Returns the tracked state of every token. Tokens are masked.
+        """
+        with self._condition:
+            now = self._clock()
+            return [
+                TokenStats(token=_mask(s.token),
+                           remaining=s.remaining,
+                           in_flight=s.in_flight,
+                           throttled=s.throttled_until > now,
+                           requests=s.requests,
+                           throttle_count=s.throttle_count)
+                for s in self._states
+            ]
+
+
+# A single token, a list of tokens or a pool, as accepted by the clients.
+ApiTokens = Union[str, Sequence[str], TokenPool]
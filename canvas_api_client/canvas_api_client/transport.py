@@ -0,0 +1,227 @@
+"""
+HTTP transports used by the Canvas API clients.
+
+A transport sends a single HTTP request and returns a `requests.Response` or
+an object with the same interface. The client only relies on the
+`get`/`put`/`post`/`delete` methods, so the requests library itself, a
+`requests.Session` and any object with those methods can still be passed to
+the client as `requests_lib`; they are wrapped in a `RequestsTransport`.
+
+Neither requests nor urllib3 is imported until a transport that needs it is
+created, which keeps `import canvas_api_client.v1_client` cheap for
+short-lived scripts.
+"""
+import os
+import socket
+import sys
+import threading
+from abc import ABCMeta, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlencode
+
+from canvas_api_client.response import SimpleResponse
+from canvas_api_client.types import RequestParams, Response, Timeout
+
+RequestBody = Optional[Union[str, bytes]]
+
+# Form data, or an already encoded body.
+RequestData = Union[RequestParams, str, bytes]
+
+# The number of redirects requests follows before giving up.
+MAX_REDIRECTS = 30
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """
+    Returns True if a request failed without a response because the
+    connection could not be made, broke or timed out, with either transport
+    (or the requests library). Neither library is imported to check.
+    """
+    if isinstance(error, (ConnectionError, socket.timeout)):
+        return True
+    requests = sys.modules.get('requests')
+    if requests is not None and isinstance(
+            error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    urllib3 = sys.modules.get('urllib3')
+    if urllib3 is None:
+        return False
+    exceptions = urllib3.exceptions
+    if isinstance(error, exceptions.MaxRetryError):
+        return error.reason is not None and is_connection_error(error.reason)
+    return isinstance(error, (exceptions.NewConnectionError,
+                              exceptions.ProtocolError,
+                              exceptions.TimeoutError))
+
+
+class Transport(metaclass=ABCMeta):
+    """
+    Base class (interface) for HTTP transports.
+
+    Subclasses implement `request()`; the per-method helpers mirror the
+    requests API so a transport can stand in for the requests library.
+    """
+
+    @abstractmethod
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        """
+        Sends an HTTP request. Supported keyword arguments are `headers`,
+        `params`, `data`, `files` and `timeout`, with the same meaning as in
+        requests.
+        """
+
+    def get(self, url: str, **kwargs) -> Response:
+        return self.request('GET', url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> Response:
+        return self.request('PUT', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> Response:
+        return self.request('POST', url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> Response:
+        return self.request('DELETE', url, **kwargs)
+
+
+class RequestsTransport(Transport):
+    """
+    Sends requests with the requests library, or with any object that has
+    requests-style `get`/`put`/`post`/`delete` methods (e.g. a
+    `requests.Session` or a Requests-OAuthlib session).
+
+    If no library is given, requests is imported on first use and a single
+    `requests.Session` is created, so connections are pooled and reused by
+    every thread sharing the transport. `pool_maxsize` sets how many
+    connections per host the pool keeps open; set it to at least the number
+    of threads making requests.
+    """
+
+    def __init__(self,
+                 requests_lib: Optional[Any] = None,
+                 pool_maxsize: int = 10) -> None:
+        self._requests_lib = requests_lib
+        self._pool_maxsize = pool_maxsize
+        self._lock = threading.Lock()
+
+    def _create_session(self) -> Any:
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=self._pool_maxsize)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    @property
+    def requests_lib(self) -> Any:
+        if self._requests_lib is None:
+            with self._lock:
+                if self._requests_lib is None:
+                    self._requests_lib = self._create_session()
+        return self._requests_lib
+
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        callback = getattr(self.requests_lib, method.lower())
+        return callback(url, **kwargs)
+
+
+def _encode_pairs(values: RequestParams) -> List[Tuple[str, Any]]:
+    """
+    Flattens a params or form data dict into key/value pairs the way requests
+    does: list values become repeated keys and None values are dropped.
+    """
+    pairs = []  # type: List[Tuple[str, Any]]
+    for key, value in (values or {}).items():
+        if isinstance(value, (list, tuple)):
+            pairs.extend((key, v) for v in value if v is not None)
+        elif value is not None:
+            pairs.append((key, value))
+    return pairs
+
+
+class Urllib3Transport(Transport):
+    """
+    A lightweight transport built directly on urllib3.
+
+    Connections are kept in a `urllib3.PoolManager`, which is thread-safe and
+    reuses connections per host. Responses are returned as
+    `canvas_api_client.response.SimpleResponse` objects.
+
+    It behaves like requests: failed requests are not retried, redirects
+    are followed (up to `MAX_REDIRECTS`), and a single timeout applies to
+    connecting and to each read, not to the whole request.
+    """
+
+    def __init__(self,
+                 num_pools: int = 4,
+                 maxsize: int = 10,
+                 pool_manager: Optional[Any] = None) -> None:
+        import urllib3
+        self._urllib3 = urllib3
+        if pool_manager is None:
+            # A total of 0 would count redirects too, so each kind of
+            # retry is disabled on its own.
+            retries = urllib3.Retry(total=None, connect=0, read=0, status=0,
+                                    other=0, redirect=MAX_REDIRECTS)
+            pool_manager = urllib3.PoolManager(
+                num_pools=num_pools, maxsize=maxsize, retries=retries)
+        self._pool = pool_manager
+
+    def _timeout(self, timeout: Timeout) -> Any:
+        if timeout is None:
+            return None
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return self._urllib3.Timeout(connect=connect, read=read)
+        return self._urllib3.Timeout(connect=timeout, read=timeout)
+
+    def request(self,
+                method: str,
+                url: str,
+                headers: Optional[Dict[str, Any]] = None,
+                params: RequestParams = None,
+                data: RequestData = None,
+                files: Optional[Dict[str, Any]] = None,
+                timeout: Timeout = None,
+                **kwargs) -> Response:
+        query = urlencode(_encode_pairs(params))
+        if query:
+            url = '{}{}{}'.format(url, '&' if '?' in url else '?', query)
+
+        headers = dict(headers or {})
+        body = None  # type: RequestBody
+        if isinstance(data, (str, bytes)):
+            body = data
+        elif files:
+            fields = _encode_pairs(data)
+            for name, f in files.items():
+                filename = os.path.basename(getattr(f, 'name', name))
+                fields.append((name, (filename, f.read())))
+            body, content_type = self._urllib3.encode_multipart_formdata(
+                fields)
+            headers['Content-Type'] = content_type
+        elif data is not None:
+            body = urlencode(_encode_pairs(data))
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+
+        response = self._pool.request(
+            method, url, headers=headers, body=body,
+            timeout=self._timeout(timeout), **kwargs)
+
+        return SimpleResponse(
+            response.status,
+            url,
+            headers=dict(response.headers),
+            content=response.data,
+            reason=response.reason or '')
+
+
+def get_transport(name: str, **kwargs) -> Transport:
+    """
+    Returns a transport by name: "requests" or "urllib3".
+    """
+    if name == 'requests':
+        return RequestsTransport(**kwargs)
+    if name == 'urllib3':
+        return Urllib3Transport(**kwargs)
+    raise ValueError("Unknown transport '{}'".format(name))
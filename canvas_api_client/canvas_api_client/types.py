@@ -1,5 +1,12 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple, Union
 
 # Request types:
 RequestHeaders = Optional[Dict[str, Any]]
 RequestParams = Optional[Dict[str, Any]]
+
+# Request timeout: total seconds, or a (connect, read) tuple of seconds.
+Timeout = Optional[Union[float, Tuple[float, float]]]
+
+# Response type: a requests.Response, or an object with the same interface
+# such as canvas_api_client.response.SimpleResponse.
+Response = Any
@@ -1,12 +1,24 @@
+import json
 import logging
-from typing import Any, Dict, Iterator, List, Optional
+import time
+from urllib.parse import urljoin
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
+from canvas_api_client.autotune import PageSizeTuner
+from canvas_api_client.deadline import Deadline, TimeBudget, should_stop
 from canvas_api_client.errors import APIPaginationException
+from canvas_api_client.hedging import HedgingPolicy
 from canvas_api_client.interface import CanvasAPIClient
-from canvas_api_client.types import RequestHeaders, RequestParams
-
-import requests
-from requests import Response
+from canvas_api_client.progress import (
+    PageProgress, PaginatedIterator, ProgressCallback)
+from canvas_api_client.scheduler import RequestScheduler
+from canvas_api_client.sis_index import SisIdIndex
+from canvas_api_client.singleflight import SingleFlight, SingleFlightStats
+from canvas_api_client.tokens import (
+    ApiTokens, TokenPool, is_throttled_response)
+from canvas_api_client.transport import RequestsTransport, Transport
+from canvas_api_client.types import (
+    RequestHeaders, RequestParams, Response, Timeout)
 
 logger = logging.getLogger()
 
@@ -18,31 +30,88 @@ class CanvasAPIv1(CanvasAPIClient):
     This client can be used to make requests to the v1 Canvas API.
 
     Create separate clients for other versions of the Canvas API.
+
+    A single client can be shared between threads: requests are built from
+    copies of the caller's params and headers, and the client holds no
+    per-request state. Share one transport (and so one connection pool)
+    by sharing the client.
     """
 
     def __init__(self,
                  api_url: str,
-                 api_token: Optional[str] = None,
-                 requests_lib: Optional[Any] = requests,
+                 api_token: Optional[ApiTokens] = None,
+                 requests_lib: Optional[Any] = None,
                  per_page: Optional[int] = 100,
                  is_sis_course_id: Optional[bool] = False,
                  is_sis_account_id: Optional[bool] = False,
                  flatten_response: Optional[bool] = False,
+                 coalesce_gets: Optional[bool] = False,
+                 scheduler: Optional[RequestScheduler] = None,
+                 hedging: Optional[HedgingPolicy] = None,
+                 timeout: Timeout = None,
+                 page_tuner: Optional[PageSizeTuner] = None,
+                 sis_index: Optional[SisIdIndex] = None,
                  ) -> None:
         """
         Creates a canvas API client given a base URL for the API, an optional
         API token, and an optional requests library.
 
-        The optional requests library should be either the python HTTP requests
+        The optional requests library should be either a
+        `canvas_api_client.transport.Transport`, the python HTTP requests
         library or the equivalent (e.g. a Requests-OAuthlib session object).
+        If it is not given, requests is imported the first time a request is
+        sent.
+
+        The API token may also be a list of tokens or a
+        `canvas_api_client.tokens.TokenPool`. Each request is then sent with
+        the token that has the most rate-limit budget left, and a token that
+        gets throttled is rested while the others carry the load.
+
+        If coalesce_gets is set, identical GET requests (same URL, params,
+        headers and token) made concurrently from several threads are sent
+        only once, and every caller receives the same response.
+
+        The optional scheduler (a
+        `canvas_api_client.scheduler.RequestScheduler`) limits concurrent
+        requests and admits them by priority, so interactive calls are not
+        stuck behind a background crawl.
+
+        The optional hedging policy (a
+        `canvas_api_client.hedging.HedgingPolicy`) re-sends GET requests that
+        are slower than usual and uses whichever copy answers first.
+
+        The optional timeout is passed to every request: either a number of
+        seconds, or a (connect, read) tuple. By default requests never time
+        out.
+
+        The optional page tuner (a
+        `canvas_api_client.autotune.PageSizeTuner`) replaces the fixed
+        per_page of paginated listings with a page size learned per endpoint.
+
+        The optional SIS ID index (a `canvas_api_client.sis_index.SisIdIndex`)
+        learns the Canvas IDs of the courses in account course listings, and
+        calls made with a known SIS course or account ID then use the Canvas
+        ID instead.
         """
+        if not isinstance(requests_lib, Transport):
+            requests_lib = RequestsTransport(requests_lib)
+
+        if isinstance(api_token, (list, tuple)):
+            api_token = TokenPool(api_token)
+
         self._api_url = api_url
         self._api_token = api_token
-        self._requests_lib = requests_lib
+        self._transport = requests_lib
         self._per_page = per_page
         self._is_sis_course_id = is_sis_course_id
         self._is_sis_account_id = is_sis_account_id
         self._flatten_response = flatten_response
+        self._single_flight = SingleFlight() if coalesce_gets else None
+        self._scheduler = scheduler
+        self._hedging = hedging
+        self._timeout = timeout
+        self._page_tuner = page_tuner
+        self._sis_index = sis_index
 
     def _get_url(self, endpoint: str) -> str:
         """
@@ -51,42 +120,107 @@ class CanvasAPIv1(CanvasAPIClient):
         return "{base_url}{endpoint}".format(
             base_url=self._api_url, endpoint=endpoint)
 
-    def _add_bearer_token(self, headers: Dict[str, Any]):
+    def _add_bearer_token(self,
+                          headers: Dict[str, Any],
+                          token: Optional[str] = None):
         """
         Adds the authentication bearer token. Only run this if the token
         exists.
         """
-        token_str = "Bearer {}".format(self._api_token)
+        token_str = "Bearer {}".format(token or self._api_token)
         headers.update({'Authorization': token_str})
 
+    def _send_with_token_pool(self,
+                              pool: TokenPool,
+                              callback,
+                              url: str,
+                              headers: Dict[str, Any],
+                              deadline: Optional[Deadline] = None,
+                              **kwargs) -> Response:
+        """
+        Sends a request with a token from the pool. If the token turns out to
+        be throttled, the request is sent again with another token, as long
+        as the pool has untried tokens and the request has no file upload
+        (which cannot be re-read).
+
+        Waiting for a token is bounded by the deadline.
+        """
+        attempts = 1 if 'files' in kwargs else len(pool)
+        for attempt in range(attempts):
+            token = pool.acquire(deadline=deadline)
+            token_headers = dict(headers)
+            self._add_bearer_token(token_headers, token)
+            try:
+                response = callback(url, headers=token_headers, **kwargs)
+            except Exception:
+                pool.release(token)
+                raise
+            pool.release(token, response)
+            if not is_throttled_response(response):
+                break
+            logger.debug('Token throttled for url "{}"'.format(url))
+        return response
+
     def _send_request(self,
                       callback,
                       url: str,
                       exit_on_error: bool = True,
                       headers: RequestHeaders = None,
                       params: RequestParams = None,
+                      deadline: Optional[Deadline] = None,
+                      paginated: bool = True,
                       **kwargs) -> Response:
         """
         Sends an API call to the Canvas server via callback method.
 
-        The callback should be a requests.<func> function or the equivalent.
+        The callback should be a Transport method, a requests.<func> function
+        or the equivalent.
 
         Note: since raise_for_status() will raise an exception for error
         codes, the user is responsible for catching `HTTPError`
         exceptions unless they run with the exit_on_error set to False.
+
+        The given headers and params are copied, never modified, so callers
+        can share them between requests and threads. Unless `paginated` is
+        False, the client's per_page is added to the params.
+
+        If a deadline is given, `DeadlineExceeded` is raised if it has
+        passed by the time the request may be sent (after waiting for a
+        token or a scheduler slot), and the request timeout is shortened to
+        end by it. A `TimeBudget` does neither: bulk operations check it
+        between requests, and a request sent within the budget may finish
+        after it.
         """
-        if headers is None:
-            headers = {}
-        if params is None:
-            params = {}
+        headers = dict(headers or {})
+        params = dict(params or {})
 
-        if 'per_page' not in params:
+        if paginated and 'per_page' not in params:
             params['per_page'] = self._per_page
 
-        if self._api_token is not None:
-            self._add_bearer_token(headers)
-
-        response = callback(url, headers=headers, params=params, **kwargs)
+        def send(url: str, **kwargs) -> Response:
+            # The timeout is set once the request may go out, so the time
+            # spent waiting for a token or a scheduler slot counts.
+            timeout = self._timeout
+            # spent waiting for a token or a scheduler slot counts. Checking
+            # after it is computed means a timeout of 0 is never sent.
+            if deadline is not None and not isinstance(deadline, TimeBudget):
+                timeout = deadline.timeout(timeout)
+                deadline.check()
+            if timeout is not None:
+                kwargs['timeout'] = timeout
+            return callback(url, **kwargs)
+
+        if self._scheduler is not None:
+            send = self._scheduler.wrap(send, deadline=deadline)
+
+        if isinstance(self._api_token, TokenPool):
+            response = self._send_with_token_pool(
+                self._api_token, send, url, headers, deadline=deadline,
+                params=params, **kwargs)
+        else:
+            if self._api_token is not None:
+                self._add_bearer_token(headers)
+            response = send(url, headers=headers, params=params, **kwargs)
         if not response.ok:
             logger.debug('Error status code for url "{}"'.format(response.url))
         if exit_on_error:
@@ -97,30 +231,76 @@ class CanvasAPIv1(CanvasAPIClient):
     def _get(self, *args, **kwargs) -> Response:
         """
         Sends a GET request to the API.
+
+        With GET coalescing enabled, waits for an identical request already
+        in flight instead of sending another one. With hedging enabled, a
+        slow request is duplicated and the first response wins.
+        """
+        def send() -> Response:
+            return self._send_request(self._transport.get, *args, **kwargs)
+
+        if self._hedging is not None:
+            send = self._hedged(self._hedging, send)
+
+        if self._single_flight is None:
+            return send()
+
+        # Each caller's deadline is left out of the key, so callers with
+        # their own deadlines still share a request (sent with the first
+        # caller's deadline); the others wait for it within their own.
+        key_kwargs = {name: value for name, value in kwargs.items()
+                      if name != 'deadline'}
+        key = json.dumps([args, key_kwargs], sort_keys=True, default=str)
+        deadline = kwargs.get('deadline')
+        if isinstance(deadline, TimeBudget):
+            deadline = None
+        return self._single_flight.do(key, send, deadline)
+
+    def _hedged(self,
+                hedging: HedgingPolicy,
+                send: Callable[[], Response]) -> Callable[[], Response]:
+        """
+        Wraps a request function with the hedging policy. Hedged requests
+        run on worker threads, so the caller's scheduler priority is carried
+        over to them.
         """
-        return self._send_request(
-            self._requests_lib.get, *args, **kwargs)  # type: ignore
+        scheduler = self._scheduler
+        if scheduler is not None:
+            priority = scheduler.current_priority()
+            unscheduled = send
+
+            def send() -> Response:
+                with scheduler.priority(priority):
+                    return unscheduled()
+
+        return lambda: hedging.call(send)
 
     def _delete(self, *args, **kwargs) -> Response:
         """
         Sends a DELETE request to the API.
         """
-        return self._send_request(
-            self._requests_lib.delete, *args, **kwargs)  # type: ignore
+        return self._send_request(self._transport.delete, *args, **kwargs)
 
     def _post(self, *args, **kwargs) -> Response:
         """
         Sends a POST request to the API.
         """
-        return self._send_request(
-            self._requests_lib.post, *args, **kwargs)  # type: ignore
+        return self._send_request(self._transport.post, *args, **kwargs)
 
     def _put(self, *args, **kwargs) -> Response:
         """
         Sends a PUT request to the API.
         """
-        return self._send_request(
-            self._requests_lib.put, *args, **kwargs)  # type: ignore
+        return self._send_request(self._transport.put, *args, **kwargs)
+
+    def coalescing_stats(self) -> Optional[SingleFlightStats]:
+        """
+        Returns how many GET calls were made, sent and collapsed into an
+        identical in-flight request, or None if coalescing is disabled.
+        """
+        if self._single_flight is None:
+            return None
+        return self._single_flight.stats()
 
     def _check_response_headers_for_pagination(self, response: Response):
         """
@@ -134,48 +314,123 @@ class CanvasAPIv1(CanvasAPIClient):
                 "Canvas API did not return a response with pagination "
                 "for a request to {}".format(response.url))
 
-    def _get_paginated(self,
-                       url: str,
-                       headers: RequestHeaders = None,
-                       params: RequestParams = None) -> Iterator[Response]:
+    def _iter_responses(self,
+                        url: str,
+                        headers: RequestHeaders = None,
+                        params: RequestParams = None,
+                        deadline: Optional[Deadline] = None
+                        ) -> Iterator[Response]:
         """
-        Send an API call to the Canvas server with pagination.
+        Send an API call to the Canvas server and follow the pagination
+        links.
+
+        Returns a generator of response objects. With a deadline, no page is
+        requested after it passes: a `TimeBudget` ends the generator early
+        (with no pages at all if it had run out before the first one), any
+        other deadline raises `DeadlineExceeded`.
 
-        Returns a generator of response objects.
+        A per_page given in the params is kept for the following pages.
         """
-        response = self._get(url, headers=headers, params=params)
+        next_params = None  # type: RequestParams
+        if params and 'per_page' in params:
+            next_params = {'per_page': params['per_page']}
+
+        if isinstance(deadline, TimeBudget) and should_stop(deadline):
+            logger.debug('Time budget exhausted, not listing "{}"'.format(url))
+            return
+        response = self._get(url, headers=headers, params=params,
+                             deadline=deadline)
         self._check_response_headers_for_pagination(response)
 
-        yield response.json()
+        yield response
 
         while 'next' in response.links:
+            if should_stop(deadline):
+                logger.debug(
+                    'Time budget exhausted, stopping pagination of "{}"'
+                    .format(url))
+                return
             response = self._get(
-                response.links['next']['url'], headers=headers)
-            yield response.json()
+                response.links['next']['url'], headers=headers,
+                params=next_params, deadline=deadline)
+            yield response
+
+    def _iter_pages(self,
+                    url: str,
+                    headers: RequestHeaders = None,
+                    params: RequestParams = None,
+                    deadline: Optional[Deadline] = None,
+                    progress: Optional[PageProgress] = None,
+                    on_page: Optional[Callable[[List[Any]], None]] = None
+                    ) -> Iterator[List[Any]]:
+        """
+        Send an API call to the Canvas server with pagination.
 
-    def _get_flattened(self,
+        Returns a generator of the decoded pages. Each page's size and
+        latency are reported to the page tuner and the progress tracker, if
+        any, and each page is passed to `on_page` before it is yielded.
+        """
+        tuner = self._page_tuner
+        if tuner is not None and 'per_page' in (params or {}):
+            tuner = None
+        if tuner is not None:
+            requested = tuner.per_page(url, params, self._per_page)
+            params = dict(params or {}, per_page=requested)
+
+        responses = self._iter_responses(url, headers, params, deadline)
+        while True:
+            started = time.monotonic()
+            try:
+                response = next(responses)
+            except StopIteration:
+                return
+            seconds = time.monotonic() - started
+            page = response.json()
+            if tuner is not None:
+                tuner.observe(url, params, requested, len(page),
+                              len(response.content or b''), seconds,
+                              'next' in response.links)
+            if progress is not None:
+                progress.record(response, len(page), seconds)
+            if on_page is not None:
+                on_page(page)
+            yield page
+
+    def _get_paginated(self,
                        url: str,
                        headers: RequestHeaders = None,
-                       params: RequestParams = None) -> Iterator[Response]:
+                       params: RequestParams = None,
+                       deadline: Optional[Deadline] = None,
+                       progress_callback: ProgressCallback = None,
+                       on_page: Optional[Callable[[List[Any]], None]] = None
+                       ) -> PaginatedIterator:
         """
         Send an API call to the Canvas server with pagination.
 
-        Returns a generator of response objects.
+        Returns an iterator of pages that tracks the listing's progress.
         """
-        response = self._get(url, headers=headers, params=params)
-        self._check_response_headers_for_pagination(response)
-
-        for item in response.json():
-            yield item
+        progress = PageProgress(url, progress_callback)
+        pages = self._iter_pages(
+            url, headers, params, deadline, progress, on_page)
+        return PaginatedIterator(pages, progress)
 
-        while 'next' in response.links:
-            response = self._get(
-                response.links['next']['url'],
-                headers=headers
-                )
+    def _get_flattened(self,
+                       url: str,
+                       headers: RequestHeaders = None,
+                       params: RequestParams = None,
+                       deadline: Optional[Deadline] = None,
+                       progress_callback: ProgressCallback = None
+                       ) -> PaginatedIterator:
+        """
+        Send an API call to the Canvas server with pagination.
 
-            for item in response.json():
-                yield item
+        Returns an iterator of the items of every page that tracks the
+        listing's progress.
+        """
+        progress = PageProgress(url, progress_callback)
+        pages = self._iter_pages(url, headers, params, deadline, progress)
+        items = (item for page in pages for item in page)
+        return PaginatedIterator(items, progress)
 
     def _format_sis_course_id(self, course_id: str,
                               is_sis_course_id: Optional[bool]):
@@ -183,6 +438,10 @@ class CanvasAPIv1(CanvasAPIClient):
         Returns request string for querying with a SIS course ID.
         """
         if is_sis_course_id or self._is_sis_course_id:
+            if self._sis_index is not None:
+                canvas_id = self._sis_index.canvas_course_id(course_id)
+                if canvas_id is not None:
+                    return str(canvas_id)
             return "sis_course_id:{}".format(course_id)
 
         return course_id
@@ -194,23 +453,39 @@ class CanvasAPIv1(CanvasAPIClient):
         Returns request string for querying with a SIS account ID.
         """
         if is_sis_account_id or self._is_sis_account_id:
+            if self._sis_index is not None:
+                canvas_id = self._sis_index.canvas_account_id(account_id)
+                if canvas_id is not None:
+                    return str(canvas_id)
             return "sis_account_id:{}".format(account_id)
 
         return account_id
 
     def get_account_courses(self,
                             account_id: str,
-                            params: RequestParams = None
-                            ) -> Iterator[Response]:
+                            params: RequestParams = None,
+                            deadline: Optional[Deadline] = None,
+                            progress_callback: ProgressCallback = None
+                            ) -> PaginatedIterator:
         """
         Returns a generator of courses for a given account from the v1 API.
 
+        The generator also reports the listing's progress (see
+        `canvas_api_client.progress`), and the optional progress callback is
+        called after each page. With a SIS ID index, the courses are added
+        to it.
+
         https://canvas.instructure.com/doc/api/accounts.html#method.accounts.courses_api
         """
         endpoint = "accounts/{account_id}/courses".format(
             account_id=account_id)
+        on_page = None
+        if self._sis_index is not None:
+            on_page = self._sis_index.add_courses
 
-        return self._get_paginated(self._get_url(endpoint), params=params)
+        return self._get_paginated(
+            self._get_url(endpoint), params=params, deadline=deadline,
+            progress_callback=progress_callback, on_page=on_page)
 
     def get_course_info(self,
                         course_id: str,
@@ -231,20 +506,31 @@ class CanvasAPIv1(CanvasAPIClient):
                          course_id: str,
                          is_sis_course_id: Optional[bool] = None,
                          flatten_response: Optional[bool] = None,
-                         params: RequestParams = None) -> Iterator[Response]:
+                         params: RequestParams = None,
+                         deadline: Optional[Deadline] = None,
+                         progress_callback: ProgressCallback = None
+                         ) -> PaginatedIterator:
         """
         Returns a generator of course enrollments for a given course from the
         v1 Canvas API.
 
+        The generator also reports the listing's progress (see
+        `canvas_api_client.progress`), and the optional progress callback is
+        called after each page.
+
         https://canvas.instructure.com/doc/api/courses.html#method.courses.users
         """
         course_id = self._format_sis_course_id(course_id, is_sis_course_id)
         endpoint = "courses/{}/users".format(course_id)
 
         if flatten_response or self._flatten_response:
-            return self._get_flattened(self._get_url(endpoint), params=params)
+            return self._get_flattened(
+                self._get_url(endpoint), params=params, deadline=deadline,
+                progress_callback=progress_callback)
 
-        return self._get_paginated(self._get_url(endpoint), params=params)
+        return self._get_paginated(
+            self._get_url(endpoint), params=params, deadline=deadline,
+            progress_callback=progress_callback)
 
     def put_page(self,
                  course_id: str,
@@ -278,6 +564,45 @@ class CanvasAPIv1(CanvasAPIClient):
 
         return self._put(self._get_url(endpoint), params=params, data=data)
 
+    def get_page(self,
+                 course_id: str,
+                 url: str,
+                 is_sis_course_id: Optional[bool] = None,
+                 params: RequestParams = None) -> Response:
+        """
+        Gets a wiki page by its URL using the v1 API
+        https://canvas.instructure.com/doc/api/pages.html#method.wiki_pages_api.show
+        """
+        course_id = self._format_sis_course_id(course_id, is_sis_course_id)
+
+        endpoint = "courses/{course_id}/pages/{url}".format(
+            course_id=course_id, url=url)
+
+        return self._get(self._get_url(endpoint), params=params)
+
+    def add_enrollment(self,
+                       course_id: str,
+                       user_id: str,
+                       enrollment_type: str = 'StudentEnrollment',
+                       is_sis_course_id: Optional[bool] = None,
+                       params: RequestParams = None) -> Response:
+        """
+        Enrolls a user in a given course from the v1 API. The user ID may be
+        a Canvas ID or a prefixed SIS ID (e.g. `sis_user_id:UNI123`).
+
+        https://canvas.instructure.com/doc/api/enrollments.html#method.enrollments_api.create
+        """
+        course_id = self._format_sis_course_id(course_id, is_sis_course_id)
+
+        endpoint = "courses/{}/enrollments".format(course_id)
+        data = {
+            'enrollment[user_id]': user_id,
+            'enrollment[type]': enrollment_type,
+            'enrollment[enrollment_state]': 'active',
+        }
+
+        return self._post(self._get_url(endpoint), params=params, data=data)
+
     def delete_enrollment(self,
                           course_id: str,
                           enrollment_id: str,
@@ -362,9 +687,7 @@ class CanvasAPIv1(CanvasAPIClient):
 
         https://canvas.instructure.com/doc/api/courses.html#method.courses.update
         """
-        if params is None:
-            params = {}
-        params.update({'offer': 'true'})
+        params = dict(params or {}, offer='true')
         return self.update_course(
             course_id, is_sis_course_id=is_sis_course_id, params=params)
 
@@ -387,6 +710,70 @@ class CanvasAPIv1(CanvasAPIClient):
         data = {'course_ids_to_add[]': course_ids}
         return self._put(self._get_url(endpoint), params=params, data=data)
 
+    def start_blueprint_migration(self,
+                                  course_id: str,
+                                  comment: Optional[str] = None,
+                                  send_notification: bool = False,
+                                  params: RequestParams = None) -> Response:
+        """Start a blueprint migration, syncing the blueprint course's
+        changes to its associated courses
+
+        https://canvas.instructure.com/doc/api/blueprint_courses.html#method.master_courses/master_templates.queue_migration
+
+        Args:
+            course_id: id of the blueprint course
+            comment: optional comment shown in the sync history
+            send_notification: notify users of associated courses
+        """
+        endpoint = (
+            "courses/{course_id}/blueprint_templates/"
+            "default/migrations").format(course_id=course_id)
+        data = {'send_notification': send_notification}  # type: Dict[str, Any]
+        if comment is not None:
+            data['comment'] = comment
+        return self._post(self._get_url(endpoint), params=params, data=data)
+
+    def get_blueprint_migration(self,
+                                course_id: str,
+                                migration_id: str,
+                                params: RequestParams = None) -> Response:
+        """Get the status of a blueprint migration
+
+        https://canvas.instructure.com/doc/api/blueprint_courses.html#method.master_courses/master_templates.migrations_show
+
+        Args:
+            course_id: id of the blueprint course
+            migration_id: id of the migration
+        """
+        endpoint = (
+            "courses/{course_id}/blueprint_templates/"
+            "default/migrations/{migration_id}").format(
+                course_id=course_id, migration_id=migration_id)
+        return self._get(self._get_url(endpoint), params=params)
+
+    def graphql(self,
+                query: str,
+                variables: Optional[Dict[str, Any]] = None,
+                deadline: Optional[Deadline] = None) -> Response:
+        """Send a query to the Canvas GraphQL API
+
+        https://canvas.instructure.com/doc/api/file.graphql.html
+
+        The GraphQL endpoint is next to the versioned REST API, e.g.
+        https://canvas.example.edu/api/graphql for an API URL of
+        https://canvas.example.edu/api/v1/. Errors reported in the response
+        body (with a 200 status) are left to the caller.
+
+        Args:
+            query: the GraphQL query document
+            variables: optional values of the query's variables
+        """
+        url = urljoin(self._api_url, '../graphql')
+        body = json.dumps({'query': query, 'variables': variables or {}})
+        return self._post(url, data=body,
+                          headers={'Content-Type': 'application/json'},
+                          deadline=deadline, paginated=False)
+
     def get_account_blueprint_courses(self,
                                       account_id: str,
                                       is_sis_account_id: Optional[bool] = None,
@@ -399,8 +786,7 @@ class CanvasAPIv1(CanvasAPIClient):
         account_id = self._format_sis_account_id(account_id, is_sis_account_id)
         endpoint = "accounts/{account_id}/courses".format(
             account_id=account_id)
-        if params is None:
-            params = {}
+        params = dict(params or {})
         params.update({
             'blueprint': 'true',
             'include[]': ['subaccount', 'term']
@@ -0,0 +1,422 @@
+"""
+A lease-based work queue for splitting a crawl between hosts.
+
+A coordinator splits the crawl into units of work, such as a range of pages
+of an account's courses or the users of one course, and puts them in a
+`WorkQueue` backed by a SQLite file. Workers on any number of hosts lease
+units, crawl them with their own `CanvasAPIv1` client and mark them done:
+
+    >>> queue = WorkQueue('/shared/crawl.sqlite')
+    >>> plan_account_courses(queue, api, '1', pages_per_unit=20)
+    >>> plan_course_users(queue, course_ids)
+
+    >>> # on each host
+    >>> worker = CrawlWorker(queue, api, sink=write_records)
+    >>> worker.run()
+
+A lease lasts `lease_seconds`. Workers renew the leases of the units they
+are working on with heartbeats, so a unit whose worker died goes back to
+the queue when its lease expires, and another worker picks it up. A unit
+that fails (or whose lease expires) `max_attempts` times is marked failed.
+Delivery is at least once: a worker that loses its lease may still pass
+its records to the sink, so sinks should be idempotent (e.g. keyed by ID).
+
+Lease expiry is compared against each host's wall clock, which must be
+roughly in sync. SQLite's locking needs a file system that supports it;
+on network file systems where it does not, use a local stand-in file per
+host group or another store.
+"""
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import (
+    Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence,
+    Tuple)
+
+from canvas_api_client.deadline import Deadline, should_stop
+from canvas_api_client.progress import last_page_number
+from canvas_api_client.types import RequestParams
+from canvas_api_client.v1_client import CanvasAPIv1
+
+logger = logging.getLogger()
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+# Not stored: a lease that expired on the unit's last attempt, which the
+# next lease marks failed.
+EXPIRED = 'expired'
+
+ACCOUNT_COURSES = 'account_courses'
+COURSE_USERS = 'course_users'
+
+WorkItem = NamedTuple('WorkItem', [
+    ('id', int),
+    ('kind', str),
+    ('payload', Dict[str, Any]),
+    ('attempts', int),
+])
+
+QueueStats = NamedTuple('QueueStats', [
+    ('pending', int),
+    ('leased', int),
+    ('done', int),
+    ('failed', int),
+    ('expired', int),
+])
+
+# Called with each unit of work and the records crawled for it.
+Sink = Callable[[WorkItem, List[Any]], None]
+
+# Crawls a unit of work's payload with the given client.
+Handler = Callable[[CanvasAPIv1, Dict[str, Any]], List[Any]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS work (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS work_state ON work (state, lease_expires);
+"""
+
+
+class WorkQueue(object):
+    """
+    A queue of units of work in the SQLite database at `path`, created if
+    it does not exist. Every host and process opens the same file.
+    """
+
+    def __init__(self,
+                 path: str,
+                 lease_seconds: float = 60.0,
+                 max_attempts: int = 5,
+                 clock: Callable[[], float] = time.time) -> None:
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._clock = clock
+        self._local = threading.local()
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Returns this thread's connection; SQLite connections cannot be
+        shared between threads.
+        """
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30.0,
+                                 isolation_level=None)
+            self._local.db = db
+        return db
+
+    def _transaction(self) -> '_Transaction':
+        return _Transaction(self._connection())
+
+    def put(self,
+            kind: str,
+            payload: Dict[str, Any],
+            key: Optional[str] = None) -> bool:
+        """
+        Adds a unit of work. If a `key` is given and a unit with the same
+        key was already added, nothing is added and False is returned, so
+        a coordinator can safely plan the same crawl twice.
+        """
+        return self.put_many([(kind, payload, key)]) == 1
+
+    def put_many(self,
+                 items: Iterable[Tuple[str, Dict[str, Any], Optional[str]]]
+                 ) -> int:
+        """
+        Adds `(kind, payload, key)` units in one transaction and returns
+        how many were added.
+        """
+        added = 0
+        with self._transaction() as db:
+            for kind, payload, key in items:
+                cursor = db.execute(
+                    'INSERT OR IGNORE INTO work (key, kind, payload, state) '
+                    'VALUES (?, ?, ?, ?)',
+                    (key, kind, json.dumps(payload), PENDING))
+                added += cursor.rowcount
+        return added
+
+    def lease(self, worker_id: str, limit: int = 1) -> List[WorkItem]:
+        """
+        Leases up to `limit` units to a worker: pending units first, then
+        units whose lease has expired. Units that have used up their
+        attempts are marked failed instead.
+        """
+        now = self._clock()
+        with self._transaction() as db:
+            db.execute(
+                'UPDATE work SET state = ?, error = ? WHERE state = ? '
+                'AND lease_expires < ? AND attempts >= ?',
+                (FAILED, 'lease expired', LEASED, now, self.max_attempts))
+            rows = db.execute(
+                'SELECT id, kind, payload, attempts FROM work '
+                'WHERE state = ? OR (state = ? AND lease_expires < ?) '
+                'ORDER BY state = ? DESC, id LIMIT ?',
+                (PENDING, LEASED, now, PENDING, limit)).fetchall()
+            db.executemany(
+                'UPDATE work SET state = ?, worker = ?, lease_expires = ?, '
+                'attempts = attempts + 1 WHERE id = ?',
+                [(LEASED, worker_id, now + self.lease_seconds, row[0])
+                 for row in rows])
+        return [WorkItem(id=row[0], kind=row[1], payload=json.loads(row[2]),
+                         attempts=row[3] + 1)
+                for row in rows]
+
+    def _update_lease(self, item_id: int, worker_id: str, sql: str,
+                      args: Sequence[Any]) -> bool:
+        with self._transaction() as db:
+            cursor = db.execute(
+                sql + ' WHERE id = ? AND state = ? AND worker = ?',
+                tuple(args) + (item_id, LEASED, worker_id))
+            return cursor.rowcount == 1
+
+    def heartbeat(self, item_id: int, worker_id: str) -> bool:
+        """
+        Renews a worker's lease on a unit. Returns False if the worker no
+        longer holds the lease.
+        """
+        return self._update_lease(
+            item_id, worker_id, 'UPDATE work SET lease_expires = ?',
+            (self._clock() + self.lease_seconds,))
+
+    def complete(self, item_id: int, worker_id: str) -> bool:
+        """
+        Marks a leased unit done. Returns False if the worker no longer
+        held the lease.
+        """
+        return self._update_lease(
+            item_id, worker_id,
+            'UPDATE work SET state = ?, lease_expires = NULL', (DONE,))
+
+    def fail(self, item_id: int, worker_id: str, error: str) -> bool:
+        """
+        Returns a leased unit to the queue after an error, or marks it
+        failed if it has used up its attempts. Returns False if the worker
+        no longer held the lease.
+        """
+        return self._update_lease(
+            item_id, worker_id,
+            'UPDATE work SET state = CASE WHEN attempts >= ? THEN ? ELSE ? '
+            'END, lease_expires = NULL, error = ?',
+            (self.max_attempts, FAILED, PENDING, error))
+
+    def stats(self) -> QueueStats:
+        """
+        Returns the number of units in each state. Leased units whose lease
+        has expired count as pending, or as expired if they have used up
+        their attempts (they are marked failed by the next lease).
+        """
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0, EXPIRED: 0}
+        with self._transaction() as db:
+            rows = db.execute(
+                'SELECT CASE WHEN state = ? AND lease_expires < ? THEN '
+                'CASE WHEN attempts >= ? THEN ? ELSE ? END '
+                'ELSE state END, COUNT(*) FROM work GROUP BY 1',
+                (LEASED, self._clock(), self.max_attempts, EXPIRED,
+                 PENDING)).fetchall()
+        counts.update(rows)
+        return QueueStats(**counts)
+
+    def failures(self) -> List[Tuple[WorkItem, str]]:
+        """
+        Returns the failed units with their last error.
+        """
+        with self._transaction() as db:
+            rows = db.execute(
+                'SELECT id, kind, payload, attempts, error FROM work '
+                'WHERE state = ? ORDER BY id', (FAILED,)).fetchall()
+        return [(WorkItem(row[0], row[1], json.loads(row[2]), row[3]),
+                 row[4])
+                for row in rows]
+
+
+class _Transaction(object):
+    """
+    Runs a block in an immediate transaction, which takes the write lock
+    up front so two workers cannot lease the same unit.
+    """
+
+    def __init__(self, db: sqlite3.Connection) -> None:
+        self._db = db
+
+    def __enter__(self) -> sqlite3.Connection:
+        self._db.execute('BEGIN IMMEDIATE')
+        return self._db
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._db.execute('COMMIT' if exc_type is None else 'ROLLBACK')
+
+
+def plan_account_courses(queue: WorkQueue,
+                         client: CanvasAPIv1,
+                         account_id: str,
+                         pages_per_unit: int = 10,
+                         params: RequestParams = None) -> int:
+    """
+    Splits an account's course listing into units of `pages_per_unit`
+    pages and adds them to the queue, returning how many were added. The
+    page count comes from the first page's `last` link; without one, the
+    whole listing is a single unit.
+    """
+    params = dict(params or {})
+    params.setdefault('per_page', client._per_page)
+    url = client._get_url('accounts/{}/courses'.format(account_id))
+    response = client._get(url, params=params)
+    last = last_page_number(response)
+
+    if last is None:
+        ranges = [(1, None)]  # type: List[Tuple[int, Optional[int]]]
+    else:
+        ranges = [(first, min(first + pages_per_unit - 1, last))
+                  for first in range(1, last + 1, pages_per_unit)]
+    return queue.put_many(
+        (ACCOUNT_COURSES,
+         {'account_id': account_id, 'first_page': first, 'last_page': end,
+          'params': params},
+         '{}:{}:{}:{}'.format(ACCOUNT_COURSES, account_id, first, end))
+        for first, end in ranges)
+
+
+def plan_course_users(queue: WorkQueue,
+                      course_ids: Iterable[str],
+                      is_sis_course_id: Optional[bool] = None,
+                      params: RequestParams = None) -> int:
+    """
+    Adds a unit per course for its users, returning how many were added.
+    """
+    return queue.put_many(
+        (COURSE_USERS,
+         {'course_id': course_id, 'is_sis_course_id': is_sis_course_id,
+          'params': params},
+         '{}:{}'.format(COURSE_USERS, course_id))
+        for course_id in course_ids)
+
+
+def crawl_account_courses(client: CanvasAPIv1,
+                          payload: Dict[str, Any]) -> List[Any]:
+    """
+    Fetches the courses on a unit's pages. A unit without a last page
+    follows the listing's `next` links to its end.
+    """
+    url = client._get_url(
+        'accounts/{}/courses'.format(payload['account_id']))
+    params = payload['params']
+    last_page = payload['last_page']
+    if last_page is None:
+        return list(client._get_flattened(url, params=params))
+
+    courses = []  # type: List[Any]
+    for page in range(payload['first_page'], last_page + 1):
+        response = client._get(url, params=dict(params, page=page))
+        courses.extend(response.json())
+    return courses
+
+
+def crawl_course_users(client: CanvasAPIv1,
+                       payload: Dict[str, Any]) -> List[Any]:
+    return list(client.get_course_users(
+        payload['course_id'], is_sis_course_id=payload['is_sis_course_id'],
+        flatten_response=True, params=payload['params']))
+
+
+class CrawlWorker(object):
+    """
+    Leases units from the queue and crawls them with `client`, passing the
+    records of each unit to `sink` before marking it done.
+
+    `handlers` maps further kinds of unit to functions taking the client
+    and the unit's payload. The worker ID defaults to the host name and
+    process ID.
+    """
+
+    def __init__(self,
+                 queue: WorkQueue,
+                 client: CanvasAPIv1,
+                 sink: Sink,
+                 worker_id: Optional[str] = None,
+                 handlers: Optional[Dict[str, Handler]] = None,
+                 heartbeat_interval: Optional[float] = None,
+                 poll_interval: float = 5.0) -> None:
+        self.queue = queue
+        self.client = client
+        self.sink = sink
+        self.worker_id = worker_id or '{}:{}'.format(
+            socket.gethostname(), os.getpid())
+        self.handlers = {
+            ACCOUNT_COURSES: crawl_account_courses,
+            COURSE_USERS: crawl_course_users,
+        }  # type: Dict[str, Handler]
+        self.handlers.update(handlers or {})
+        self.heartbeat_interval = (heartbeat_interval or
+                                   queue.lease_seconds / 3)
+        self.poll_interval = poll_interval
+
+    def run(self, deadline: Optional[Deadline] = None) -> int:
+        """
+        Works until the queue has no pending or leased units left, and
+        returns the number of units this worker completed. While other
+        workers hold leases, the worker polls in case they expire. With a
+        time budget, no unit is leased after it runs out, and the worker
+        does not poll past it.
+        """
+        completed = 0
+        while not should_stop(deadline):
+            items = self.queue.lease(self.worker_id)
+            if not items:
+                stats = self.queue.stats()
+                if not stats.pending and not stats.leased:
+                    break
+                wait = self.poll_interval
+                if deadline is not None:
+                    wait = min(wait, deadline.remaining())
+                time.sleep(wait)
+                continue
+            for item in items:
+                completed += self.process(item)
+        return completed
+
+    def process(self, item: WorkItem) -> bool:
+        """
+        Crawls a leased unit, renewing its lease until it is done. Returns
+        True if the unit was completed by this worker.
+        """
+        stop = threading.Event()
+
+        def beat() -> None:
+            while not stop.wait(self.heartbeat_interval):
+                if not self.queue.heartbeat(item.id, self.worker_id):
+                    logger.warning('Lost the lease on unit {}'.format(item.id))
+                    return
+
+        heartbeat = threading.Thread(target=beat, daemon=True)
+        heartbeat.start()
+        try:
+            handler = self.handlers[item.kind]
+            records = handler(self.client, item.payload)
+            self.sink(item, records)
+        except Exception as e:
+            logger.warning('Unit {} ({}) failed: {!r}'.format(
+                item.id, item.kind, e))
+            self.queue.fail(item.id, self.worker_id, repr(e))
+            return False
+        finally:
+            stop.set()
+            heartbeat.join()
+        return self.queue.complete(item.id, self.worker_id)
@@ -0,0 +1,233 @@
+"""
+Write coalescing for course and page mutations.
+
+A `WriteBuffer` holds `update_course`, `publish_course` and `put_page`
+calls for a short while and merges the ones that target the same thing,
+so a pipeline that sets a course's name, then its dates, then publishes it
+sends a single PUT:
+
+    >>> buffer = WriteBuffer(api, max_delay=2.0)
+    >>> buffer.update_course('42', params={'course[name]': 'Biology'})
+    >>> buffer.update_course('42', params={'course[start_at]': '2018-09-04'})
+    >>> future = buffer.publish_course('42')
+    >>> buffer.flush()
+    1
+    >>> future.result().status_code
+    200
+
+Params of pending updates to the same course are merged, later values
+winning. A page written several times is written once, with the last
+call's content. Every call returns a `concurrent.futures.Future`, which
+resolves to the response of the request it was merged into (or its
+error). The buffer is flushed when `max_pending` writes are pending,
+when the oldest has waited `max_delay` seconds, on `flush()`, and on
+`close()`.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import (
+    Any, Callable, Dict, List, NamedTuple, Optional, Tuple)
+
+from canvas_api_client.interface import CanvasAPIClient
+from canvas_api_client.types import RequestParams, Response
+
+WriteBufferStats = NamedTuple('WriteBufferStats', [
+    ('calls', int),
+    ('requests', int),
+    ('pending', int),
+])
+
+MergedFutures = List[Future]
+
+
+class _PendingWrite(object):
+    """
+    A request to send, with the futures of every call merged into it.
+    """
+
+    def __init__(self, send: Callable[..., Response],
+                 args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> None:
+        self.send = send
+        self.args = args
+        self.kwargs = kwargs
+        self.futures = []  # type: MergedFutures
+
+    def run(self) -> None:
+        try:
+            response = self.send(*self.args, **self.kwargs)
+        except Exception as e:
+            for future in self.futures:
+                future.set_exception(e)
+        else:
+            for future in self.futures:
+                future.set_result(response)
+
+
+PendingWrites = Dict[Tuple[Any, ...], _PendingWrite]
+
+
+class WriteBuffer(object):
+    """
+    Buffers and merges course and page writes made through `client`.
+    Writes are sent in the order they were first buffered, by whichever
+    thread triggers the flush (a background thread for `max_delay`).
+    """
+
+    def __init__(self,
+                 client: CanvasAPIClient,
+                 max_pending: int = 100,
+                 max_delay: Optional[float] = 2.0,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.client = client
+        self.max_pending = max_pending
+        self.max_delay = max_delay
+        self._clock = clock
+        self._pending = OrderedDict()  # type: PendingWrites
+        self._oldest = None  # type: Optional[float]
+        self._lock = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._closed = False
+        self._timer = None  # type: Optional[threading.Thread]
+        self._calls = 0
+        self._requests = 0
+
+    def __enter__(self) -> 'WriteBuffer':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _add(self,
+             key: Tuple[Any, ...],
+             merge: Callable[[Optional[_PendingWrite]], _PendingWrite]
+             ) -> Future:
+        future = Future()  # type: Future
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('The write buffer is closed')
+            write = merge(self._pending.get(key))
+            write.futures.append(future)
+            if key not in self._pending:
+                self._pending[key] = write
+            self._calls += 1
+            if self._oldest is None:
+                self._oldest = self._clock()
+            full = len(self._pending) >= self.max_pending
+            if self.max_delay is not None and self._timer is None:
+                self._timer = threading.Thread(target=self._flush_when_due,
+                                               daemon=True)
+                self._timer.start()
+            self._lock.notify_all()
+        if full:
+            self.flush()
+        return future
+
+    def update_course(self,
+                      course_id: str,
+                      is_sis_course_id: bool = False,
+                      params: RequestParams = None) -> Future:
+        """
+        Buffers a course update, merging its params into any update of the
+        same course that is still pending.
+        """
+        def merge(write: Optional[_PendingWrite]) -> _PendingWrite:
+            if write is None:
+                write = _PendingWrite(
+                    self.client.update_course, (course_id,),
+                    {'is_sis_course_id': is_sis_course_id, 'params': {}})
+            write.kwargs['params'].update(params or {})
+            return write
+
+        return self._add(('course', str(course_id), bool(is_sis_course_id)),
+                         merge)
+
+    def publish_course(self,
+                       course_id: str,
+                       is_sis_course_id: bool = False,
+                       params: RequestParams = None) -> Future:
+        """
+        Buffers publishing a course, as an update with `offer=true`.
+        """
+        return self.update_course(course_id, is_sis_course_id,
+                                  dict(params or {}, offer='true'))
+
+    def put_page(self,
+                 course_id: str,
+                 body: str,
+                 is_sis_course_id: bool = False,
+                 url: Optional[str] = None,
+                 **kwargs) -> Future:
+        """
+        Buffers a page write. A pending write to the same page is replaced,
+        so only the last content is sent. Other arguments are those of
+        `put_page`.
+        """
+        kwargs.update(body=body, is_sis_course_id=is_sis_course_id, url=url)
+
+        def merge(write: Optional[_PendingWrite]) -> _PendingWrite:
+            if write is None:
+                return _PendingWrite(self.client.put_page, (course_id,),
+                                     kwargs)
+            write.kwargs = kwargs
+            return write
+
+        return self._add(
+            ('page', str(course_id), bool(is_sis_course_id), url), merge)
+
+    def flush(self) -> int:
+        """
+        Sends every pending write and returns the number of requests sent.
+        Futures are resolved as their request completes.
+        """
+        with self._send_lock:
+            with self._lock:
+                writes = list(self._pending.values())
+                self._pending.clear()
+                self._oldest = None
+                self._requests += len(writes)
+            for write in writes:
+                write.run()
+        return len(writes)
+
+    def _flush_when_due(self) -> None:
+        """
+        Flushes the buffer each time its oldest write has waited
+        `max_delay` seconds, until it is closed.
+        """
+        max_delay = self.max_delay or 0.0
+        while True:
+            with self._lock:
+                while not self._closed:
+                    if self._oldest is None:
+                        self._lock.wait()
+                        continue
+                    remaining = self._oldest + max_delay - self._clock()
+                    if remaining <= 0:
+                        break
+                    self._lock.wait(remaining)
+                if self._closed:
+                    return
+            self.flush()
+
+    def close(self) -> None:
+        """
+        Sends the pending writes and stops buffering.
+        """
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        self.flush()
+        if self._timer is not None:
+            self._timer.join()
+
+    def stats(self) -> WriteBufferStats:
+        """
+        Returns the number of calls buffered, the requests sent for them and
+        the writes still pending.
+        """
+        with self._lock:
+            return WriteBufferStats(calls=self._calls,
+                                    requests=self._requests,
+                                    pending=len(self._pending))
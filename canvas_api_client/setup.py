@@ -33,5 +33,12 @@ setup(
     include_package_data=True,
     author='Luc Cary, Kyle Lawlor and Angus Grieve-Smith',
     install_requires=all_requirements,
+    extras_require={
+        'numpy': ['numpy'],
+        'arrow': ['numpy', 'pyarrow'],
+    },
+    entry_points={
+        'console_scripts': ['canvas-export=canvas_api_client.cli:main'],
+    },
     dependency_links=all_requirements,
     author_email='kl3020@columbia.edu')
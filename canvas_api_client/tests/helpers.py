@@ -0,0 +1,15 @@
+"""
+Helpers shared by the tests.
+"""
+
+
+class FakeClock(object):
+    """
+    A clock for the `clock` arguments that only moves when `now` is set.
+    """
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
@@ -0,0 +1,138 @@
+from canvas_api_client.autotune import PageSizeTuner, endpoint_key
+from canvas_api_client.v1_client import CanvasAPIv1
+
+from unittest import TestCase, main
+from unittest.mock import MagicMock
+
+API_URL = 'https://foo.cc.columbia.edu/api/v1/'
+URL = API_URL + 'courses/1/users'
+
+
+def get_page(items, next_page=None):
+    links = {'next': {'url': next_page}} if next_page else {}
+    response = MagicMock(headers={'link': '...'}, links=links,
+                         content=b'x' * 100 * items)
+    response.json.return_value = list(range(items))
+    return response
+
+
+class TestEndpointKey(TestCase):
+
+    def test_ids_replaced(self):
+        self.assertEqual(endpoint_key(API_URL + 'courses/1/users'),
+                         'api/v1/courses/:id/users')
+        self.assertEqual(
+            endpoint_key(API_URL + 'courses/sis_course_id:ABC/users'),
+            'api/v1/courses/:id/users')
+        self.assertEqual(endpoint_key(API_URL + 'users/self/courses'),
+                         'api/v1/users/:id/courses')
+
+    def test_includes(self):
+        self.assertEqual(
+            endpoint_key(URL, {'include[]': ['enrollments', 'avatar_url']}),
+            'api/v1/courses/:id/users?include[]=avatar_url,enrollments')
+        self.assertEqual(
+            endpoint_key(URL + '?include%5B%5D=email&page=2',
+                         {'include[]': 'email'}),
+            'api/v1/courses/:id/users?include[]=email')
+
+
+class TestPageSizeTuner(TestCase):
+
+    def setUp(self):
+        self.tuner = PageSizeTuner(target_seconds=2.0, min_size=10,
+                                   max_size=100)
+
+    def test_initial_size(self):
+        self.assertEqual(self.tuner.per_page(URL), 100)
+        self.assertEqual(self.tuner.per_page(API_URL + 'accounts/1/courses',
+                                             default_size=50), 50)
+
+    def test_server_cap(self):
+        self.tuner.observe(URL, None, 100, 50, 5000, 0.5, has_next=True)
+
+        self.assertEqual(self.tuner.per_page(URL), 50)
+        self.assertEqual(self.tuner.stats()[0].server_cap, 50)
+
+    def test_last_page_is_not_a_cap(self):
+        self.tuner.observe(URL, None, 100, 7, 700, 3.0, has_next=False)
+
+        self.assertEqual(self.tuner.per_page(URL), 100)
+        self.assertIsNone(self.tuner.stats()[0].server_cap)
+
+    def test_slow_endpoint_shrinks(self):
+        # 0.08s per item: a 2 second page holds 25 items, reached by halving
+        # at most once per page.
+        self.tuner.observe(URL, None, 100, 100, 10000, 8.0, has_next=True)
+        self.assertEqual(self.tuner.per_page(URL), 50)
+
+        self.tuner.observe(URL, None, 50, 50, 5000, 4.0, has_next=True)
+        self.assertEqual(self.tuner.per_page(URL), 25)
+
+    def test_fast_endpoint_grows(self):
+        tuner = PageSizeTuner(initial_size=20, max_size=100)
+
+        tuner.observe(URL, None, 20, 20, 2000, 0.1, has_next=True)
+        self.assertEqual(tuner.per_page(URL), 40)
+        tuner.observe(URL, None, 40, 40, 4000, 0.2, has_next=True)
+        tuner.observe(URL, None, 80, 80, 8000, 0.4, has_next=True)
+        self.assertEqual(tuner.per_page(URL), 100)
+
+    def test_byte_limit(self):
+        tuner = PageSizeTuner(max_bytes=100000)
+
+        tuner.observe(URL, None, 100, 100, 400000, 0.5, has_next=True)
+        self.assertEqual(tuner.per_page(URL), 50)
+        tuner.observe(URL, None, 50, 50, 200000, 0.25, has_next=True)
+        self.assertEqual(tuner.per_page(URL), 25)
+
+    def test_endpoints_learned_separately(self):
+        self.tuner.observe(URL, {'include[]': ['enrollments']}, 100, 100,
+                           10000, 8.0, has_next=True)
+
+        self.assertEqual(
+            self.tuner.per_page(URL, {'include[]': ['enrollments']}), 50)
+        self.assertEqual(self.tuner.per_page(URL), 100)
+        self.assertEqual(
+            self.tuner.per_page(API_URL + 'courses/2/users',
+                                {'include[]': 'enrollments'}), 50)
+
+
+class TestCanvasAPIv1PageTuner(TestCase):
+
+    def setUp(self):
+        self._mock_requests = MagicMock()
+        self.tuner = PageSizeTuner()
+        self.test_client = CanvasAPIv1(API_URL, 'foo_token',
+                                       requests_lib=self._mock_requests,
+                                       page_tuner=self.tuner)
+
+    def _per_pages(self):
+        return [c[1]['params']['per_page']
+                for c in self._mock_requests.get.call_args_list]
+
+    def test_server_cap_used_for_later_listings(self):
+        self._mock_requests.get.side_effect = [
+            get_page(50, URL + '?page=2&per_page=100'), get_page(20),
+            get_page(50)]
+
+        users = list(self.test_client.get_course_users(
+            '1', flatten_response=True))
+        self.assertEqual(len(users), 70)
+        list(self.test_client.get_course_users('2'))
+
+        self.assertEqual(self._per_pages(), [100, 100, 50])
+        self.assertEqual(self.tuner.stats()[0].pages, 3)
+
+    def test_explicit_per_page_left_alone(self):
+        self._mock_requests.get.side_effect = [
+            get_page(5, URL + '?page=2&per_page=10'), get_page(5)]
+
+        list(self.test_client.get_course_users('1', params={'per_page': 10}))
+
+        self.assertEqual(self._per_pages(), [10, 10])
+        self.assertEqual(self.tuner.stats(), [])
+
+
+if __name__ == '__main__':
+    main()
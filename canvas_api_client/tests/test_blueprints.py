@@ -0,0 +1,157 @@
+import threading
+
+from canvas_api_client.blueprints import BlueprintAssociator, is_retryable
+from canvas_api_client.deadline import TimeBudget
+from canvas_api_client.errors import DeadlineExceeded
+
+from unittest import TestCase, main
+from unittest.mock import MagicMock
+
+import requests
+from requests import HTTPError
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+
+def http_error(status_code):
+    return HTTPError('{} Error'.format(status_code),
+                     response=MagicMock(status_code=status_code, text=''))
+
+
+class TestBlueprintAssociator(TestCase):
+
+    def setUp(self):
+        self.client = MagicMock()
+        self.sleeps = []
+        self.associator = BlueprintAssociator(
+            self.client, chunk_size=2, sleep=self.sleeps.append)
+
+    def test_chunks(self):
+        report = self.associator.associate({
+            '10': ['1', '2', '3', '4', '5'],
+            '20': ['6'],
+        })
+
+        sent = sorted((c[0][0], c[0][1]) for c in
+                      self.client.associate_courses_to_blueprint
+                      .call_args_list)
+        self.assertEqual(sent, [('10', ['1', '2']), ('10', ['3', '4']),
+                                ('10', ['5']), ('20', ['6'])])
+        self.assertEqual([(c.blueprint_id, c.attempts)
+                          for c in report.chunks],
+                         [('10', 1), ('20', 1), ('10', 1), ('10', 1)])
+        self.assertEqual(report.failed_course_ids, {})
+        self.assertEqual(report.migrations, [])
+
+    def test_failed_chunks_are_retried_alone(self):
+        attempts = {}
+        lock = threading.Lock()
+
+        def associate(blueprint_id, course_ids):
+            with lock:
+                key = (blueprint_id, tuple(course_ids))
+                attempts[key] = attempts.get(key, 0) + 1
+                if course_ids == ['3', '4'] and attempts[key] < 3:
+                    raise http_error(504)
+                if blueprint_id == '20':
+                    raise http_error(403)
+
+        self.client.associate_courses_to_blueprint.side_effect = associate
+        report = self.associator.associate({'10': ['1', '2', '3', '4'],
+                                            '20': ['6']})
+
+        self.assertEqual(attempts[('10', ('1', '2'))], 1)
+        self.assertEqual(attempts[('10', ('3', '4'))], 3)
+        self.assertEqual(attempts[('20', ('6',))], 1)
+        self.assertEqual(sorted(self.sleeps), [1.0, 2.0])
+        self.assertEqual(report.failed_course_ids, {'20': ['6']})
+        self.assertEqual(sorted((c.blueprint_id, c.attempts, c.error is None)
+                                for c in report.chunks),
+                         [('10', 1, True), ('10', 3, True), ('20', 1, False)])
+
+    def test_attempts_of_a_late_permanent_error(self):
+        self.client.associate_courses_to_blueprint.side_effect = [
+            http_error(503), http_error(404)]
+
+        report = self.associator.associate({'10': ['1']})
+
+        self.assertEqual(report.chunks[0].attempts, 2)
+        self.assertEqual(self.sleeps, [1.0])
+
+    def test_is_retryable(self):
+        self.assertTrue(is_retryable(http_error(502)))
+        self.assertTrue(is_retryable(http_error(429)))
+        self.assertFalse(is_retryable(http_error(404)))
+        self.assertTrue(is_retryable(requests.ConnectionError('reset')))
+        self.assertTrue(is_retryable(requests.Timeout('read timed out')))
+        self.assertTrue(is_retryable(ConnectionError('reset')))
+        self.assertTrue(is_retryable(MaxRetryError(
+            None, '/', NewConnectionError(None, 'refused'))))
+        self.assertFalse(is_retryable(MaxRetryError(None, '/')))
+        self.assertFalse(is_retryable(DeadlineExceeded('late')))
+        self.assertFalse(is_retryable(KeyError('id')))
+
+    def test_sync_tracks_migrations(self):
+        states = {'10': iter(['queued', 'exporting', 'completed']),
+                  '20': iter(['imports_failed'])}
+
+        self.client.start_blueprint_migration.side_effect = \
+            lambda blueprint_id, **kwargs: MagicMock(**{
+                'json.return_value': {'id': int(blueprint_id) + 1}})
+        self.client.get_blueprint_migration.side_effect = \
+            lambda blueprint_id, migration_id: MagicMock(**{
+                'json.return_value': {
+                    'workflow_state': next(states[blueprint_id])}})
+
+        report = self.associator.associate({'10': ['1'], '20': ['2']},
+                                           sync=True, comment='sync')
+
+        self.assertEqual(
+            [(m.blueprint_id, m.migration_id, m.workflow_state)
+             for m in report.migrations],
+            [('10', '11', 'completed'), ('20', '21', 'imports_failed')])
+        self.assertEqual(self.client.get_blueprint_migration.call_count, 4)
+        self.assertEqual(self.sleeps, [2.0, 4.0])
+        self.client.start_blueprint_migration.assert_any_call(
+            '10', comment='sync', send_notification=False)
+
+    def test_gives_up_on_migrations(self):
+        now = [0.0]
+
+        def sleep(seconds):
+            now[0] += seconds
+
+        def get_blueprint_migration(blueprint_id, migration_id):
+            if blueprint_id == '20':
+                raise ConnectionError('reset')
+            return MagicMock(**{'json.return_value': {
+                'workflow_state': 'exporting'}})
+
+        self.client.get_blueprint_migration.side_effect = \
+            get_blueprint_migration
+        associator = BlueprintAssociator(
+            self.client, poll_interval=10, max_poll_interval=10,
+            max_wait=100, max_poll_failures=3, sleep=sleep,
+            clock=lambda: now[0])
+
+        migrations = associator.wait_for_migrations([('10', '1'),
+                                                     ('20', '2')])
+
+        self.assertEqual([m.workflow_state for m in migrations],
+                         ['unknown', 'unknown'])
+        self.assertEqual(now[0], 100)
+        polls = [c[0][0] for c in
+                 self.client.get_blueprint_migration.call_args_list]
+        self.assertEqual(polls.count('20'), 3)
+        self.assertEqual(polls.count('10'), 10)
+
+    def test_time_budget(self):
+        report = self.associator.associate({'10': ['1', '2', '3']},
+                                           sync=True, deadline=TimeBudget(0))
+
+        self.assertFalse(self.client.associate_courses_to_blueprint.called)
+        self.assertEqual(report.failed_course_ids, {'10': ['1', '2', '3']})
+        self.assertEqual(report.migrations, [])
+
+
+if __name__ == '__main__':
+    main()
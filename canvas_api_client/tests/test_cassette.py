@@ -0,0 +1,152 @@
+import json
+import os
+import shutil
+import tempfile
+
+from canvas_api_client.cassette import (
+    Cassette, RecordingSession, ReplaySession)
+from canvas_api_client.errors import CassetteMismatchError
+from canvas_api_client.response import SimpleResponse
+from canvas_api_client.v1_client import CanvasAPIv1
+
+from unittest import TestCase, main
+from unittest.mock import MagicMock
+
+from requests import HTTPError
+
+BASE_URL = 'https://foo.cc.columbia.edu/api/v1/'
+COURSES_URL = BASE_URL + 'accounts/1/courses'
+
+
+def get_course_pages():
+    page_1 = SimpleResponse(
+        200, COURSES_URL,
+        headers={
+            'Link': '<{0}?page=2>; rel="next", <{0}?page=2>; rel="last"'
+                    .format(COURSES_URL),
+            'X-Rate-Limit-Remaining': '699.5',
+        },
+        content=json.dumps([{'id': 1}, {'id': 2}]).encode('utf-8'))
+    page_2 = SimpleResponse(
+        200, COURSES_URL + '?page=2',
+        headers={
+            'Link': '<{0}?page=2>; rel="last"'.format(COURSES_URL),
+            'X-Rate-Limit-Remaining': '698.0',
+        },
+        content=json.dumps([{'id': 3}]).encode('utf-8'))
+    return [page_1, page_2]
+
+
+class TestCassette(TestCase):
+
+    def setUp(self):
+        self._mock_requests = MagicMock()
+        self._mock_requests.get.side_effect = get_course_pages()
+        self._clock = MagicMock(side_effect=[10.0, 10.25, 11.0, 11.5])
+        self.cassette = Cassette()
+        recorder = RecordingSession(
+            self.cassette, requests_lib=self._mock_requests,
+            clock=self._clock)
+        self.recording_client = CanvasAPIv1(
+            BASE_URL, 'foo_token', requests_lib=recorder)
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _record(self):
+        return list(self.recording_client.get_account_courses('1'))
+
+    def test_record(self):
+        pages = self._record()
+
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(len(self.cassette), 2)
+        first, second = self.cassette.interactions
+        self.assertEqual(first['method'], 'GET')
+        self.assertEqual(first['url'], COURSES_URL)
+        self.assertEqual(first['params'], 'per_page=100')
+        self.assertEqual(first['elapsed'], 0.25)
+        self.assertEqual(second['elapsed'], 0.5)
+        self.assertIn('rel="next"', first['headers']['Link'])
+        self.assertEqual(second['headers']['X-Rate-Limit-Remaining'], '698.0')
+
+    def test_record_omits_request_headers(self):
+        self._record()
+        path = os.path.join(self.tmpdir, 'c.ndjson')
+        self.cassette.save(path)
+        with open(path) as f:
+            self.assertNotIn('foo_token', f.read())
+
+    def test_save_and_load_gzip(self):
+        self._record()
+        path = os.path.join(self.tmpdir, 'courses.ndjson.gz')
+        self.cassette.save(path)
+
+        loaded = Cassette.load(path)
+
+        self.assertEqual(loaded.interactions, self.cassette.interactions)
+
+    def test_replay(self):
+        self._record()
+        mock_sleep = MagicMock()
+        replay = ReplaySession(self.cassette, time_scale=2.0, sleep=mock_sleep)
+        client = CanvasAPIv1(BASE_URL, requests_lib=replay)
+
+        pages = list(client.get_account_courses('1'))
+
+        self.assertEqual(pages, [[{'id': 1}, {'id': 2}], [{'id': 3}]])
+        self.assertEqual(
+            [c[0][0] for c in mock_sleep.call_args_list], [0.5, 1.0])
+        self.assertEqual(replay.remaining(), 0)
+
+    def test_replay_without_delay(self):
+        self._record()
+        mock_sleep = MagicMock()
+        replay = ReplaySession(self.cassette, time_scale=0, sleep=mock_sleep)
+
+        response = replay.get(COURSES_URL, params={'per_page': 100})
+
+        self.assertEqual(response.headers['x-rate-limit-remaining'], '699.5')
+        self.assertIn('next', response.links)
+        mock_sleep.assert_not_called()
+
+    def test_replay_mismatch(self):
+        self._record()
+        replay = ReplaySession(self.cassette, time_scale=0)
+
+        with self.assertRaises(CassetteMismatchError):
+            replay.get(COURSES_URL, params={'per_page': 50})
+
+    def test_replay_exhausted(self):
+        self._record()
+        replay = ReplaySession(self.cassette, time_scale=0)
+        replay.get(COURSES_URL, params={'per_page': 100})
+
+        with self.assertRaises(CassetteMismatchError):
+            replay.get(COURSES_URL, params={'per_page': 100})
+
+    def test_replay_allow_repeats(self):
+        self._record()
+        replay = ReplaySession(self.cassette, time_scale=0, allow_repeats=True)
+        first = replay.get(COURSES_URL, params={'per_page': 100})
+        second = replay.get(COURSES_URL, params={'per_page': 100})
+
+        self.assertEqual(first.json(), second.json())
+
+    def test_replay_error_status(self):
+        cassette = Cassette([{
+            'method': 'GET', 'url': COURSES_URL, 'params': '',
+            'status': 403, 'reason': 'Forbidden', 'headers': {},
+            'body': '403 Forbidden (Rate Limit Exceeded)', 'elapsed': 0.1}])
+        replay = ReplaySession(cassette, time_scale=0)
+
+        response = replay.get(COURSES_URL)
+
+        self.assertFalse(response.ok)
+        with self.assertRaises(HTTPError):
+            response.raise_for_status()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+
+from canvas_api_client.changes import ChangeDetector, _IdSet
+from canvas_api_client.deadline import TimeBudget
+from canvas_api_client.sync import ADDED, CHANGED, REMOVED
+
+from unittest import TestCase, main
+
+
+def user(user_id, name=None, last_login='2018-01-01'):
+    return {'id': user_id, 'name': name or 'User {}'.format(user_id),
+            'last_login': last_login}
+
+
+def kinds(changes):
+    return [(c.kind, c.id) for c in changes]
+
+
+class TestChangeDetector(TestCase):
+
+    def setUp(self):
+        self.detector = ChangeDetector(ignore=['last_login'])
+        self.users = [user(i) for i in (5, 3, 9, 1)]
+        list(self.detector.changes(self.users))
+
+    def test_first_crawl_adds_everything(self):
+        detector = ChangeDetector()
+
+        changes = list(detector.changes(self.users))
+
+        self.assertEqual(kinds(changes), [(ADDED, 5), (ADDED, 3),
+                                          (ADDED, 9), (ADDED, 1)])
+        self.assertIs(changes[0].record, self.users[0])
+        self.assertEqual(len(detector), 4)
+
+    def test_unchanged_crawl_emits_nothing(self):
+        self.users[0]['last_login'] = '2018-02-01'
+
+        self.assertEqual(list(self.detector.changes(self.users)), [])
+
+    def test_changes_and_tombstones(self):
+        self.users[1] = user(3, name='Renamed')
+        del self.users[2]
+        self.users.append(user(12))
+
+        changes = list(self.detector.changes(self.users))
+
+        self.assertEqual(kinds(changes),
+                         [(CHANGED, 3), (ADDED, 12), (REMOVED, 9)])
+        self.assertIsNone(changes[2].record)
+        self.assertEqual(list(self.detector.changes(self.users)), [])
+
+    def test_pages(self):
+        pages = [self.users[:2], self.users[2:] + [user(2)]]
+
+        self.assertEqual(kinds(self.detector.changes(pages)), [(ADDED, 2)])
+
+    def test_duplicates_ignored(self):
+        users = self.users + [user(3, name='Renamed'), user(7), user(7)]
+
+        self.assertEqual(kinds(self.detector.changes(users)), [(ADDED, 7)])
+        self.assertEqual(len(self.detector), 5)
+
+    def test_id_set(self):
+        ids = _IdSet()
+        values = [i * 1000 for i in range(5000)] + [2 ** 62, 1]
+
+        self.assertTrue(all(ids.add(value) for value in values))
+        self.assertFalse(any(ids.add(value) for value in values))
+        self.assertEqual(len(ids._slots), 16384)
+
+    def test_fields(self):
+        detector = ChangeDetector(fields=['name'])
+        list(detector.changes(self.users))
+        self.users[0]['last_login'] = '2018-02-01'
+        self.users[1]['name'] = 'Renamed'
+
+        self.assertEqual(kinds(detector.changes(self.users)), [(CHANGED, 3)])
+
+    def test_partial_crawl_keeps_unreached_ids(self):
+        budget = TimeBudget(0)
+        budget.stop()
+
+        changes = list(self.detector.changes(self.users[:2], deadline=budget))
+
+        self.assertEqual(changes, [])
+        self.assertEqual(len(self.detector), 4)
+
+    def test_save_and_load(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tempdir, 'users.hashes')
+            self.detector.save(path)
+            self.assertEqual(os.path.getsize(path), 13 + 4 * 16)
+
+            detector = ChangeDetector.load(path, ignore=['last_login'])
+            self.users[3] = user(1, name='Renamed')
+            self.assertEqual(kinds(detector.changes(self.users)),
+                             [(CHANGED, 1)])
+
+            self.assertEqual(
+                len(ChangeDetector.load(os.path.join(tempdir, 'missing'))), 0)
+        finally:
+            shutil.rmtree(tempdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from canvas_api_client import cli
+from canvas_api_client.response import SimpleResponse
+from canvas_api_client.transport import Transport
+
+from unittest import TestCase, main
+from unittest.mock import MagicMock, patch
+
+API_URL = 'https://foo.cc.columbia.edu/api/v1/'
+
+
+class SlowTransport(Transport):
+    """
+    Serves one page of users per course, each taking `seconds`.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.urls = []
+
+    def request(self, method, url, **kwargs):
+        self.urls.append(url)
+        time.sleep(self.seconds)
+        course_id = int(url.split('/')[-2])
+        body = json.dumps(users(course_id, 1)[0]).encode('utf-8')
+        return SimpleResponse(200, url, headers={
+            'Link': '<{}?page=1>; rel="last"'.format(url)}, content=body)
+
+
+def users(course_id, count=3):
+    return [[{'id': course_id * 100 + i, 'name': 'User {}'.format(i),
+              'enrollments': [{'role': 'StudentEnrollment'}]}]
+            for i in range(count)]
+
+
+class TestParseParams(TestCase):
+
+    def test_params(self):
+        self.assertEqual(
+            cli._parse_params(['state[]=available', 'state[]=completed',
+                               'search_term=bio']),
+            {'state[]': ['available', 'completed'], 'search_term': 'bio'})
+
+        with self.assertRaises(Exception):
+            cli._parse_params(['state'])
+
+
+class TestExport(TestCase):
+
+    def test_ndjson(self):
+        out = io.StringIO()
+        totals = cli.export(users(1), out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines],
+                         [100, 101, 102])
+        self.assertEqual(totals, {'records': 3, 'pages': 3,
+                                  'bytes': len(out.getvalue())})
+
+    def test_csv(self):
+        out = io.StringIO()
+        cli.export(users(1), out, 'csv', ['id', 'enrollments'])
+
+        rows = list(csv.reader(io.StringIO(out.getvalue())))
+        self.assertEqual(rows[0], ['id', 'enrollments'])
+        self.assertEqual(rows[1],
+                         ['100', '[{"role":"StudentEnrollment"}]'])
+        self.assertEqual(len(rows), 4)
+
+    def test_counts_bytes(self):
+        out = io.StringIO()
+        totals = cli.export([[{'id': 1, 'name': 'Zo\u00eb'}]], out, 'csv')
+
+        self.assertEqual(totals['bytes'],
+                         len(out.getvalue().encode('utf-8')))
+        self.assertEqual(totals['bytes'], len(out.getvalue()) + 1)
+
+
+class TestStreamPages(TestCase):
+
+    def test_concurrent_listings(self):
+        listings = [lambda c=c: iter(users(c, 20)) for c in range(1, 5)]
+        ids = [record['id'] for page in cli._stream_pages(listings, 3)
+               for record in page]
+
+        self.assertEqual(sorted(ids), sorted(
+            c * 100 + i for c in range(1, 5) for i in range(20)))
+
+    def test_error(self):
+        def failing():
+            yield [{'id': 1}]
+            raise RuntimeError('boom')
+
+        with self.assertRaises(RuntimeError):
+            list(cli._stream_pages([failing], 2))
+
+
+@patch('canvas_api_client.cli.CanvasAPIv1')
+class TestMain(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _client(self, client_class):
+        client = MagicMock()
+        client.get_course_users.side_effect = \
+            lambda course_id, **kwargs: iter(users(int(course_id)))
+        client.get_account_courses.side_effect = \
+            lambda account_id, **kwargs: iter([[{'id': 1}, {'id': 2}]])
+        client_class.return_value = client
+        return client
+
+    def test_users_to_gzip(self, client_class):
+        client = self._client(client_class)
+        path = os.path.join(self.tempdir, 'users.ndjson.gz')
+
+        with patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            status = cli.main(['users', '--course', '1', '--course', '2',
+                               '--concurrency', '2', '--per-page', '50',
+                               '--api-url', API_URL, '--token', 'foo',
+                               '-o', path])
+
+        self.assertEqual(status, 0)
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            ids = sorted(json.loads(line)['id'] for line in f)
+        self.assertEqual(ids, [100, 101, 102, 200, 201, 202])
+        self.assertEqual(client_class.call_args[1]['per_page'], 50)
+        self.assertEqual(client.get_course_users.call_count, 2)
+        self.assertIn('Exported 6 records (6 pages', stderr.getvalue())
+
+    def test_sis_account_courses(self, client_class):
+        client = self._client(client_class)
+        path = os.path.join(self.tempdir, 'courses.csv')
+
+        with patch('sys.stderr', new_callable=io.StringIO):
+            cli.main(['courses', '--account', 'ENG', '--sis',
+                      '--format', 'csv', '--param', 'state[]=available',
+                      '--api-url', API_URL, '-o', path])
+
+        with open(path, encoding='utf-8') as f:
+            self.assertEqual(f.read().split(), ['id', '1', '2'])
+        args, kwargs = client.get_account_courses.call_args
+        self.assertEqual(args, ('sis_account_id:ENG',))
+        self.assertEqual(kwargs['params'], {'state[]': ['available']})
+
+    def test_missing_arguments(self, client_class):
+        with patch.dict(os.environ, {}, clear=True), \
+                patch('sys.stderr', new_callable=io.StringIO):
+            with self.assertRaises(SystemExit):
+                cli.main(['courses', '--account', '1'])
+            with self.assertRaises(SystemExit):
+                cli.main(['courses', '--api-url', API_URL])
+
+
+class TestTimeLimit(TestCase):
+
+    def _export(self, time_limit):
+        """
+        Exports the users of three courses, each page taking 0.2s, and
+        returns the transport, the exported IDs and the summary.
+        """
+        transport = SlowTransport(0.2)
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        path = os.path.join(tempdir, 'users.ndjson')
+
+        with patch('canvas_api_client.cli.RequestsTransport',
+                   return_value=transport), \
+                patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            status = cli.main(['users', '--course', '1', '--course', '2',
+                               '--course', '3', '--time-limit', time_limit,
+                               '--api-url', API_URL, '-o', path])
+
+        self.assertEqual(status, 0)
+        with open(path, encoding='utf-8') as f:
+            ids = [json.loads(line)['id'] for line in f]
+        return transport, ids, stderr.getvalue()
+
+    def test_partial_export(self):
+        transport, ids, summary = self._export('0.1')
+
+        self.assertEqual(len(transport.urls), 1)
+        self.assertEqual(ids, [100])
+        self.assertIn('Exported 1 records', summary)
+        self.assertIn('(time limit reached, partial export)', summary)
+
+    def test_zero_time_limit(self):
+        transport, ids, summary = self._export('0')
+
+        self.assertEqual(transport.urls, [])
+        self.assertEqual(ids, [])
+        self.assertIn('(time limit reached, partial export)', summary)
+
+
+if __name__ == '__main__':
+    main()
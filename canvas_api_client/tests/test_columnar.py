@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+
+from canvas_api_client.columnar import (
+    ColumnarCollector, ColumnSpec, write_parquet)
+
+from unittest import TestCase, main, skipIf
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+def user(user_id, role='StudentEnrollment', state='active', score=None):
+    return {'id': user_id,
+            'name': 'User {}'.format(user_id),
+            'sis_user_id': 'UNI{}'.format(user_id) if user_id % 2 else None,
+            'enrollments': [{'role': role,
+                             'enrollment_state': state,
+                             'grades': {'current_score': score}}]}
+
+
+USERS = [user(1, score=90.5),
+         user(2, role='TeacherEnrollment'),
+         user(3, state='invited', score=70.0),
+         {'id': None, 'enrollments': []}]
+
+COLUMNS = {
+    'id': 'int',
+    'sis_user_id': 'str',
+    'role': ColumnSpec('enrollments.0.role', 'category'),
+    'state': ColumnSpec('enrollments.0.enrollment_state', 'category'),
+    'score': ColumnSpec('enrollments.0.grades.current_score', 'float'),
+}
+
+
+class TestColumnarCollector(TestCase):
+
+    def setUp(self):
+        self.collector = ColumnarCollector(COLUMNS)
+        self.assertEqual(self.collector.extend([USERS[:2], USERS[2:]]), 4)
+
+    def test_values(self):
+        self.assertEqual(len(self.collector), 4)
+        self.assertEqual(self.collector.values('id'), [1, 2, 3, None])
+        self.assertEqual(self.collector.values('sis_user_id'),
+                         ['UNI1', None, 'UNI3', None])
+        self.assertEqual(self.collector.values('score'),
+                         [90.5, None, 70.0, None])
+        self.assertEqual(
+            self.collector.values('role'),
+            ['StudentEnrollment', 'TeacherEnrollment', 'StudentEnrollment',
+             None])
+
+    def test_categories(self):
+        self.assertEqual(self.collector.categories('state'),
+                         ['active', 'invited'])
+        self.assertEqual(list(self.collector._columns['state'].values),
+                         [0, 0, 1, -1])
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            ColumnarCollector({'id': 'decimal'})
+
+    def test_batches_keep_codes(self):
+        collector = ColumnarCollector(COLUMNS)
+        batches = [(len(batch), batch.values('id'), batch.categories('role'))
+                   for batch in collector.batches(USERS, batch_size=3)]
+
+        self.assertEqual(batches, [
+            (3, [1, 2, 3], ['StudentEnrollment', 'TeacherEnrollment']),
+            (1, [None], ['StudentEnrollment', 'TeacherEnrollment']),
+        ])
+
+    @skipIf(numpy is None, 'numpy is not installed')
+    def test_to_numpy(self):
+        columns = self.collector.to_numpy()
+
+        self.assertEqual(columns['id'].dtype, numpy.int64)
+        self.assertEqual(columns['id'].mask.tolist(),
+                         [False, False, False, True])
+        self.assertEqual(columns['role'].tolist(), [0, 1, 0, -1])
+        self.assertTrue(numpy.isnan(columns['score'][1]))
+
+    @skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_to_arrow(self):
+        table = self.collector.to_arrow()
+
+        self.assertEqual(table.column_names, list(COLUMNS))
+        self.assertEqual(table.column('id').to_pylist(), [1, 2, 3, None])
+        self.assertTrue(pyarrow.types.is_dictionary(
+            table.schema.field('role').type))
+        self.assertEqual(table.column('state').to_pylist(),
+                         ['active', 'active', 'invited', None])
+        self.assertEqual(table.column('score').to_pylist(),
+                         [90.5, None, 70.0, None])
+
+    @skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_write_parquet(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tempdir, 'users.parquet')
+            rows = write_parquet(path, USERS * 3, COLUMNS, batch_size=5)
+
+            parquet_file = pyarrow.parquet.ParquetFile(path)
+            self.assertEqual(rows, 12)
+            self.assertEqual(parquet_file.metadata.num_row_groups, 3)
+            self.assertEqual(parquet_file.read().column('role').to_pylist(),
+                             [u['enrollments'][0]['role']
+                              if u['enrollments'] else None
+                              for u in USERS * 3])
+        finally:
+            shutil.rmtree(tempdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+import threading
+
+from canvas_api_client.deadline import Deadline, TimeBudget, should_stop
+from canvas_api_client.errors import DeadlineExceeded
+from canvas_api_client.scheduler import RequestScheduler
+from canvas_api_client.v1_client import CanvasAPIv1
+from tests.helpers import FakeClock
+
+from unittest import TestCase, main
+from unittest.mock import MagicMock
+
+URL = 'https://foo.cc.columbia.edu/api/v1/courses/1/users'
+
+
+def get_page(page, last=False):
+    links = {} if last else {
+        'next': {'url': '{}?page={}'.format(URL, page + 1)}}
+    response = MagicMock(headers={'link': '...'}, links=links)
+    response.json.return_value = ['page {} item'.format(page)]
+    return response
+
+
+class TestDeadline(TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock(1000.0)
+
+    def test_remaining_and_expired(self):
+        deadline = Deadline(10, clock=self.clock)
+        self.assertEqual(deadline.remaining(), 10)
+        self.assertFalse(deadline.expired())
+
+        self.clock.now += 11
+        self.assertEqual(deadline.remaining(), 0)
+        self.assertTrue(deadline.expired())
+        with self.assertRaises(DeadlineExceeded):
+            deadline.check()
+
+    def test_timeout(self):
+        deadline = Deadline(10, clock=self.clock)
+        self.assertEqual(deadline.timeout(None), 10)
+        self.assertEqual(deadline.timeout(30), 10)
+        self.assertEqual(deadline.timeout(5), 5)
+        self.assertEqual(deadline.timeout((3.05, 27)), (3.05, 10))
+
+    def test_should_stop(self):
+        self.assertFalse(should_stop(None))
+
+        budget = TimeBudget(1, clock=self.clock)
+        self.assertFalse(should_stop(budget))
+        self.clock.now += 1
+        self.assertTrue(should_stop(budget))
+        self.assertTrue(budget.exhausted)
+
+        deadline = Deadline(1, clock=self.clock)
+        self.clock.now += 1
+        with self.assertRaises(DeadlineExceeded):
+            should_stop(deadline)
+
+
+class TestCanvasAPIv1Deadlines(TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock(1000.0)
+        self._mock_requests = MagicMock()
+        self._pages = [get_page(i, last=(i == 3)) for i in (1, 2, 3)]
+        self.test_client = CanvasAPIv1('https://foo.cc.columbia.edu/api/v1/',
+                                       'foo_token',
+                                       requests_lib=self._mock_requests,
+                                       timeout=(3.05, 27))
+
+    def test_client_timeout(self):
+        self.test_client.get_course_info('1')
+
+        args, kwargs = self._mock_requests.get.call_args
+        self.assertEqual(kwargs['timeout'], (3.05, 27))
+
+    def test_no_timeout_by_default(self):
+        client = CanvasAPIv1('https://foo.cc.columbia.edu/api/v1/',
+                             'foo_token',
+                             requests_lib=self._mock_requests)
+        client.get_course_info('1')
+
+        args, kwargs = self._mock_requests.get.call_args
+        self.assertNotIn('timeout', kwargs)
+
+    def _send_pages(self, seconds):
+        """
+        Serves the pages in order, each taking `seconds` on the fake clock.
+        """
+        def send(*args, **kwargs):
+            self.clock.now += seconds
+            return self._pages.pop(0)
+        return send
+
+    def test_deadline_covers_pagination(self):
+        self._mock_requests.get.side_effect = self._send_pages(5)
+        deadline = Deadline(10, clock=self.clock)
+
+        pages = self.test_client.get_course_users(
+            '1', flatten_response=True, deadline=deadline)
+
+        self.assertEqual(next(pages), 'page 1 item')
+        self.assertEqual(next(pages), 'page 2 item')
+        with self.assertRaises(DeadlineExceeded):
+            next(pages)
+
+        timeouts = [c[1]['timeout']
+                    for c in self._mock_requests.get.call_args_list]
+        self.assertEqual(timeouts, [(3.05, 10), (3.05, 5)])
+
+    def test_time_budget_returns_partial_results(self):
+        self._mock_requests.get.side_effect = self._send_pages(6)
+        budget = TimeBudget(10, clock=self.clock)
+
+        pages = list(self.test_client.get_account_courses(
+            '1', deadline=budget))
+
+        self.assertEqual(pages, [['page 1 item'], ['page 2 item']])
+        self.assertTrue(budget.exhausted)
+
+    def test_time_budget_not_exhausted(self):
+        self._mock_requests.get.side_effect = self._send_pages(1)
+        budget = TimeBudget(10, clock=self.clock)
+
+        pages = list(self.test_client.get_account_courses(
+            '1', deadline=budget))
+
+        self.assertEqual(len(pages), 3)
+        self.assertFalse(budget.exhausted)
+
+    def test_exhausted_time_budget_lists_nothing(self):
+        budget = TimeBudget(0, clock=self.clock)
+
+        pages = list(self.test_client.get_course_users(
+            '1', deadline=budget))
+        users = list(self.test_client.get_course_users(
+            '1', flatten_response=True, deadline=budget))
+
+        self.assertEqual(pages, [])
+        self.assertEqual(users, [])
+        self.assertTrue(budget.exhausted)
+        self._mock_requests.get.assert_not_called()
+
+    def test_time_budget_does_not_shorten_timeouts(self):
+        self._mock_requests.get.side_effect = self._send_pages(1)
+        budget = TimeBudget(10, clock=self.clock)
+
+        list(self.test_client.get_account_courses('1', deadline=budget))
+
+        timeouts = [c[1]['timeout']
+                    for c in self._mock_requests.get.call_args_list]
+        self.assertEqual(timeouts, [(3.05, 27)] * 3)
+
+    def test_expired_deadline_sends_nothing(self):
+        deadline = Deadline(0, clock=self.clock)
+
+        with self.assertRaises(DeadlineExceeded):
+            self.test_client._get(URL, deadline=deadline)
+        self._mock_requests.get.assert_not_called()
+
+    def _get_after_queueing(self, seconds):
+        """
+        Sends a request that waits `seconds` (on the fake clock) for a
+        scheduler slot, with a 10 second deadline.
+        """
+        scheduler = RequestScheduler(max_concurrency=1)
+        client = CanvasAPIv1('https://foo.cc.columbia.edu/api/v1/',
+                             'foo_token', requests_lib=self._mock_requests,
+                             timeout=(3.05, 27), scheduler=scheduler)
+        deadline = Deadline(10, clock=self.clock)
+        errors = []
+
+        def get():
+            try:
+                client._get(URL, deadline=deadline)
+            except DeadlineExceeded as e:
+                errors.append(e)
+
+        scheduler.acquire()
+        thread = threading.Thread(target=get)
+        thread.start()
+        while not scheduler.stats()[1].waiting:
+            thread.join(0.001)
+        self.clock.now += seconds
+        scheduler.release()
+        thread.join(5)
+        return errors
+
+    def test_timeout_counts_scheduler_wait(self):
+        self.assertEqual(self._get_after_queueing(4), [])
+
+        args, kwargs = self._mock_requests.get.call_args
+        self.assertEqual(kwargs['timeout'], (3.05, 6))
+
+    def test_deadline_passes_in_scheduler_queue(self):
+        errors = self._get_after_queueing(11)
+
+        self.assertEqual(len(errors), 1)
+        self._mock_requests.get.assert_not_called()
+
+
+if __name__ == '__main__':
+    main()
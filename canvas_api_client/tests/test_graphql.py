@@ -0,0 +1,139 @@
+from canvas_api_client.deadline import TimeBudget
+from canvas_api_client.errors import GraphQLError
+from canvas_api_client.graphql import GraphQLFetcher
+
+from unittest import TestCase, main
+from unittest.mock import MagicMock
+
+PAGE_INFO = {'hasNextPage': False, 'endCursor': None}
+
+
+def _response(data):
+    return MagicMock(**{'json.return_value': data})
+
+
+def _enrollment(enrollment_id, user_id, state='active'):
+    return {'_id': str(enrollment_id), 'type': 'StudentEnrollment',
+            'state': state,
+            'user': {'_id': str(user_id), 'name': 'User {}'.format(user_id),
+                     'sisId': 'U{}'.format(user_id)}}
+
+
+class TestGraphQLFetcher(TestCase):
+
+    def setUp(self):
+        self.client = MagicMock()
+        self.fetcher = GraphQLFetcher(self.client, page_size=2,
+                                      enrollments_page_size=2)
+
+    def test_get_account_courses(self):
+        pages = [
+            {'nodes': [{'_id': '1', 'name': 'A', 'state': 'available'},
+                       {'_id': '2', 'name': 'B', 'state': 'created'}],
+             'pageInfo': {'hasNextPage': True, 'endCursor': 'c2'}},
+            {'nodes': [{'_id': '3', 'name': 'C', 'state': 'completed'}],
+             'pageInfo': PAGE_INFO},
+        ]
+        self.client.graphql.side_effect = [
+            _response({'data': {'account': {'coursesConnection': page}}})
+            for page in pages]
+
+        courses = list(self.fetcher.get_account_courses(
+            '115', fields=['id', 'name', 'workflow_state']))
+
+        self.assertEqual(courses, [
+            [{'id': 1, 'name': 'A', 'workflow_state': 'available'},
+             {'id': 2, 'name': 'B', 'workflow_state': 'unpublished'}],
+            [{'id': 3, 'name': 'C', 'workflow_state': 'completed'}]])
+        calls = self.client.graphql.call_args_list
+        query = calls[0][0][0]
+        self.assertIn('nodes { _id name state }', query)
+        self.assertNotIn('enrollmentsConnection', query)
+        self.assertEqual(calls[0][0][1], {'accountId': '115', 'first': 2,
+                                          'after': None})
+        self.assertEqual(calls[1][0][1]['after'], 'c2')
+
+    def test_get_account_courses_with_users(self):
+        course = {
+            '_id': '1', 'name': 'A',
+            'enrollmentsConnection': {
+                'nodes': [_enrollment(10, 7), _enrollment(11, 8)],
+                'pageInfo': {'hasNextPage': True, 'endCursor': 'e2'}}}
+        rest = {'nodes': [_enrollment(12, 7, 'invited'),
+                          _enrollment(13, 8, 'completed'),
+                          _enrollment(14, 9, 'deleted')],
+                'pageInfo': PAGE_INFO}
+        self.client.graphql.side_effect = [
+            _response({'data': {'account': {'coursesConnection': {
+                'nodes': [course], 'pageInfo': PAGE_INFO}}}}),
+            _response({'data': {'course': {'enrollmentsConnection': rest}}}),
+        ]
+
+        results = list(self.fetcher.get_account_courses_with_users(
+            '115', course_fields=['name'],
+            user_fields=['name', 'sis_user_id']))
+
+        self.assertEqual(results, [({'id': 1, 'name': 'A'}, [
+            {'id': 7, 'name': 'User 7', 'sis_user_id': 'U7', 'enrollments': [
+                {'id': 10, 'course_id': 1, 'user_id': 7,
+                 'type': 'StudentEnrollment', 'enrollment_state': 'active'},
+                {'id': 12, 'course_id': 1, 'user_id': 7,
+                 'type': 'StudentEnrollment', 'enrollment_state': 'invited'},
+            ]},
+            {'id': 8, 'name': 'User 8', 'sis_user_id': 'U8', 'enrollments': [
+                {'id': 11, 'course_id': 1, 'user_id': 8,
+                 'type': 'StudentEnrollment', 'enrollment_state': 'active'},
+            ]},
+        ])])
+        follow_up = self.client.graphql.call_args_list[1][0]
+        self.assertIn('user { _id name sisId }', follow_up[0])
+        self.assertEqual(follow_up[1], {'courseId': '1',
+                                        'enrollmentsFirst': 2,
+                                        'after': 'e2'})
+
+        self.client.graphql.side_effect = [
+            _response({'data': {'account': {'coursesConnection': {
+                'nodes': [course], 'pageInfo': PAGE_INFO}}}}),
+            _response({'data': {'course': {'enrollmentsConnection': rest}}}),
+        ]
+        (_, users), = self.fetcher.get_account_courses_with_users(
+            '115', enrollment_states=None)
+        self.assertEqual([len(user['enrollments']) for user in users],
+                         [2, 2, 1])
+
+    def test_errors_and_budget(self):
+        self.client.graphql.return_value = _response(
+            {'errors': [{'message': 'not found'}], 'data': None})
+        with self.assertRaises(GraphQLError):
+            list(self.fetcher.get_account_courses('115'))
+
+        with self.assertRaises(ValueError):
+            list(self.fetcher.get_account_courses('115', fields=['term']))
+
+        self.client.graphql.return_value = _response(
+            {'data': {'account': {'coursesConnection': {
+                'nodes': [{'_id': '1'}],
+                'pageInfo': {'hasNextPage': True, 'endCursor': 'c1'}}}}})
+        now = [0.0]
+
+        def graphql(query, variables, deadline=None):
+            now[0] += 20
+            return response
+
+        response = self.client.graphql.return_value
+        self.client.graphql.reset_mock()
+        self.client.graphql.side_effect = graphql
+        budget = TimeBudget(10, clock=lambda: now[0])
+        pages = list(self.fetcher.get_account_courses(
+            '115', fields=['id'], deadline=budget))
+        self.assertEqual(pages, [[{'id': 1}]])
+        self.assertEqual(self.client.graphql.call_count, 1)
+        self.assertTrue(budget.exhausted)
+
+        self.assertEqual(list(self.fetcher.get_account_courses(
+            '115', deadline=budget)), [])
+        self.assertEqual(self.client.graphql.call_count, 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+import threading
+import time
+
+from canvas_api_client.hedging import HedgingPolicy
+from canvas_api_client.scheduler import RequestScheduler
+from canvas_api_client.v1_client import CanvasAPIv1
+
+from unittest import TestCase, main
+from unittest.mock import MagicMock
+
+
+class SlowThenFast(object):
+    """
+    The first call blocks until released (or a timeout), later calls return
+    immediately.
+    """
+
+    def __init__(self, slow_result='slow', fast_result='fast',
+                 fast_error=None):
+        self.calls = 0
+        self.release = threading.Event()
+        self._slow_result = slow_result
+        self._fast_result = fast_result
+        self._fast_error = fast_error
+        self._lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            self.calls += 1
+            first = self.calls == 1
+        if first:
+            self.release.wait(5)
+            return self._slow_result
+        if self._fast_error is not None:
+            raise self._fast_error
+        return self._fast_result
+
+
+class TestHedgingPolicy(TestCase):
+
+    def setUp(self):
+        self.policy = HedgingPolicy(initial_delay=0.01, max_extra_load=1.0)
+
+    def tearDown(self):
+        self.policy.shutdown()
+
+    def test_fast_call_not_hedged(self):
+        fn = MagicMock(return_value='response')
+
+        self.assertEqual(self.policy.call(fn), 'response')
+
+        self.assertEqual(fn.call_count, 1)
+        self.assertEqual(self.policy.stats().hedged, 0)
+
+    def test_slow_call_hedged(self):
+        fn = SlowThenFast()
+
+        self.assertEqual(self.policy.call(fn), 'fast')
+        fn.release.set()
+
+        stats = self.policy.stats()
+        self.assertEqual(fn.calls, 2)
+        self.assertEqual(stats.hedged, 1)
+        self.assertEqual(stats.hedge_wins, 1)
+
+    def test_hedge_error_falls_back_to_primary(self):
+        fn = SlowThenFast(fast_error=IOError('reset'))
+
+        threading.Timer(0.05, fn.release.set).start()
+        self.assertEqual(self.policy.call(fn), 'slow')
+
+        self.assertEqual(self.policy.stats().hedge_wins, 0)
+
+    def test_primary_error_not_hedged(self):
+        fn = MagicMock(side_effect=ValueError)
+
+        with self.assertRaises(ValueError):
+            self.policy.call(fn)
+        self.assertEqual(fn.call_count, 1)
+
+    def test_extra_load_cap(self):
+        policy = HedgingPolicy(initial_delay=0.01, max_extra_load=0.0)
+        fn = SlowThenFast()
+
+        threading.Timer(0.05, fn.release.set).start()
+        self.assertEqual(policy.call(fn), 'slow')
+
+        stats = policy.stats()
+        self.assertEqual(fn.calls, 1)
+        self.assertEqual(stats.hedged, 0)
+        self.assertEqual(stats.denied, 1)
+        policy.shutdown()
+
+    def test_queueing_does_not_trigger_hedges(self):
+        policy = HedgingPolicy(initial_delay=0.05, max_extra_load=1.0,
+                               max_workers=1)
+        self.addCleanup(policy.shutdown)
+        busy = SlowThenFast()
+        fast = MagicMock(return_value='fast')
+
+        first = threading.Thread(target=policy.call, args=(busy,))
+        first.start()
+        while busy.calls == 0:
+            time.sleep(0.001)
+        threading.Timer(0.2, busy.release.set).start()
+
+        self.assertEqual(policy.call(fast), 'fast')
+        first.join()
+
+        self.assertEqual(fast.call_count, 1)
+        self.assertEqual(policy.stats().hedged, 1)
+        self.assertLess(min(policy._latencies), 0.05)
+
+    def test_delay_from_percentile(self):
+        policy = HedgingPolicy(percentile=90, min_samples=10,
+                               min_delay=0.01, max_delay=1.0)
+        self.assertEqual(policy.delay(), policy.initial_delay)
+
+        policy._latencies.extend(i / 100.0 for i in range(1, 11))
+        self.assertAlmostEqual(policy.delay(), 0.09)
+
+        policy._latencies.extend([5.0] * 10)
+        self.assertEqual(policy.delay(), 1.0)
+        policy.shutdown()
+
+
+class TestCanvasAPIv1Hedging(TestCase):
+
+    def setUp(self):
+        self.hedging = HedgingPolicy(initial_delay=0.01, max_extra_load=1.0)
+
+    def tearDown(self):
+        self.hedging.shutdown()
+
+    def test_hedged_get(self):
+        mock_requests = MagicMock()
+        slow_response, fast_response = MagicMock(), MagicMock()
+        fn = SlowThenFast(slow_response, fast_response)
+        mock_requests.get.side_effect = fn
+        client = CanvasAPIv1('https://foo.cc.columbia.edu/api/v1/',
+                             'foo_token',
+                             requests_lib=mock_requests,
+                             hedging=self.hedging)
+
+        response = client.get_course_info('1')
+        fn.release.set()
+
+        self.assertIs(response, fast_response)
+        self.assertEqual(mock_requests.get.call_count, 2)
+        self.assertEqual(self.hedging.stats().hedge_wins, 1)
+
+    def test_writes_not_hedged(self):
+        mock_requests = MagicMock()
+        client = CanvasAPIv1('https://foo.cc.columbia.edu/api/v1/',
+                             'foo_token',
+                             requests_lib=mock_requests,
+                             hedging=self.hedging)
+
+        client.update_course('1')
+
+        self.assertEqual(self.hedging.stats().requests, 0)
+
+    def test_priority_carried_to_hedges(self):
+        scheduler = RequestScheduler()
+        client = CanvasAPIv1('https://foo.cc.columbia.edu/api/v1/',
+                             'foo_token',
+                             requests_lib=MagicMock(),
+                             scheduler=scheduler,
+                             hedging=self.hedging)
+
+        with scheduler.priority('interactive'):
+            client.get_course_info('1')
+
+        self.assertEqual(scheduler.stats()[0].priority, 'interactive')
+        self.assertEqual(scheduler.stats()[0].requests, 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+
+from canvas_api_client.deadline import TimeBudget
+from canvas_api_client.journal import DONE, FAILED, PLANNED, MutationJournal
+
+from unittest import TestCase, main
+from unittest.mock import MagicMock
+
+
+class TestMutationJournal(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, 'job.journal')
+        self.sent = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _mutations(self, keys, failing=()):
+        def send(key):
+            self.sent.append(key)
+            if key in failing:
+                raise RuntimeError('500 for {}'.format(key))
+            return MagicMock(status_code=200)
+
+        return [(key, lambda key=key: send(key)) for key in keys]
+
+    def _lines(self):
+        with open(self.path, encoding='utf-8') as f:
+            return f.read().splitlines()
+
+    def test_resume_skips_completed(self):
+        keys = ['page:{}'.format(i) for i in range(10)]
+        with MutationJournal(self.path) as journal:
+            report = journal.run_all(self._mutations(keys, {'page:3'}),
+                                     max_workers=4)
+        self.assertEqual((report.applied, report.skipped, report.failed),
+                         (9, 0, 1))
+        self.assertEqual(report.errors[0][0], 'page:3')
+        self.assertEqual(len(self._lines()), 20)
+
+        self.sent = []
+        with MutationJournal(self.path) as journal:
+            self.assertEqual(journal.state('page:3'), FAILED)
+            self.assertEqual(journal.pending(), ['page:3'])
+            report = journal.run_all(self._mutations(keys))
+
+        self.assertEqual(self.sent, ['page:3'])
+        self.assertEqual((report.applied, report.skipped), (1, 9))
+
+    def test_batches_and_torn_lines(self):
+        clock = MagicMock(return_value=0.0)
+        journal = MutationJournal(self.path, batch_size=3, max_delay=10,
+                                  clock=clock)
+        journal.record('a', PLANNED)
+        journal.record('b', PLANNED)
+        self.assertEqual(self._lines(), [])
+
+        journal.record('a', DONE, status=200)
+        self.assertEqual(len(self._lines()), 3)
+
+        journal.record('d', PLANNED)
+        self.assertEqual(len(self._lines()), 3)
+        clock.return_value = 11.0
+        journal.record('e', PLANNED)
+        self.assertEqual(len(self._lines()), 5)
+        journal.close()
+
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('{"key":"b","sta')
+        journal = MutationJournal(self.path)
+        self.assertTrue(journal.completed('a'))
+        self.assertEqual(journal.state('b'), PLANNED)
+        journal.record('c', PLANNED)
+        journal.close()
+
+        self.assertEqual(len(self._lines()), 6)
+        with MutationJournal(self.path) as journal:
+            self.assertEqual(journal.state('c'), PLANNED)
+
+    def test_compact(self):
+        with MutationJournal(self.path) as journal:
+            journal.run_all(self._mutations(['a', 'b']))
+            journal.compact()
+            journal.record('c', DONE)
+
+        self.assertEqual(len(self._lines()), 3)
+        with MutationJournal(self.path) as journal:
+            self.assertEqual(journal.pending(), [])
+
+    def test_time_budget(self):
+        with MutationJournal(self.path) as journal:
+            journal.run_all(self._mutations(['a']))
+            report = journal.run_all(self._mutations(['a', 'b', 'c']),
+                                     deadline=TimeBudget(0))
+
+        self.assertEqual((report.applied, report.skipped), (0, 1))
+        self.assertEqual(report.unsent, ['b', 'c'])
+        self.assertEqual(self.sent, ['a'])
+
+
+if __name__ == '__main__':
+    main()
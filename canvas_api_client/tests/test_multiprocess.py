@@ -0,0 +1,142 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from canvas_api_client.deadline import Deadline, TimeBudget
+from canvas_api_client.multiprocess import ShardedCrawler
+from canvas_api_client.response import SimpleResponse
+from canvas_api_client.transport import Transport
+
+from unittest import TestCase, main
+
+API_URL = 'https://foo.cc.columbia.edu/api/v1/'
+
+
+class FakeTransport(Transport):
+    """
+    Serves 95 items for any listing, with numbered `last` links unless
+    `bookmarks` is set.
+    """
+
+    def __init__(self, bookmarks=False):
+        self.bookmarks = bookmarks
+        self.timeouts = []
+
+    def request(self, method, url, params=None, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        parts = urlsplit(url)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        query.update(params or {})
+        per_page = int(query['per_page'])
+        page = int(query.get('page', 1))
+        body = [{'id': i, 'path': parts.path}
+                for i in range((page - 1) * per_page,
+                               min(page * per_page, 95))]
+
+        base = '{}://{}{}'.format(parts.scheme, parts.netloc, parts.path)
+        links = []
+        last = (95 + per_page - 1) // per_page
+        if page < last:
+            links.append('<{}?{}>; rel="next"'.format(
+                base, urlencode(dict(query, page=page + 1))))
+        if not self.bookmarks:
+            links.append('<{}?{}>; rel="last"'.format(
+                base, urlencode(dict(query, page=last))))
+        return SimpleResponse(200, url, headers={'Link': ','.join(links)},
+                              content=json.dumps(body).encode('utf-8'))
+
+
+def record_id(record):
+    return record['id']
+
+
+class TestShardedCrawler(TestCase):
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(4)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def _crawler(self, bookmarks=False, **kwargs):
+        self.transport = FakeTransport(bookmarks)
+        return ShardedCrawler(API_URL, 'token', executor=self.executor,
+                              requests_lib=self.transport,
+                              per_page=10, **kwargs)
+
+    def test_pages_in_order(self):
+        pages = list(self._crawler().get_account_courses('1'))
+
+        self.assertEqual(len(pages), 10)
+        self.assertEqual([r['id'] for page in pages for r in page],
+                         list(range(95)))
+        self.assertEqual(pages[0][0]['path'], '/api/v1/accounts/1/courses')
+
+    def test_client_signature_and_progress(self):
+        progress = []
+        pages = self._crawler().get_account_courses(
+            '1', {'per_page': 50}, None, progress.append)
+
+        self.assertEqual(len(next(pages)), 50)
+        self.assertEqual((pages.page, pages.total_pages), (1, 2))
+        self.assertEqual(len(next(pages)), 45)
+        self.assertEqual(pages.items_seen, 95)
+        self.assertEqual(pages.total_items, 95)
+        self.assertEqual([p.page for p in progress], [1, 2])
+
+    def test_deadline_reaches_workers(self):
+        deadline = Deadline(60)
+        list(self._crawler().get_account_courses('1', deadline=deadline))
+
+        self.assertEqual(len(self.transport.timeouts), 10)
+        for timeout in self.transport.timeouts:
+            self.assertIsNotNone(timeout)
+            self.assertLessEqual(timeout, 60)
+
+    def test_flattened_with_transform(self):
+        crawler = self._crawler(transform=record_id)
+        users = crawler.get_course_users('ABC', is_sis_course_id=True,
+                                         flatten_response=True,
+                                         params={'per_page': 50})
+
+        self.assertEqual(list(users), list(range(95)))
+
+    def test_bookmark_pagination(self):
+        pages = list(self._crawler(bookmarks=True).get_account_courses('1'))
+
+        self.assertEqual([r['id'] for page in pages for r in page],
+                         list(range(95)))
+
+    def test_courses_users(self):
+        crawler = self._crawler(transform=record_id, max_pending=2)
+        results = list(crawler.get_courses_users(['1', '2', '3']))
+
+        self.assertEqual([course_id for course_id, _ in results],
+                         ['1', '2', '3'])
+        self.assertEqual(results[2][1], list(range(95)))
+
+    def test_time_budget(self):
+        now = [0.0]
+        budget = TimeBudget(1, clock=lambda: now[0])
+        pages = self._crawler().get_account_courses('1', deadline=budget)
+
+        first = next(pages)
+        now[0] = 2.0
+
+        self.assertEqual(len(first), 10)
+        self.assertEqual(list(pages), [])
+        self.assertTrue(budget.exhausted)
+
+    def test_process_pool(self):
+        with ShardedCrawler(API_URL, 'token', processes=2,
+                            transform=record_id,
+                            requests_lib=FakeTransport(),
+                            per_page=10) as crawler:
+            items = list(crawler.get_course_users(
+                '1', flatten_response=True))
+
+        self.assertEqual(items, list(range(95)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+
+from canvas_api_client.deadline import TimeBudget
+from canvas_api_client.pages import PagePublisher
+
+from unittest import TestCase, main
+from unittest.mock import MagicMock
+
+COURSES = ['1', '2', '3']
+
+
+class TestPagePublisher(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, 'page_hashes.json')
+        self.client = MagicMock()
+        self.publisher = PagePublisher(self.client, self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _written(self):
+        return sorted(c[0][0] for c in self.client.put_page.call_args_list)
+
+    def test_skips_unchanged_pages(self):
+        report = self.publisher.put_pages(COURSES, 'syllabus', '<p>v1</p>',
+                                          title='Syllabus')
+        self.assertEqual(sorted(report.written), COURSES)
+        self.client.put_page.assert_any_call(
+            '1', is_sis_course_id=False, url='syllabus', body='<p>v1</p>',
+            title='Syllabus', published=True, front_page=False,
+            notify_of_update=False)
+
+        self.client.reset_mock()
+        publisher = PagePublisher(self.client, self.path)
+        publisher.forget('3', 'syllabus')
+        report = publisher.put_pages(COURSES, 'syllabus', '<p>v1</p>',
+                                     title='Syllabus')
+        self.assertEqual(sorted(report.skipped), ['1', '2'])
+        self.assertEqual(self._written(), ['3'])
+
+        self.client.reset_mock()
+        report = publisher.put_pages(COURSES, 'syllabus', '<p>v1</p>',
+                                     title='Syllabus', published=False)
+        self.assertEqual(self._written(), COURSES)
+
+    def test_verify(self):
+        def get_page(course_id, url, **kwargs):
+            if course_id == '3':
+                raise RuntimeError('404 Not Found')
+            return MagicMock(**{'json.return_value': {
+                'body': '<p>v1</p>' if course_id == '1' else '<p>old</p>',
+                'title': 'Syllabus', 'published': True,
+                'front_page': False}})
+
+        self.client.get_page.side_effect = get_page
+        report = self.publisher.put_pages(COURSES, 'syllabus', '<p>v1</p>',
+                                          title='Syllabus', verify=True)
+
+        self.assertEqual(report.skipped, ['1'])
+        self.assertEqual(self._written(), ['2', '3'])
+
+    def test_failures_and_budget(self):
+        self.client.put_page.side_effect = RuntimeError('500')
+        report = self.publisher.put_pages(['1'], 'syllabus', 'body')
+        self.assertEqual(report.failed, [('1', "RuntimeError('500')")])
+
+        report = self.publisher.put_pages(['1', '2'], 'syllabus', 'body',
+                                          deadline=TimeBudget(0))
+        self.assertEqual(sorted(report.unsent), ['1', '2'])
+
+        publisher = PagePublisher(self.client)
+        with self.assertRaises(ValueError):
+            publisher.save()
+
+
+if __name__ == '__main__':
+    main()
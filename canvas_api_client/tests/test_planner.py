@@ -0,0 +1,138 @@
+from canvas_api_client.deadline import TimeBudget
+from canvas_api_client.planner import CourseFetchPlanner
+
+from unittest import TestCase, main
+from unittest.mock import MagicMock
+
+
+class FakeListing(object):
+    """
+    Pages of courses, with the total known after the first page.
+    """
+
+    def __init__(self, pages, counted=True):
+        self.pages = iter(pages)
+        self.fetched = 0
+        self.items_seen = 0
+        self.total_items = None
+        self.total = sum(len(page) for page in pages) if counted else None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        page = next(self.pages)
+        self.fetched += 1
+        self.items_seen += len(page)
+        self.total_items = self.total
+        return page
+
+
+def _courses(start, stop):
+    return [{'id': i, 'sis_course_id': 'SIS{}'.format(i)}
+            for i in range(start, stop)]
+
+
+class TestCourseFetchPlanner(TestCase):
+
+    def setUp(self):
+        self.client = MagicMock()
+        self.client.get_course_info.side_effect = \
+            lambda course_id, **kwargs: MagicMock(**{
+                'json.return_value': {'id': int(course_id)}})
+        self.listing = FakeListing(
+            [_courses(i, i + 10) for i in range(0, 100, 10)])
+        self.client.get_account_courses.return_value = self.listing
+        self.planner = CourseFetchPlanner(
+            self.client, max_workers=2, per_page=10, get_latency=0.3,
+            page_latency=1.0, smoothing=0)
+
+    def test_estimate(self):
+        self.assertEqual(self.planner.estimate('1', 5).strategy,
+                         'individual')
+        self.assertEqual(self.planner.estimate('1', 50).strategy, 'listing')
+
+        self.planner.set_account_size('1', 1000)
+        estimate = self.planner.estimate('1', 50)
+        self.assertEqual(estimate.strategy, 'individual')
+        self.assertEqual(estimate.listing_requests, 100)
+        self.assertEqual(estimate.individual_seconds, 7.5)
+        self.assertEqual(self.planner.estimate('1', 800).strategy, 'listing')
+        self.assertIsNone(
+            self.planner.account_size('1', {'enrollment_term_id': 5}))
+
+    def test_listing(self):
+        self.planner.set_account_size('1', 100, {'enrollment_term_id': 5})
+        self.planner.get_latency = 1.0
+        report = self.planner.fetch_courses(
+            '1', ['SIS{}'.format(i) for i in range(25)] + ['SIS999'],
+            is_sis_course_id=True, filters={'enrollment_term_id': 5},
+            params={'include[]': ['term']})
+
+        self.assertEqual(report.strategy, 'listing')
+        self.assertEqual(self.listing.fetched, 10)
+        self.assertEqual(report.requests, 11)
+        self.assertEqual(report.courses['SIS3'],
+                         {'id': 3, 'sis_course_id': 'SIS3'})
+        self.client.get_account_courses.assert_called_once_with(
+            '1', params={'include[]': ['term'], 'enrollment_term_id': 5},
+            deadline=None)
+        self.client.get_course_info.assert_called_once_with(
+            'SIS999', is_sis_course_id=True, params={'include[]': ['term']})
+        self.assertEqual(
+            self.planner.account_size('1', {'enrollment_term_id': 5}), 100)
+
+        self.planner.set_account_size('1', 20, {'enrollment_term_id': 5})
+        self.listing = FakeListing([_courses(0, 10), _courses(10, 20)])
+        self.client.get_account_courses.return_value = self.listing
+        report = self.planner.fetch_courses(
+            '1', [str(i) for i in range(5)],
+            filters={'enrollment_term_id': 5})
+        self.assertEqual(self.listing.fetched, 1)
+        self.assertEqual(len(report.courses), 5)
+
+    def test_unknown_size_falls_back_to_single_calls(self):
+        self.planner.page_latency = 0.5
+        report = self.planner.fetch_courses(
+            '1', [str(i) for i in range(0, 100, 20)])
+
+        self.assertEqual(report.strategy, 'listing')
+        self.assertEqual(self.listing.fetched, 1)
+        self.assertEqual(self.client.get_course_info.call_count, 4)
+        self.assertEqual(sorted(report.courses), ['0', '20', '40', '60', '80'])
+        self.assertEqual(self.planner.account_size('1'), 100)
+
+    def test_uncounted_listing_falls_back_to_single_calls(self):
+        self.listing = FakeListing(
+            [_courses(i, i + 10) for i in range(0, 100, 10)], counted=False)
+        self.client.get_account_courses.return_value = self.listing
+        report = self.planner.fetch_courses(
+            '1', [str(i) for i in range(5, 100, 10)])
+
+        self.assertEqual(report.strategy, 'listing')
+        self.assertEqual(self.listing.fetched, 2)
+        self.assertEqual(self.client.get_course_info.call_count, 8)
+        self.assertEqual(len(report.courses), 10)
+        self.assertIsNone(self.planner.account_size('1'))
+
+    def test_failures_budget_and_latencies(self):
+        self.client.get_course_info.side_effect = RuntimeError('404')
+        report = self.planner.fetch_courses('1', ['7', '7'])
+        self.assertEqual(report.strategy, 'individual')
+        self.assertEqual(report.failed, [('7', "RuntimeError('404')")])
+
+        report = self.planner.fetch_courses('1', ['1', '2', '3'],
+                                            deadline=TimeBudget(0))
+        self.assertEqual(sorted(report.unsent), ['1', '2', '3'])
+        self.assertEqual(report.requests, 0)
+
+        times = iter([0.0, 0.0, 0.5, 1.0])
+        planner = CourseFetchPlanner(self.client, get_latency=0.3,
+                                     smoothing=0.5, clock=lambda: next(times))
+        self.client.get_course_info.side_effect = None
+        planner.fetch_courses('1', ['1'])
+        self.assertAlmostEqual(planner.get_latency, 0.4)
+
+
+if __name__ == '__main__':
+    main()
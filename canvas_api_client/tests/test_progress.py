@@ -0,0 +1,110 @@
+from canvas_api_client.progress import PageProgress, last_page_number
+from canvas_api_client.v1_client import CanvasAPIv1
+from tests.helpers import FakeClock
+
+from unittest import TestCase, main
+from unittest.mock import MagicMock
+
+URL = 'https://foo.cc.columbia.edu/api/v1/accounts/1/courses'
+
+
+def get_page(page, items, last_page=None):
+    links = {}
+    if last_page is None or page < last_page:
+        links['next'] = {'url': '{}?page={}&per_page=10'.format(URL, page + 1)}
+    if last_page is not None:
+        links['last'] = {'url': '{}?page={}&per_page=10'.format(
+            URL, last_page)}
+    response = MagicMock(headers={'link': '...'}, links=links)
+    response.json.return_value = list(range(items))
+    return response
+
+
+class TestPageProgress(TestCase):
+
+    def test_last_page_number(self):
+        self.assertEqual(last_page_number(get_page(1, 10, last_page=7)), 7)
+        self.assertIsNone(last_page_number(get_page(1, 10)))
+
+        bookmark = MagicMock(links={'last': {'url': URL + '?page=bookmark:X'}})
+        self.assertIsNone(last_page_number(bookmark))
+
+    def test_estimates(self):
+        clock = FakeClock()
+        progress = PageProgress(URL, clock=clock)
+        self.assertIsNone(progress.eta)
+
+        clock.now = 2.0
+        progress.record(get_page(1, 10, last_page=5), 10, 2.0)
+        clock.now = 3.0
+        progress.record(get_page(2, 10, last_page=5), 10, 1.0)
+
+        snapshot = progress.progress()
+        self.assertEqual(snapshot.page, 2)
+        self.assertEqual(snapshot.total_pages, 5)
+        self.assertEqual(snapshot.items_seen, 20)
+        self.assertEqual(snapshot.total_items, 50)
+        self.assertEqual(snapshot.elapsed, 3.0)
+        self.assertEqual(snapshot.eta, 4.5)
+
+    def test_unknown_total(self):
+        progress = PageProgress(URL)
+        progress.record(get_page(1, 10), 10, 1.0)
+
+        self.assertIsNone(progress.total_pages)
+        self.assertIsNone(progress.total_items)
+        self.assertIsNone(progress.eta)
+
+        progress.record(get_page(2, 3, last_page=2), 3, 1.0)
+        self.assertEqual(progress.total_pages, 2)
+        self.assertEqual(progress.total_items, 13)
+        self.assertEqual(progress.eta, 0)
+
+
+class TestCanvasAPIv1Progress(TestCase):
+
+    def setUp(self):
+        self._mock_requests = MagicMock()
+        self._mock_requests.get.side_effect = [
+            get_page(1, 10, last_page=3), get_page(2, 10, last_page=3),
+            get_page(3, 4, last_page=3)]
+        self.test_client = CanvasAPIv1('https://foo.cc.columbia.edu/api/v1/',
+                                       'foo_token',
+                                       requests_lib=self._mock_requests)
+
+    def test_paginated_progress(self):
+        callback = MagicMock()
+        courses = self.test_client.get_account_courses(
+            '1', progress_callback=callback)
+        self.assertEqual(courses.page, 0)
+        self.assertIsNone(courses.total_pages)
+
+        next(courses)
+        self.assertEqual(courses.page, 1)
+        self.assertEqual(courses.total_pages, 3)
+        self.assertEqual(courses.items_seen, 10)
+        self.assertEqual(courses.total_items, 30)
+
+        self.assertEqual(len(list(courses)), 2)
+        self.assertEqual(courses.items_seen, 24)
+        self.assertEqual(courses.total_items, 24)
+        self.assertEqual(courses.eta, 0)
+
+        pages = [c[0][0].page for c in callback.call_args_list]
+        self.assertEqual(pages, [1, 2, 3])
+
+    def test_flattened_progress(self):
+        users = self.test_client.get_course_users('1', flatten_response=True)
+
+        next(users)
+        self.assertEqual(users.page, 1)
+        self.assertEqual(users.items_seen, 10)
+        self.assertEqual(len(list(users)), 23)
+        self.assertEqual(users.progress().total_items, 24)
+
+        with self.assertRaises(StopIteration):
+            next(users)
+
+
+if __name__ == '__main__':
+    main()
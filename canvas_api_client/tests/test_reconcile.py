@@ -0,0 +1,120 @@
+from canvas_api_client.deadline import TimeBudget
+from canvas_api_client.reconcile import EnrollmentReconciler
+from canvas_api_client.v1_client import CanvasAPIv1
+
+from unittest import TestCase, main
+from unittest.mock import MagicMock
+
+
+def user(sis_user_id, *enrollments):
+    return {'id': int(sis_user_id[3:]), 'sis_user_id': sis_user_id,
+            'enrollments': [{'id': enrollment_id, 'type': enrollment_type}
+                            for enrollment_id, enrollment_type in enrollments]}
+
+
+USERS = {
+    'A': [user('UNI1', (11, 'StudentEnrollment')),
+          user('UNI2', (12, 'StudentEnrollment'), (13, 'TaEnrollment')),
+          user('UNI3', (14, 'TeacherEnrollment')),
+          {'id': 4, 'sis_user_id': None, 'enrollments': []}],
+    'B': [user('UNI1', (21, 'StudentEnrollment'))],
+}
+
+
+class TestEnrollmentReconciler(TestCase):
+
+    def setUp(self):
+        self.client = MagicMock()
+        self.client.get_course_users.side_effect = \
+            lambda course_id, **kwargs: iter(USERS[course_id])
+        self.reconciler = EnrollmentReconciler(self.client)
+
+    def test_diff(self):
+        diff = self.reconciler.diff(
+            'A', ['UNI1', 'UNI5', ('UNI3', 'TeacherEnrollment')])
+
+        self.assertEqual(diff.to_add, [('UNI5', 'StudentEnrollment')])
+        self.assertEqual([e['id'] for e in diff.to_remove], [12, 13])
+        self.assertEqual(diff.unchanged, 2)
+        self.assertEqual(
+            self.client.get_course_users.call_args[1]['params'],
+            {'include[]': 'enrollments'})
+
+    def test_integer_user_ids(self):
+        reconciler = EnrollmentReconciler(self.client, user_key='id')
+        diff = reconciler.diff('A', [1, 2, (5, 'TaEnrollment')])
+
+        self.assertEqual(diff.to_add, [('5', 'TaEnrollment')])
+        self.assertEqual([e['id'] for e in diff.to_remove], [13, 14])
+
+    def test_managed_types(self):
+        reconciler = EnrollmentReconciler(
+            self.client, managed_types=['StudentEnrollment'])
+        diff = reconciler.diff('A', ['UNI1'])
+
+        self.assertEqual([e['id'] for e in diff.to_remove], [12])
+
+    def test_dry_run(self):
+        reports = self.reconciler.reconcile({'A': ['UNI1'], 'B': []},
+                                            dry_run=True)
+
+        self.assertEqual([r.course_id for r in reports], ['A', 'B'])
+        self.assertEqual([len(r.diff.to_remove) for r in reports], [3, 1])
+        self.assertEqual(reports[0].removed, 0)
+        self.assertFalse(self.client.delete_enrollment.called)
+
+    def test_reconcile(self):
+        def delete_enrollment(course_id, enrollment_id, **kwargs):
+            if enrollment_id == 14:
+                raise RuntimeError('403 Forbidden')
+
+        self.client.delete_enrollment.side_effect = delete_enrollment
+
+        reports = self.reconciler.reconcile(
+            {'A': ['UNI1', 'UNI6'], 'B': ['UNI1']}, is_sis_course_id=True)
+
+        a, b = reports
+        self.assertEqual((a.added, a.removed, a.skipped), (1, 2, 0))
+        self.assertEqual(len(a.errors), 1)
+        self.assertIn('403 Forbidden', a.errors[0])
+        self.assertEqual((b.added, b.removed, b.errors), (0, 0, []))
+        self.assertGreaterEqual(a.fetch_seconds, 0.0)
+        self.client.add_enrollment.assert_called_once_with(
+            'A', 'sis_user_id:UNI6', 'StudentEnrollment',
+            is_sis_course_id=True)
+        self.assertEqual(
+            self.client.delete_enrollment.call_args[1]['params'],
+            {'task': 'conclude'})
+
+    def test_time_budget(self):
+        budget = TimeBudget(0)
+        reports = self.reconciler.reconcile({'A': ['UNI1']}, deadline=budget)
+
+        self.assertEqual(reports, [])
+        self.assertTrue(budget.exhausted)
+
+    def test_time_budget_runs_out_between_courses(self):
+        now = [0.0]
+
+        def get(url, **kwargs):
+            now[0] += 20
+            course_id = url.split('/')[-2]
+            return MagicMock(headers={'link': '...'}, links={},
+                             **{'json.return_value': USERS[course_id]})
+
+        requests = MagicMock(**{'get.side_effect': get})
+        client = CanvasAPIv1('https://foo.cc.columbia.edu/api/v1/', 'foo',
+                             requests_lib=requests)
+        reconciler = EnrollmentReconciler(client, max_workers=1)
+        budget = TimeBudget(10, clock=lambda: now[0])
+
+        reports = reconciler.reconcile({'A': ['UNI1'], 'B': ['UNI1']},
+                                       dry_run=True, deadline=budget)
+
+        self.assertEqual([r.course_id for r in reports], ['A'])
+        self.assertEqual(reports[0].errors, [])
+        self.assertEqual(requests.get.call_count, 1)
+
+
+if __name__ == '__main__':
+    main()
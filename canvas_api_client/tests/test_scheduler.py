@@ -0,0 +1,174 @@
+import threading
+import time
+
+from canvas_api_client.deadline import Deadline, TimeBudget
+from canvas_api_client.errors import DeadlineExceeded
+from canvas_api_client.scheduler import RequestScheduler
+from canvas_api_client.v1_client import CanvasAPIv1
+
+from unittest import TestCase, main
+from unittest.mock import MagicMock
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('Timed out waiting for condition')
+        time.sleep(0.001)
+
+
+def waiting(scheduler):
+    return sum(s.waiting for s in scheduler.stats())
+
+
+class TestRequestScheduler(TestCase):
+
+    def setUp(self):
+        self.scheduler = RequestScheduler(max_concurrency=1)
+        self.order = []
+        self.threads = []
+
+    def _start(self, priority, name):
+        def run():
+            with self.scheduler.slot(priority):
+                self.order.append(name)
+
+        expected = waiting(self.scheduler) + 1
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.threads.append(thread)
+        wait_until(lambda: waiting(self.scheduler) == expected)
+
+    def _join(self):
+        for thread in self.threads:
+            thread.join(5)
+
+    def test_interactive_preempts_queued_background(self):
+        self.scheduler.acquire('background')
+        for i in range(3):
+            self._start('background', 'background {}'.format(i))
+        self._start('interactive', 'interactive')
+
+        self.scheduler.release()
+        self._join()
+
+        self.assertEqual(self.order[0], 'interactive')
+        self.assertEqual(self.order[1:],
+                         ['background 0', 'background 1', 'background 2'])
+
+    def test_weighted_share(self):
+        self.scheduler = RequestScheduler(
+            max_concurrency=1,
+            weights={'interactive': 4, 'background': 1},
+            default_priority='background')
+        self.scheduler.acquire('background')
+        for i in range(3):
+            self._start('background', 'background')
+        for i in range(12):
+            self._start('interactive', 'interactive')
+
+        self.scheduler.release()
+        self._join()
+
+        # With weights 4:1, background gets one turn in every five while
+        # interactive requests are waiting.
+        self.assertEqual(self.order[:5], ['interactive'] * 4 + ['background'])
+        self.assertEqual(self.order[5:10],
+                         ['interactive'] * 4 + ['background'])
+
+    def test_concurrency_limit(self):
+        scheduler = RequestScheduler(max_concurrency=2)
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def run():
+            with scheduler.slot():
+                with lock:
+                    active.append(1)
+                    peak.append(len(active))
+                time.sleep(0.005)
+                with lock:
+                    active.pop()
+
+        threads = [threading.Thread(target=run) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(scheduler.stats()[1].requests, 8)
+
+    def test_rate_limit(self):
+        scheduler = RequestScheduler(max_concurrency=10, max_rate=200)
+        start = time.monotonic()
+        for i in range(5):
+            with scheduler.slot():
+                pass
+
+        self.assertGreaterEqual(time.monotonic() - start, 4 / 200.0)
+
+    def test_queueing_delay_stats(self):
+        self.scheduler.acquire('background')
+        self._start('interactive', 'interactive')
+        time.sleep(0.02)
+        self.scheduler.release()
+        self._join()
+
+        stats = {s.priority: s for s in self.scheduler.stats()}
+        self.assertEqual(stats['interactive'].requests, 1)
+        self.assertGreaterEqual(stats['interactive'].max_wait, 0.02)
+        self.assertEqual(stats['background'].requests, 1)
+        self.assertEqual(stats['normal'].requests, 0)
+
+    def test_deadline_while_queued(self):
+        self.scheduler.acquire('background')
+        with self.assertRaises(DeadlineExceeded):
+            self.scheduler.acquire('interactive', Deadline(0.01))
+        with self.assertRaises(DeadlineExceeded):
+            self.scheduler.acquire('interactive', TimeBudget(0.01))
+        self.assertEqual(waiting(self.scheduler), 0)
+
+        self._start('normal', 'normal')
+        self.scheduler.release()
+        self._join()
+
+        self.assertEqual(self.order, ['normal'])
+        self.assertEqual(self.scheduler.stats()[0].requests, 0)
+
+    def test_thread_priority(self):
+        with self.scheduler.priority('interactive'):
+            self.assertEqual(self.scheduler.current_priority(), 'interactive')
+            with self.scheduler.slot():
+                pass
+        self.assertEqual(self.scheduler.current_priority(), 'normal')
+        self.assertEqual(self.scheduler.stats()[0].requests, 1)
+
+    def test_unknown_priority(self):
+        with self.assertRaises(ValueError):
+            with self.scheduler.priority('urgent'):
+                pass
+
+
+class TestCanvasAPIv1Scheduler(TestCase):
+
+    def test_requests_go_through_scheduler(self):
+        scheduler = RequestScheduler()
+        client = CanvasAPIv1('https://foo.cc.columbia.edu/api/v1/',
+                             'foo_token',
+                             requests_lib=MagicMock(),
+                             scheduler=scheduler)
+
+        with scheduler.priority('interactive'):
+            client.get_course_info('1')
+        client.update_course('1')
+
+        stats = {s.priority: s.requests for s in scheduler.stats()}
+        self.assertEqual(stats, {'interactive': 1, 'normal': 1,
+                                 'background': 0})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+import itertools
+import threading
+
+from canvas_api_client.deadline import Deadline
+from canvas_api_client.errors import DeadlineExceeded
+from canvas_api_client.singleflight import SingleFlight
+from canvas_api_client.v1_client import CanvasAPIv1
+
+from unittest import TestCase, main
+from unittest.mock import MagicMock
+
+N_THREADS = 8
+
+
+def run_in_threads(target, n=N_THREADS):
+    results = [None] * n
+    errors = [None] * n
+
+    def run(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results, errors
+
+
+class BlockingCall(object):
+    """
+    A callable that blocks until released, counting how often it ran.
+    """
+
+    def __init__(self, result=None, error=None):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self._result = result
+        self._error = error
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+def wait_for_waiters(single_flight, n):
+    while single_flight.stats().calls < n:
+        threading.Event().wait(0.001)
+
+
+class TestSingleFlight(TestCase):
+
+    def test_collapses_concurrent_calls(self):
+        single_flight = SingleFlight()
+        fn = BlockingCall(result='response')
+
+        threads, results, errors = run_in_threads(
+            lambda: single_flight.do('key', fn))
+        wait_for_waiters(single_flight, N_THREADS)
+        fn.release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(fn.calls, 1)
+        self.assertEqual(results, ['response'] * N_THREADS)
+        stats = single_flight.stats()
+        self.assertEqual(stats.calls, N_THREADS)
+        self.assertEqual(stats.executed, 1)
+        self.assertEqual(stats.collapsed, N_THREADS - 1)
+
+    def test_shares_exception(self):
+        single_flight = SingleFlight()
+        fn = BlockingCall(error=ValueError('boom'))
+
+        threads, results, errors = run_in_threads(
+            lambda: single_flight.do('key', fn))
+        wait_for_waiters(single_flight, N_THREADS)
+        fn.release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(fn.calls, 1)
+        self.assertTrue(all(isinstance(e, ValueError) for e in errors))
+
+    def test_does_not_cache_finished_calls(self):
+        single_flight = SingleFlight()
+        fn = MagicMock(side_effect=['first', 'second'])
+
+        self.assertEqual(single_flight.do('key', fn), 'first')
+        self.assertEqual(single_flight.do('key', fn), 'second')
+        self.assertEqual(single_flight.stats().collapsed, 0)
+
+    def test_different_keys_run_separately(self):
+        single_flight = SingleFlight()
+        fn = MagicMock(return_value='response')
+
+        single_flight.do('a', fn)
+        single_flight.do('b', fn)
+
+        self.assertEqual(fn.call_count, 2)
+
+
+class TestCanvasAPIv1Coalescing(TestCase):
+
+    def setUp(self):
+        self._mock_requests = MagicMock()
+        self.blocking_get = BlockingCall(result=MagicMock())
+        self._mock_requests.get.side_effect = self.blocking_get
+        self.test_client = CanvasAPIv1('https://foo.cc.columbia.edu/api/v1/',
+                                       'foo_token',
+                                       requests_lib=self._mock_requests,
+                                       coalesce_gets=True)
+
+    def test_coalesce_get_course_info(self):
+        threads, results, errors = run_in_threads(
+            lambda: self.test_client.get_course_info('57000'))
+        wait_for_waiters(self.test_client._single_flight, N_THREADS)
+        self.blocking_get.release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(self._mock_requests.get.call_count, 1)
+        self.assertEqual(len(set(map(id, results))), 1)
+        self.assertEqual(
+            self.test_client.coalescing_stats().collapsed, N_THREADS - 1)
+
+    def test_coalesce_with_deadlines(self):
+        seconds = itertools.count(60)
+        threads, results, errors = run_in_threads(
+            lambda: self.test_client._get(
+                'https://foo.cc.columbia.edu/api/v1/courses/57000',
+                deadline=Deadline(next(seconds))))
+        wait_for_waiters(self.test_client._single_flight, N_THREADS)
+        self.blocking_get.release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(self._mock_requests.get.call_count, 1)
+
+    def test_follower_deadline(self):
+        url = 'https://foo.cc.columbia.edu/api/v1/courses/57000'
+        threads, results, errors = run_in_threads(
+            lambda: self.test_client._get(url, deadline=Deadline(60)), n=1)
+        self.blocking_get.started.wait(5)
+
+        with self.assertRaises(DeadlineExceeded):
+            self.test_client._get(url, deadline=Deadline(0.01))
+        self.blocking_get.release.set()
+        threads[0].join()
+
+        self.assertEqual(errors, [None])
+        self.assertEqual(self._mock_requests.get.call_count, 1)
+        self.assertEqual(self.test_client.coalescing_stats().collapsed, 1)
+
+    def test_different_params_not_coalesced(self):
+        self.blocking_get.release.set()
+
+        self.test_client.get_course_info('57000')
+        self.test_client.get_course_info(
+            '57000', params={'include[]': ['term']})
+
+        self.assertEqual(self._mock_requests.get.call_count, 2)
+
+    def test_coalescing_disabled_by_default(self):
+        client = CanvasAPIv1('https://foo.cc.columbia.edu/api/v1/',
+                             'foo_token',
+                             requests_lib=self._mock_requests)
+
+        self.assertIsNone(client.coalescing_stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+
+from canvas_api_client.sis_index import SisIdIndex
+from canvas_api_client.v1_client import CanvasAPIv1
+
+from unittest import TestCase, main
+from unittest.mock import MagicMock
+
+API_URL = 'https://foo.cc.columbia.edu/api/v1/'
+
+COURSES = [
+    {'id': 42, 'sis_course_id': 'ABC',
+     'account': {'id': 7, 'sis_account_id': 'ENGINEERING'}},
+    {'id': 43, 'sis_course_id': 'DEF', 'account_id': 7},
+    {'id': 44, 'sis_course_id': None},
+]
+
+
+class TestSisIdIndex(TestCase):
+
+    def setUp(self):
+        self.index = SisIdIndex()
+        self.index.add_courses(COURSES)
+
+    def test_lookups(self):
+        self.assertEqual(self.index.canvas_course_id('ABC'), 42)
+        self.assertEqual(self.index.sis_course_id(43), 'DEF')
+        self.assertEqual(self.index.canvas_account_id('ENGINEERING'), 7)
+        self.assertEqual(self.index.sis_account_id('7'), 'ENGINEERING')
+        self.assertIsNone(self.index.canvas_course_id('XYZ'))
+        self.assertIsNone(self.index.sis_course_id(44))
+
+        stats = self.index.stats()
+        self.assertEqual((stats.courses, stats.accounts), (2, 1))
+        self.assertEqual((stats.hits, stats.misses), (4, 2))
+
+    def test_remapped_ids(self):
+        self.index.add_course({'id': 50, 'sis_course_id': 'ABC'})
+        self.index.add_course({'id': 43, 'sis_course_id': 'GHI'})
+
+        self.assertEqual(self.index.canvas_course_id('ABC'), 50)
+        self.assertIsNone(self.index.sis_course_id(42))
+        self.assertIsNone(self.index.canvas_course_id('DEF'))
+        self.assertEqual(self.index.sis_course_id(43), 'GHI')
+
+    def test_save_and_load(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tempdir, 'sis_ids.json')
+            self.index.save(path)
+
+            index = SisIdIndex(path)
+            self.assertEqual(index.canvas_course_id('DEF'), 43)
+            self.assertEqual(index.sis_account_id(7), 'ENGINEERING')
+        finally:
+            shutil.rmtree(tempdir)
+
+        with self.assertRaises(ValueError):
+            self.index.save()
+
+
+class TestCanvasAPIv1SisIndex(TestCase):
+
+    def setUp(self):
+        self._mock_requests = MagicMock()
+        self.index = SisIdIndex()
+        self.test_client = CanvasAPIv1(API_URL, 'foo_token',
+                                       requests_lib=self._mock_requests,
+                                       sis_index=self.index)
+
+    def _url(self):
+        return self._mock_requests.get.call_args[0][0]
+
+    def test_populated_from_account_courses(self):
+        page = MagicMock(headers={'link': '...'}, links={})
+        page.json.return_value = COURSES
+        self._mock_requests.get.return_value = page
+
+        list(self.test_client.get_account_courses('1'))
+        self.test_client.get_course_info('ABC', is_sis_course_id=True)
+
+        self.assertEqual(self._url(), API_URL + 'courses/42')
+
+    def test_sis_ids(self):
+        self.index.add_courses(COURSES)
+
+        self.test_client.get_course_info('XYZ', is_sis_course_id=True)
+        self.assertEqual(self._url(), API_URL + 'courses/sis_course_id:XYZ')
+
+        self.test_client.get_account_roles('ENGINEERING',
+                                           is_sis_account_id=True)
+        self.assertEqual(self._url(), API_URL + 'accounts/7/roles')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+
+from canvas_api_client.snapshot import (
+    SnapshotReader, SnapshotWriter, index_path, write_snapshot)
+
+from unittest import TestCase, main
+
+
+def enrollment(user_id, course_id):
+    return {'id': user_id * 1000 + course_id,
+            'user_id': user_id,
+            'course_id': course_id,
+            'user': {'sis_user_id': 'UNI{}'.format(user_id)}}
+
+
+class TestSnapshot(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, 'enrollments.ndjson')
+        self.records = [enrollment(u, c) for c in (1, 2) for u in range(50)]
+        count = write_snapshot(self.path, self.records,
+                               ['id', 'user_id', 'user.sis_user_id'])
+        self.assertEqual(count, 100)
+        self.reader = SnapshotReader(self.path)
+
+    def tearDown(self):
+        self.reader.close()
+        shutil.rmtree(self.tempdir)
+
+    def test_get(self):
+        self.assertEqual(self.reader.get(7002), enrollment(7, 2))
+        self.assertEqual(self.reader.get('7002'), enrollment(7, 2))
+        self.assertIsNone(self.reader.get(99999))
+
+    def test_find(self):
+        self.assertEqual(self.reader.find(7, field='user_id'),
+                         [enrollment(7, 1), enrollment(7, 2)])
+        self.assertEqual(
+            self.reader.find('UNI49', field='user.sis_user_id'),
+            [enrollment(49, 1), enrollment(49, 2)])
+        self.assertEqual(self.reader.find(50, field='user_id'), [])
+
+    def test_missing_index(self):
+        with self.assertRaises(KeyError):
+            self.reader.get(1, field='course_id')
+
+    def test_iter(self):
+        self.assertEqual(list(self.reader), self.records)
+
+    def test_index_size(self):
+        # 100 records fill a 256-slot table of 16-byte slots, plus header.
+        self.assertEqual(os.path.getsize(index_path(self.path, 'id')),
+                         20 + 256 * 16)
+
+    def test_pages_and_empty_snapshot(self):
+        path = os.path.join(self.tempdir, 'courses.ndjson')
+        with SnapshotWriter(path) as writer:
+            writer.write_all([[{'id': 1}, {'id': 2}], [{'id': 3}]])
+        with SnapshotReader(path) as reader:
+            self.assertEqual(reader.get(3), {'id': 3})
+
+        write_snapshot(path, [])
+        with SnapshotReader(path) as reader:
+            self.assertIsNone(reader.get(3))
+            self.assertEqual(list(reader), [])
+
+    def test_failed_rewrite_keeps_snapshot(self):
+        def records():
+            yield enrollment(1, 3)
+            raise RuntimeError('crawl failed')
+
+        with self.assertRaises(RuntimeError):
+            write_snapshot(self.path, records(), ['id', 'user_id'])
+        writer = SnapshotWriter(self.path)
+        writer.write({'id': 1})
+
+        with SnapshotReader(self.path) as reader:
+            self.assertEqual(reader.find(7, field='user_id'),
+                             [enrollment(7, 1), enrollment(7, 2)])
+            self.assertEqual(len(list(reader)), 100)
+        writer.close()
+        with SnapshotReader(self.path) as reader:
+            self.assertEqual(list(reader), [{'id': 1}])
+            self.assertEqual(reader.get(1), {'id': 1})
+        self.assertFalse([name for name in os.listdir(self.tempdir)
+                          if name.endswith('.tmp')])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+import json
+import os
+import shutil
+import tempfile
+
+from canvas_api_client.deadline import TimeBudget
+from canvas_api_client.sync import ADDED, CHANGED, REMOVED, AccountCourseSync
+
+from unittest import TestCase, main
+
+
+def course(course_id, name=None):
+    return {'id': course_id,
+            'name': name or 'Course {}'.format(course_id),
+            'created_at': '2018-01-{:02d}T00:00:00Z'.format(course_id)}
+
+
+class FakeCanvas(object):
+    """
+    Serves an account's courses in pages of `per_page`, sorted newest first
+    when asked to (and `honor_sort` is set), and counts the pages fetched.
+    """
+
+    def __init__(self, courses, per_page=2, honor_sort=True):
+        self.courses = list(courses)
+        self.per_page = per_page
+        self.honor_sort = honor_sort
+        self.pages_fetched = 0
+        self.calls = []
+
+    def get_account_courses(self, account_id, params=None, deadline=None):
+        self.calls.append(dict(params or {}))
+        courses = list(self.courses)
+        if self.honor_sort and (params or {}).get('sort') == 'created_at':
+            courses.sort(key=lambda c: c['created_at'],
+                         reverse=params.get('order') == 'desc')
+        for i in range(0, len(courses), self.per_page):
+            if i and deadline is not None and deadline.stop():
+                return
+            self.pages_fetched += 1
+            yield courses[i:i + self.per_page]
+
+
+class TestAccountCourseSync(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.snapshot_path = os.path.join(self.tempdir, 'courses.json')
+        self.changelog_path = os.path.join(self.tempdir, 'changes.ndjson')
+        self.canvas = FakeCanvas([course(i) for i in range(1, 11)])
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _sync(self, **kwargs):
+        return AccountCourseSync(self.canvas, '1', self.snapshot_path,
+                                 changelog_path=self.changelog_path,
+                                 **kwargs)
+
+    def _kinds(self, result):
+        return [(e.kind, e.id) for e in result.events]
+
+    def test_first_sync_is_full(self):
+        result = self._sync().sync()
+
+        self.assertTrue(result.full)
+        self.assertTrue(result.complete)
+        self.assertEqual(result.pages, 5)
+        self.assertEqual(len(result.events), 10)
+        self.assertEqual(result.high_water_mark, '2018-01-10T00:00:00Z')
+        self.assertNotIn('sort', self.canvas.calls[0])
+
+    def test_incremental_sync_fetches_new_pages_only(self):
+        self._sync().sync()
+        self.canvas.courses.append(course(11))
+        self.canvas.courses.append(course(12))
+        self.canvas.pages_fetched = 0
+
+        result = self._sync().sync()
+
+        self.assertFalse(result.full)
+        self.assertEqual(self._kinds(result), [(ADDED, '12'), (ADDED, '11')])
+        self.assertEqual(self.canvas.pages_fetched, 2)
+        self.assertEqual(self.canvas.calls[-1]['sort'], 'created_at')
+        self.assertEqual(result.high_water_mark, '2018-01-12T00:00:00Z')
+
+        result = self._sync().sync()
+        self.assertEqual(result.events, [])
+
+    def test_full_sync_reports_changes_and_removals(self):
+        self._sync().sync()
+        self.canvas.courses[2] = course(3, name='Renamed')
+        del self.canvas.courses[4]
+
+        result = self._sync().sync(full=True)
+
+        self.assertEqual(self._kinds(result), [(CHANGED, '3'), (REMOVED, '5')])
+        self.assertEqual(result.events[0].previous['name'], 'Course 3')
+        self.assertIsNone(result.events[1].record)
+
+    def test_falls_back_when_sort_ignored(self):
+        self._sync().sync()
+        self.canvas.honor_sort = False
+        self.canvas.courses.append(course(11))
+        self.canvas.courses.insert(1, course(12))
+
+        result = self._sync().sync()
+
+        self.assertTrue(result.full)
+        self.assertEqual(sorted(self._kinds(result)),
+                         [(ADDED, '11'), (ADDED, '12')])
+
+    def test_partial_sync_keeps_high_water_mark(self):
+        self._sync().sync()
+        self.canvas.courses.extend(course(i) for i in range(11, 16))
+        budget = TimeBudget(0)
+
+        result = self._sync().sync(deadline=budget)
+
+        self.assertFalse(result.complete)
+        self.assertEqual(self._kinds(result), [(ADDED, '15'), (ADDED, '14')])
+        self.assertEqual(result.high_water_mark, '2018-01-10T00:00:00Z')
+
+        result = self._sync().sync()
+        self.assertEqual(self._kinds(result),
+                         [(ADDED, '13'), (ADDED, '12'), (ADDED, '11')])
+
+    def test_changelog(self):
+        self._sync().sync()
+        self.canvas.courses.append(course(11))
+        self._sync().sync()
+
+        with open(self.changelog_path) as f:
+            events = [json.loads(line) for line in f]
+        self.assertEqual(len(events), 11)
+        self.assertEqual(events[-1]['kind'], ADDED)
+        self.assertEqual(events[-1]['record']['id'], 11)
+
+
+if __name__ == '__main__':
+    main()
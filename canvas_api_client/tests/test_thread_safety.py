@@ -0,0 +1,131 @@
+import threading
+import time
+from copy import deepcopy
+
+from canvas_api_client.response import SimpleResponse
+from canvas_api_client.transport import RequestsTransport, Transport
+from canvas_api_client.v1_client import CanvasAPIv1
+
+from unittest import TestCase, main
+
+N_THREADS = 16
+N_CALLS = 200
+
+PARAMS_TEMPLATE = {
+    'include[]': ['term', 'teachers'],
+    'course[name]': 'Shared',
+}
+
+
+class RecordingTransport(Transport):
+    """
+    Records the URL and a snapshot of the params and headers of every
+    request, as they were when the request was sent.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, headers=None, params=None, **kwargs):
+        snapshot = (method, url, deepcopy(params), deepcopy(headers))
+        # Give other threads a chance to run between building and sending.
+        time.sleep(0)
+        with self._lock:
+            self.calls.append(snapshot)
+        return SimpleResponse(200, url)
+
+
+class TestSharedClient(TestCase):
+
+    def setUp(self):
+        self.transport = RecordingTransport()
+        self.client = CanvasAPIv1('https://foo.cc.columbia.edu/api/v1/',
+                                  'foo_token',
+                                  requests_lib=self.transport)
+
+    def _hammer(self, worker):
+        errors = []
+
+        def run(i):
+            try:
+                for n in range(N_CALLS):
+                    worker(i, n)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(i,))
+                   for i in range(N_THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+
+    def test_shared_params_template_is_not_mutated(self):
+        template = deepcopy(PARAMS_TEMPLATE)
+
+        def worker(i, n):
+            course_id = str(i)
+            if n % 3 == 0:
+                self.client.get_course_info(course_id, params=template)
+            elif n % 3 == 1:
+                self.client.publish_course(course_id, params=template)
+            else:
+                self.client.get_account_blueprint_courses(
+                    course_id, params=template)
+
+        self._hammer(worker)
+
+        self.assertEqual(template, PARAMS_TEMPLATE)
+        self.assertEqual(len(self.transport.calls), N_THREADS * N_CALLS)
+        for method, url, params, headers in self.transport.calls:
+            self.assertEqual(headers, {'Authorization': 'Bearer foo_token'})
+            self.assertEqual(params['per_page'], 100)
+            self.assertEqual(params['course[name]'], 'Shared')
+            if method == 'PUT':
+                self.assertEqual(params['offer'], 'true')
+            else:
+                self.assertNotIn('offer', params)
+            if url.endswith('/courses'):
+                self.assertEqual(params['blueprint'], 'true')
+                self.assertEqual(params['include[]'], ['subaccount', 'term'])
+            else:
+                self.assertNotIn('blueprint', params)
+                self.assertEqual(params['include[]'], ['term', 'teachers'])
+
+    def test_per_thread_params_do_not_leak(self):
+        def worker(i, n):
+            self.client.update_course(
+                str(i), params={'course[name]': 'Course {}'.format(i)})
+
+        self._hammer(worker)
+
+        for method, url, params, headers in self.transport.calls:
+            course_id = url.rsplit('/', 1)[1]
+            self.assertEqual(params['course[name]'],
+                             'Course {}'.format(course_id))
+
+
+class TestRequestsTransportPool(TestCase):
+
+    def test_single_session_shared_between_threads(self):
+        transport = RequestsTransport(pool_maxsize=32)
+        sessions = []
+
+        def run():
+            sessions.append(transport.requests_lib)
+
+        threads = [threading.Thread(target=run) for i in range(N_THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(set(map(id, sessions))), 1)
+        adapter = sessions[0].get_adapter('https://foo.cc.columbia.edu')
+        self.assertEqual(adapter._pool_maxsize, 32)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+from canvas_api_client.deadline import Deadline, TimeBudget
+from canvas_api_client.errors import DeadlineExceeded
+from canvas_api_client.response import SimpleResponse
+from canvas_api_client.tokens import TokenPool, is_throttled_response
+from canvas_api_client.v1_client import CanvasAPIv1
+from tests.helpers import FakeClock
+
+from unittest import TestCase, main
+from unittest.mock import MagicMock
+
+URL = 'https://foo.cc.columbia.edu/api/v1/courses/1'
+
+
+def get_response(remaining=None, status=200, body=b'{}'):
+    headers = {}
+    if remaining is not None:
+        headers['X-Rate-Limit-Remaining'] = str(remaining)
+    return SimpleResponse(status, URL, headers=headers, content=body)
+
+
+def get_throttled_response():
+    return get_response(0, 403, b'403 Forbidden (Rate Limit Exceeded)')
+
+
+def set_remaining(pool, **remaining):
+    for token, value in remaining.items():
+        pool._by_token[token].remaining = value
+
+
+class TestTokenPool(TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock(100.0)
+        self.pool = TokenPool(['token_a', 'token_b', 'token_c'],
+                              cooldown=30, clock=self.clock)
+
+    def test_empty_pool(self):
+        with self.assertRaises(ValueError):
+            TokenPool([])
+
+    def test_prefers_most_remaining_budget(self):
+        set_remaining(self.pool, token_a=100, token_b=600, token_c=300)
+
+        self.assertEqual(self.pool.acquire(), 'token_b')
+
+    def test_unused_tokens_tried_first(self):
+        token = self.pool.acquire()
+        self.pool.release(token, get_response(699))
+
+        self.assertNotEqual(self.pool.acquire(), token)
+
+    def test_in_flight_requests_count_against_budget(self):
+        set_remaining(self.pool, token_a=10, token_b=10.5, token_c=5)
+
+        self.assertEqual(self.pool.acquire(), 'token_b')
+        self.assertEqual(self.pool.acquire(), 'token_a')
+
+    def test_throttled_token_out_of_rotation(self):
+        set_remaining(self.pool, token_a=700, token_b=10, token_c=10)
+        self.assertEqual(self.pool.acquire(), 'token_a')
+        self.pool.release('token_a', get_throttled_response())
+
+        self.assertNotEqual(self.pool.acquire(), 'token_a')
+        stats = {s.throttle_count: s for s in self.pool.stats()}
+        self.assertTrue(stats[1].throttled)
+
+        self.clock.now += 31
+        set_remaining(self.pool, token_a=700)
+        self.assertEqual(self.pool.acquire(), 'token_a')
+
+    def test_all_throttled_timeout(self):
+        pool = TokenPool(['token_a'], cooldown=30, clock=self.clock)
+        pool.acquire()
+        pool.release('token_a', get_throttled_response())
+
+        self.assertEqual(pool.acquire(timeout=0), 'token_a')
+
+    def test_all_throttled_deadline(self):
+        pool = TokenPool(['token_a'], cooldown=30, clock=self.clock)
+        pool.acquire()
+        pool.release('token_a', get_throttled_response())
+
+        with self.assertRaises(DeadlineExceeded):
+            pool.acquire(deadline=Deadline(0, clock=self.clock))
+        self.assertEqual(
+            pool.acquire(deadline=TimeBudget(0, clock=self.clock)),
+            'token_a')
+
+    def test_stats_mask_tokens(self):
+        pool = TokenPool(['1396~abcdefghijkl'])
+        self.assertEqual(pool.stats()[0].token, '1396...ijkl')
+
+    def test_is_throttled_response(self):
+        self.assertTrue(is_throttled_response(get_throttled_response()))
+        self.assertTrue(is_throttled_response(get_response(status=429)))
+        self.assertFalse(is_throttled_response(
+            get_response(status=403, body=b'unauthorized')))
+        self.assertFalse(is_throttled_response(get_response(500)))
+
+
+class TestCanvasAPIv1TokenPool(TestCase):
+
+    def setUp(self):
+        self._mock_requests = MagicMock()
+
+    def test_token_list(self):
+        self._mock_requests.get.return_value = get_response(500)
+        client = CanvasAPIv1('https://foo.cc.columbia.edu/api/v1/',
+                             ['token_a', 'token_b'],
+                             requests_lib=self._mock_requests)
+
+        client.get_course_info('1')
+        client.get_course_info('1')
+
+        tokens = [c[1]['headers']['Authorization']
+                  for c in self._mock_requests.get.call_args_list]
+        self.assertEqual(tokens, ['Bearer token_a', 'Bearer token_b'])
+
+    def test_retry_throttled_with_other_token(self):
+        self._mock_requests.get.side_effect = [
+            get_throttled_response(), get_response(650)]
+        pool = TokenPool(['token_a', 'token_b'])
+        client = CanvasAPIv1('https://foo.cc.columbia.edu/api/v1/', pool,
+                             requests_lib=self._mock_requests)
+
+        response = client.get_course_info('1')
+
+        self.assertTrue(response.ok)
+        tokens = [c[1]['headers']['Authorization']
+                  for c in self._mock_requests.get.call_args_list]
+        self.assertEqual(tokens, ['Bearer token_a', 'Bearer token_b'])
+        self.assertEqual([s.throttled for s in pool.stats()], [True, False])
+
+    def test_no_retry_for_file_uploads(self):
+        self._mock_requests.post.return_value = get_throttled_response()
+        client = CanvasAPIv1('https://foo.cc.columbia.edu/api/v1/',
+                             ['token_a', 'token_b'],
+                             requests_lib=self._mock_requests)
+
+        response = client._post(URL, files={'attachment': None},
+                                exit_on_error=False)
+
+        self.assertFalse(response.ok)
+        self.assertEqual(self._mock_requests.post.call_count, 1)
+
+    def test_release_on_error(self):
+        self._mock_requests.get.side_effect = IOError
+        pool = TokenPool(['token_a'])
+        client = CanvasAPIv1('https://foo.cc.columbia.edu/api/v1/', pool,
+                             requests_lib=self._mock_requests)
+
+        with self.assertRaises(IOError):
+            client.get_course_info('1')
+        self.assertEqual(pool.stats()[0].in_flight, 0)
+
+
+if __name__ == '__main__':
+    main()
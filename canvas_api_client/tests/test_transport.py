@@ -0,0 +1,170 @@
+import io
+import os
+import subprocess
+import sys
+
+from canvas_api_client.response import SimpleResponse
+from canvas_api_client.transport import (
+    MAX_REDIRECTS, RequestsTransport, Transport, Urllib3Transport,
+    get_transport)
+from canvas_api_client.v1_client import CanvasAPIv1
+
+from unittest import TestCase, main
+from unittest.mock import MagicMock
+
+from requests import HTTPError
+
+BASE_URL = 'https://foo.cc.columbia.edu/api/v1/'
+
+
+def get_mock_pool_response(status=200, data=b'[]', headers=None):
+    return MagicMock(status=status, data=data, headers=headers or {},
+                     reason='OK' if status < 400 else 'Not Found')
+
+
+class TestRequestsTransport(TestCase):
+
+    def test_request_forwards_to_requests_lib(self):
+        mock_requests = MagicMock()
+        transport = RequestsTransport(mock_requests)
+
+        transport.get('https://foo', params={'a': 1}, headers={})
+
+        mock_requests.get.assert_called_once_with(
+            'https://foo', params={'a': 1}, headers={})
+
+    def test_client_wraps_requests_lib(self):
+        mock_requests = MagicMock()
+        client = CanvasAPIv1(BASE_URL, 'foo_token', requests_lib=mock_requests)
+
+        self.assertIsInstance(client._transport, RequestsTransport)
+
+    def test_client_uses_transport(self):
+        transport = MagicMock(spec=Transport)
+        client = CanvasAPIv1(BASE_URL, 'foo_token', requests_lib=transport)
+
+        client.get_course_info('1')
+
+        transport.get.assert_called_once_with(
+            BASE_URL + 'courses/1',
+            headers={'Authorization': 'Bearer foo_token'},
+            params={'per_page': 100})
+
+    def test_requests_not_imported_with_module(self):
+        code = ('import sys; import canvas_api_client.v1_client; '
+                'print("requests" in sys.modules)')
+        package_dir = os.path.dirname(
+            os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.check_output(
+            [sys.executable, '-c', code], cwd=package_dir)
+        self.assertEqual(output.strip(), b'False')
+
+
+class TestUrllib3Transport(TestCase):
+
+    def setUp(self):
+        self._mock_pool = MagicMock()
+        self._mock_pool.request.return_value = get_mock_pool_response(
+            data=b'[{"id": 1}]',
+            headers={'Link': '<https://foo?page=2>; rel="next"'})
+        self.transport = Urllib3Transport(pool_manager=self._mock_pool)
+
+    def test_get(self):
+        response = self.transport.get(
+            'https://foo/courses',
+            headers={'Authorization': 'Bearer foo_token'},
+            params={'per_page': 100, 'include[]': ['term', 'teachers'],
+                    'skip': None})
+
+        url = ('https://foo/courses?per_page=100&include%5B%5D=term'
+               '&include%5B%5D=teachers')
+        self._mock_pool.request.assert_called_once_with(
+            'GET', url, headers={'Authorization': 'Bearer foo_token'},
+            body=None, timeout=None)
+        self.assertIsInstance(response, SimpleResponse)
+        self.assertEqual(response.json(), [{'id': 1}])
+        self.assertEqual(response.links['next']['url'], 'https://foo?page=2')
+
+    def test_get_next_link_keeps_query(self):
+        self.transport.get('https://foo/courses?page=2',
+                           params={'per_page': 100})
+
+        args, kwargs = self._mock_pool.request.call_args
+        self.assertEqual(args[1], 'https://foo/courses?page=2&per_page=100')
+
+    def test_put_form_data(self):
+        self.transport.put(
+            'https://foo/update_associations',
+            data={'course_ids_to_add[]': ['1', '2']})
+
+        args, kwargs = self._mock_pool.request.call_args
+        self.assertEqual(kwargs['body'], 'course_ids_to_add%5B%5D=1'
+                                         '&course_ids_to_add%5B%5D=2')
+        self.assertEqual(kwargs['headers']['Content-Type'],
+                         'application/x-www-form-urlencoded')
+
+    def test_post_encoded_body(self):
+        self.transport.post('https://foo/graphql', data='{"query": "{}"}',
+                            headers={'Content-Type': 'application/json'})
+
+        args, kwargs = self._mock_pool.request.call_args
+        self.assertEqual(kwargs['body'], '{"query": "{}"}')
+        self.assertEqual(kwargs['headers']['Content-Type'],
+                         'application/json')
+
+    def test_post_files(self):
+        f = io.BytesIO(b'course_id,short_name\n')
+        f.name = '/tmp/courses.csv'
+
+        self.transport.post('https://foo/sis_imports',
+                            files={'attachment': f})
+
+        args, kwargs = self._mock_pool.request.call_args
+        self.assertIn(b'filename="courses.csv"', kwargs['body'])
+        self.assertIn(b'course_id,short_name', kwargs['body'])
+        self.assertTrue(kwargs['headers']['Content-Type'].startswith(
+            'multipart/form-data'))
+
+    def test_timeout(self):
+        self.transport.get('https://foo', timeout=(3.05, 27))
+
+        args, kwargs = self._mock_pool.request.call_args
+        self.assertEqual(kwargs['timeout'].connect_timeout, 3.05)
+        self.assertEqual(kwargs['timeout'].read_timeout, 27)
+
+        self.transport.get('https://foo', timeout=10)
+
+        args, kwargs = self._mock_pool.request.call_args
+        self.assertEqual(kwargs['timeout'].connect_timeout, 10)
+        self.assertEqual(kwargs['timeout'].read_timeout, 10)
+        self.assertIsNone(kwargs['timeout'].total)
+
+    def test_retries_follow_redirects_only(self):
+        retries = Urllib3Transport()._pool.connection_pool_kw['retries']
+
+        self.assertEqual(retries.redirect, MAX_REDIRECTS)
+        retries = retries.increment(
+            'GET', 'https://foo', response=get_mock_pool_response(
+                302, headers={'Location': 'https://foo/1'}))
+        self.assertEqual(retries.redirect, MAX_REDIRECTS - 1)
+        self.assertFalse(retries.is_exhausted())
+        for kind in ['connect', 'read', 'status', 'other']:
+            self.assertEqual(getattr(retries, kind), 0)
+
+    def test_error_status(self):
+        self._mock_pool.request.return_value = get_mock_pool_response(404)
+        client = CanvasAPIv1(BASE_URL, 'foo_token',
+                             requests_lib=self.transport)
+
+        with self.assertRaises(HTTPError):
+            client.get_course_info('1')
+
+    def test_get_transport(self):
+        self.assertIsInstance(get_transport('requests'), RequestsTransport)
+        self.assertIsInstance(get_transport('urllib3'), Urllib3Transport)
+        with self.assertRaises(ValueError):
+            get_transport('curl')
+
+
+if __name__ == '__main__':
+    main()
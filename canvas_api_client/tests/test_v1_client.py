@@ -1,3 +1,5 @@
+import json
+
 from canvas_api_client.v1_client import CanvasAPIv1
 from canvas_api_client.errors import APIPaginationException
 
@@ -253,7 +255,26 @@ class TestCanvasAPIv1Client(TestCase):
             course, is_sis_course_id=True, flatten_response=True)
         next(generator)
 
-        mock_get_flattened.assert_called_once_with(url, params=None)
+        mock_get_flattened.assert_called_once_with(
+            url, params=None, deadline=None, progress_callback=None)
+
+    def test_get_page(self):
+        self.test_client.get_page('ABC', 'syllabus', is_sis_course_id=True)
+        url = 'https://foo.cc.columbia.edu/api/v1/courses/sis_course_id:ABC/pages/syllabus'
+        _assert_request_called_once_with(self._mock_requests.get, url)
+
+    def test_add_enrollment(self):
+        self.test_client.add_enrollment(
+            'ABC', 'sis_user_id:UNI1', 'TeacherEnrollment',
+            is_sis_course_id=True)
+        url = 'https://foo.cc.columbia.edu/api/v1/courses/sis_course_id:ABC/enrollments'
+        data = {
+            'enrollment[user_id]': 'sis_user_id:UNI1',
+            'enrollment[type]': 'TeacherEnrollment',
+            'enrollment[enrollment_state]': 'active',
+        }
+        _assert_request_called_once_with(
+            self._mock_requests.post, url, data=data)
 
     def test_delete_enrollment(self):
         self.test_client.delete_enrollment(1234, 432432)
@@ -402,6 +423,34 @@ class TestCanvasAPIv1Client(TestCase):
                 'null',
                 [])
 
+    def test_start_blueprint_migration(self):
+        self.test_client.start_blueprint_migration('66642', comment='sync')
+
+        url = (
+            "https://foo.cc.columbia.edu/api/v1/"
+            "courses/66642/blueprint_templates/default/migrations")
+        _assert_request_called_once_with(
+            self._mock_requests.post, url,
+            data={'send_notification': False, 'comment': 'sync'})
+
+    def test_get_blueprint_migration(self):
+        self.test_client.get_blueprint_migration('66642', '7')
+
+        url = (
+            "https://foo.cc.columbia.edu/api/v1/"
+            "courses/66642/blueprint_templates/default/migrations/7")
+        _assert_request_called_once_with(self._mock_requests.get, url)
+
+    def test_graphql(self):
+        self.test_client.graphql('query { x }', {'id': '1'})
+
+        self._mock_requests.post.assert_called_once_with(
+            'https://foo.cc.columbia.edu/api/graphql', params={},
+            headers={'Authorization': 'Bearer foo_token',
+                     'Content-Type': 'application/json'},
+            data=json.dumps({'query': 'query { x }',
+                             'variables': {'id': '1'}}))
+
     def test_get_account_blueprint_courses(self):
         account_id = '115'
 
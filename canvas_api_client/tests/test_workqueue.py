@@ -0,0 +1,195 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from canvas_api_client.deadline import TimeBudget
+from canvas_api_client.response import SimpleResponse
+from canvas_api_client.transport import Transport
+from canvas_api_client.v1_client import CanvasAPIv1
+from canvas_api_client.workqueue import (
+    ACCOUNT_COURSES, COURSE_USERS, CrawlWorker, QueueStats, WorkQueue,
+    plan_account_courses, plan_course_users)
+
+from unittest import TestCase, main
+
+API_URL = 'https://foo.cc.columbia.edu/api/v1/'
+
+
+class FakeTransport(Transport):
+    """
+    Serves 45 items for any listing, with numbered pagination links.
+    """
+
+    def request(self, method, url, params=None, **kwargs):
+        parts = urlsplit(url)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        query.update(params or {})
+        per_page = int(query['per_page'])
+        page = int(query.get('page', 1))
+        body = [{'id': i, 'path': parts.path}
+                for i in range((page - 1) * per_page,
+                               min(page * per_page, 45))]
+
+        base = '{}://{}{}'.format(parts.scheme, parts.netloc, parts.path)
+        last = (45 + per_page - 1) // per_page
+        links = ['<{}?{}>; rel="last"'.format(
+            base, urlencode(dict(query, page=last)))]
+        if page < last:
+            links.append('<{}?{}>; rel="next"'.format(
+                base, urlencode(dict(query, page=page + 1))))
+        return SimpleResponse(200, url, headers={'Link': ','.join(links)},
+                              content=json.dumps(body).encode('utf-8'))
+
+
+class TestWorkQueue(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.now = [1000.0]
+        self.queue = WorkQueue(os.path.join(self.tempdir, 'work.sqlite'),
+                               lease_seconds=10, max_attempts=2,
+                               clock=lambda: self.now[0])
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_lease_and_complete(self):
+        self.assertTrue(self.queue.put('a', {'n': 1}, key='a1'))
+        self.assertFalse(self.queue.put('a', {'n': 1}, key='a1'))
+        self.queue.put('b', {'n': 2})
+
+        first = self.queue.lease('w1')
+        second = self.queue.lease('w2')
+
+        self.assertEqual([(i.kind, i.payload) for i in first + second],
+                         [('a', {'n': 1}), ('b', {'n': 2})])
+        self.assertEqual(self.queue.lease('w3'), [])
+        self.assertFalse(self.queue.complete(first[0].id, 'w2'))
+        self.assertTrue(self.queue.complete(first[0].id, 'w1'))
+        self.assertEqual(self.queue.stats(), QueueStats(0, 1, 1, 0, 0))
+
+    def test_expired_lease_is_requeued(self):
+        self.queue.put('a', {})
+        item = self.queue.lease('w1')[0]
+
+        self.now[0] += 8
+        self.assertTrue(self.queue.heartbeat(item.id, 'w1'))
+        self.now[0] += 8
+        self.assertEqual(self.queue.lease('w2'), [])
+
+        self.now[0] += 5
+        self.assertEqual(self.queue.stats().pending, 1)
+        retried = self.queue.lease('w2')[0]
+        self.assertEqual((retried.id, retried.attempts), (item.id, 2))
+        self.assertFalse(self.queue.heartbeat(item.id, 'w1'))
+        self.assertFalse(self.queue.complete(item.id, 'w1'))
+
+        self.now[0] += 20
+        self.assertEqual(self.queue.stats(), QueueStats(0, 0, 0, 0, 1))
+        self.assertEqual(self.queue.lease('w3'), [])
+        self.assertEqual(self.queue.stats(), QueueStats(0, 0, 0, 1, 0))
+        self.assertEqual(self.queue.failures()[0][1], 'lease expired')
+
+    def test_pending_before_expired(self):
+        self.queue.put('a', {})
+        self.queue.lease('w1')
+        self.queue.put('b', {})
+        self.now[0] += 20
+
+        items = self.queue.lease('w2', limit=2)
+
+        self.assertEqual([i.kind for i in items], ['b', 'a'])
+
+    def test_fail(self):
+        self.queue.put('a', {})
+        item = self.queue.lease('w1')[0]
+        self.assertTrue(self.queue.fail(item.id, 'w1', 'boom'))
+        item = self.queue.lease('w1')[0]
+        self.queue.fail(item.id, 'w1', 'boom again')
+
+        self.assertEqual(self.queue.stats().failed, 1)
+        self.assertEqual(self.queue.failures()[0][1], 'boom again')
+
+
+class TestCrawlWorker(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, 'work.sqlite')
+        self.client = CanvasAPIv1(API_URL, 'token',
+                                  requests_lib=FakeTransport(), per_page=10)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_plan(self):
+        queue = WorkQueue(self.path)
+
+        self.assertEqual(
+            plan_account_courses(queue, self.client, '1', pages_per_unit=2),
+            3)
+        self.assertEqual(
+            plan_account_courses(queue, self.client, '1', pages_per_unit=2),
+            0)
+        self.assertEqual(plan_course_users(queue, ['7', '8']), 2)
+
+        items = queue.lease('w1', limit=5)
+        self.assertEqual(
+            [(i.payload['first_page'], i.payload['last_page'])
+             for i in items if i.kind == ACCOUNT_COURSES],
+            [(1, 2), (3, 4), (5, 5)])
+        self.assertEqual([i.payload['course_id'] for i in items
+                          if i.kind == COURSE_USERS], ['7', '8'])
+
+    def test_workers_split_the_crawl(self):
+        queue = WorkQueue(self.path)
+        plan_account_courses(queue, self.client, '1', pages_per_unit=1)
+        plan_course_users(queue, ['7'])
+        queue.put('broken', {})
+
+        records = []
+        lock = threading.Lock()
+
+        def sink(item, items):
+            with lock:
+                records.extend((item.kind, r['id']) for r in items)
+
+        completed = []
+        workers = [CrawlWorker(WorkQueue(self.path), self.client, sink,
+                               worker_id='w{}'.format(i), poll_interval=0.01)
+                   for i in range(3)]
+        threads = [threading.Thread(
+                       target=lambda w=w: completed.append(w.run()))
+                   for w in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sum(completed), 6)
+        self.assertEqual(sorted(r for k, r in records
+                                if k == ACCOUNT_COURSES), list(range(45)))
+        self.assertEqual(len([k for k, r in records if k == COURSE_USERS]),
+                         45)
+        stats = queue.stats()
+        self.assertEqual((stats.done, stats.failed), (6, 1))
+        self.assertIn('KeyError', queue.failures()[0][1])
+
+    def test_time_budget_cuts_polling_short(self):
+        queue = WorkQueue(self.path)
+        queue.put('a', {})
+        queue.lease('other worker')
+        worker = CrawlWorker(queue, self.client, lambda item, items: None,
+                             poll_interval=30)
+
+        started = time.monotonic()
+        self.assertEqual(worker.run(TimeBudget(0.05)), 0)
+        self.assertLess(time.monotonic() - started, 5)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import threading
+
+from canvas_api_client.writebuffer import WriteBuffer, WriteBufferStats
+
+from unittest import TestCase, main
+from unittest.mock import MagicMock, call
+
+
+class TestWriteBuffer(TestCase):
+
+    def setUp(self):
+        self.client = MagicMock()
+        self.buffer = WriteBuffer(self.client, max_delay=None)
+
+    def test_merges_course_updates(self):
+        first = self.buffer.update_course(
+            '42', params={'course[name]': 'Bio', 'course[code]': 'B1'})
+        second = self.buffer.update_course(
+            '42', params={'course[name]': 'Biology'})
+        published = self.buffer.publish_course('42')
+        other = self.buffer.update_course('42', is_sis_course_id=True)
+
+        self.assertFalse(first.done())
+        self.assertEqual(self.buffer.flush(), 2)
+
+        self.assertEqual(self.client.update_course.call_args_list, [
+            call('42', is_sis_course_id=False,
+                 params={'course[name]': 'Biology', 'course[code]': 'B1',
+                         'offer': 'true'}),
+            call('42', is_sis_course_id=True, params={}),
+        ])
+        response = self.client.update_course.return_value
+        self.assertIs(first.result(), response)
+        self.assertIs(second.result(), response)
+        self.assertIs(published.result(), response)
+        self.assertIs(other.result(), response)
+        self.assertEqual(self.buffer.stats(), WriteBufferStats(4, 2, 0))
+
+    def test_collapses_page_writes(self):
+        self.buffer.put_page('42', 'draft', url='syllabus', title='S')
+        last = self.buffer.put_page('42', 'final', url='syllabus')
+        self.buffer.put_page('42', 'other', url='welcome')
+        self.buffer.flush()
+
+        self.assertEqual(self.client.put_page.call_args_list, [
+            call('42', body='final', is_sis_course_id=False,
+                 url='syllabus'),
+            call('42', body='other', is_sis_course_id=False, url='welcome'),
+        ])
+        self.assertIs(last.result(), self.client.put_page.return_value)
+
+    def test_errors(self):
+        self.client.update_course.side_effect = RuntimeError('500')
+        futures = [self.buffer.update_course('42'),
+                   self.buffer.publish_course('42')]
+        self.buffer.flush()
+
+        for future in futures:
+            self.assertIsInstance(future.exception(), RuntimeError)
+
+    def test_flushes_when_full(self):
+        buffer = WriteBuffer(self.client, max_pending=2, max_delay=None)
+        buffer.update_course('1')
+        buffer.update_course('1')
+        self.assertFalse(self.client.update_course.called)
+
+        future = buffer.update_course('2')
+        self.assertTrue(future.done())
+        self.assertEqual(self.client.update_course.call_count, 2)
+
+    def test_flushes_after_delay(self):
+        sent = threading.Event()
+        self.client.update_course.side_effect = lambda *a, **k: sent.set()
+        buffer = WriteBuffer(self.client, max_delay=0.01)
+
+        buffer.update_course('1')
+        self.assertTrue(sent.wait(5))
+        buffer.close()
+
+        with self.assertRaises(RuntimeError):
+            buffer.update_course('1')
+
+    def test_close_flushes(self):
+        with WriteBuffer(self.client, max_delay=60) as buffer:
+            future = buffer.put_page('42', 'body', url='home')
+
+        self.assertTrue(future.done())
+
+
+if __name__ == '__main__':
+    main()